@@ -0,0 +1,77 @@
+from multiprocessing.connection import Client
+from typing import Any, Optional
+import os
+import threading
+
+from APIs.api_server import SERVED_FUNCTIONS, parse_address, get_authkey
+import APIs.api_implementation as api
+# the value types and the default end date are local; the data and indexes are only loaded by the server
+from APIs.api_implementation import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
+                                     set_default_end_date, get_default_end_date, use_end_date)
+
+
+class APIClient:
+    """
+    Client of an api_server process, calling the API functions remotely with the same arguments and results.
+
+    Connections are kept in a pool and reused, and each call carries the default end date of the calling thread.
+    Batches of KG queries and name mappings go through the *_many API functions, which the server answers in one call.
+    """
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, pool_size: int = 4):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.pool_size = pool_size
+        self.idle_connections = []
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        if self.authkey is None:
+            raise ValueError("No API server authkey: set MIRAI_API_AUTHKEY, or start api_server to generate one")
+        with self.lock:
+            if self.idle_connections:
+                return self.idle_connections.pop()
+        return Client(self.address, authkey=self.authkey)
+
+    def _release(self, connection):
+        with self.lock:
+            if len(self.idle_connections) < self.pool_size:
+                self.idle_connections.append(connection)
+                return
+        connection.close()
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        connection = self._acquire()
+        try:
+            connection.send((name, args, kwargs, get_default_end_date()))
+            ok, result = connection.recv()
+        except BaseException:
+            # the connection may be out of step with its requests, so it is dropped instead of reused
+            connection.close()
+            raise
+        self._release(connection)
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        with self.lock:
+            for connection in self.idle_connections:
+                connection.close()
+            self.idle_connections = []
+
+
+client = APIClient(os.environ.get('MIRAI_API_SERVER', '/tmp/mirai_api.sock'), authkey=get_authkey())
+
+
+def _remote_function(name: str):
+    def function(*args, **kwargs):
+        return client.call(name, *args, **kwargs)
+    function.__name__ = function.__qualname__ = name
+    function.__doc__ = getattr(api, name).__doc__
+    return function
+
+
+# remote versions of the API functions, with the names and docstrings of api_implementation
+for _name in SERVED_FUNCTIONS:
+    globals()[_name] = _remote_function(_name)
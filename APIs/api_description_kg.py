@@ -66,6 +66,22 @@ def map_country_name_to_iso(name: str) -> List[Country]:
     """
     pass
 
+def map_country_names_to_iso(names: List[str]) -> List[List[Country]]:
+    """
+    Maps a list of country names to the most likely corresponding Country objects with ISO codes, in one call.
+
+    Parameters:
+        names (List[str]): The country names to map.
+
+    Returns:
+        List[List[Country]]: For each name, in order, the result of map_country_name_to_iso for that name.
+
+    Example:
+        >>> map_country_names_to_iso(["China", "Korea"])
+        [[Country(iso_code=ISOCode("CHN"), name="China")], [Country(iso_code=ISOCode("KOR"), name="Republic of Korea"), Country(iso_code=ISOCode("PRK"), name="Democratic People's Republic of Korea")]]
+    """
+    pass
+
 def map_iso_to_country_name(iso_code: ISOCode) -> str:
     """
     Maps an ISO code to a country name.
@@ -98,6 +114,22 @@ def map_relation_description_to_cameo(description: str) -> List[Relation]:
     """
     pass
 
+def map_relation_descriptions_to_cameo(descriptions: List[str]) -> List[List[Relation]]:
+    """
+    Maps a list of relation descriptions to the most likely Relation objects, in one call.
+
+    Parameters:
+        descriptions (List[str]): The relation descriptions to map.
+
+    Returns:
+        List[List[Relation]]: For each description, in order, the result of map_relation_description_to_cameo for that description.
+
+    Example:
+        >>> map_relation_descriptions_to_cameo(["Fight", "Provide economic aid"])
+        [[Relation(cameo_code=CAMEOCode("19"), name="Fight", description="All uses of conventional force and acts of war typically by organized armed groups.")], [Relation(cameo_code=CAMEOCode("071"), name="Provide economic aid", description="Extend monetary aid and financial guarantees, grants, gifts, and credit.")]]
+    """
+    pass
+
 def map_cameo_to_relation(cameo_code: CAMEOCode) -> Relation:
     """
     Maps a CAMEO code to a relation, including its name and description.
@@ -181,16 +213,18 @@ def count_events(date_range: Optional[DateRange] = None, head_entities: Optional
     """
     pass
 
-def get_events(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, text_description: Optional[str] = None) -> List[Event]:
+def get_events(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, text_description: Optional[str] = None, limit: int = 30, offset: int = 0) -> List[Event]:
     """
     Retrieves events from the knowledge graph based on specified conditions.
     Inherits common filter parameters from count_events. See count_events for more details on these parameters.
 
     Additional Parameters:
         text_description (Optional[str]): Textual description to match with the source news articles of events. If None, the returned events are sorted by date in descending order; otherwise, sorted by relevance of the source news article to the description.
+        limit (int): Maximum number of events to return. Defaults to 30.
+        offset (int): Number of top-ranked events to skip, to page through the results of the same conditions. Defaults to 0.
 
     Returns:
-        List[Event]: A list of maximum 30 events matching the specified conditions.
+        List[Event]: A list of maximum limit events matching the specified conditions.
 
     Example:
         >>> get_events(date_range=DateRange(start_date=Date("2022-01-01"), end_date=Date("2022-01-31")), head_entities=[ISOCode("USA"), ISOCode("CHN")], tail_entities=None, relations=[CAMEOCode("010")], text_description="economic trade")
@@ -198,7 +232,7 @@ def get_events(date_range: Optional[DateRange] = None, head_entities: Optional[L
     """
     pass
 
-def get_entity_distribution(date_range: Optional[DateRange] = None, involved_relations: Optional[List[CAMEOCode]] = None, interacted_entities: Optional[List[ISOCode]] = None, entity_role: Optional[str] = None) -> Dict[ISOCode, int]:
+def get_entity_distribution(date_range: Optional[DateRange] = None, involved_relations: Optional[List[CAMEOCode]] = None, interacted_entities: Optional[List[ISOCode]] = None, entity_role: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> Dict[ISOCode, int]:
     """
     Gets the distribution of entities in the knowledge graph under specified conditions.
 
@@ -207,6 +241,8 @@ def get_entity_distribution(date_range: Optional[DateRange] = None, involved_rel
         involved_relations (Optional[List[CAMEOCode]]): List of relations that the returned entities must be involved in any of. If first level relations are listed, all second level relations under them are included. If None, all relations are included.
         interacted_entities (Optional[List[ISOCode]]): List of entities that the returned entities must have interacted with any of. If None, all entities are included.
         entity_role (Optional[EntityRole]): Specifies the role of the returned entity in the events. Options are 'head', 'tail', or 'both'. If 'both' or None, the returned entity can be either head or tail.
+        limit (Optional[int]): Maximum number of entities to return, i.e. the top entities by count. If None, all entities are returned.
+        offset (int): Number of top entities to skip, to page through the distribution. Defaults to 0.
 
     Returns:
         Dict[ISOCode, int]: A dictionary mapping returned entities' ISO codes to the number of events with the specified conditions in which they are involved, sorted by counts in descending order.
@@ -217,7 +253,7 @@ def get_entity_distribution(date_range: Optional[DateRange] = None, involved_rel
     """
     pass
 
-def get_relation_distribution(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None) -> Dict[CAMEOCode, int]:
+def get_relation_distribution(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, limit: Optional[int] = None, offset: int = 0) -> Dict[CAMEOCode, int]:
     """
     Gets the distribution of second level relations in the knowledge graph under specified conditions.
 
@@ -225,6 +261,8 @@ def get_relation_distribution(date_range: Optional[DateRange] = None, head_entit
         date_range (Optional[DateRange]): Range of dates to filter the events. If None, all dates are included.
         head_entities (Optional[List[ISOCode]]): List of head entities that the events must involve any of. If None, all head entities are included.
         tail_entities (Optional[List[ISOCode]]): List of tail entities that the events must involve any of. If None, all tail entities are included.
+        limit (Optional[int]): Maximum number of relations to return, i.e. the top relations by count. If None, all relations are returned.
+        offset (int): Number of top relations to skip, to page through the distribution. Defaults to 0.
 
     Returns:
         Dict[CAMEOCode, int]: A dictionary mapping second level relations' CAMEO codes to the number of events with the specified conditions in which they are involved, sorted by counts in descending order.
@@ -233,4 +271,52 @@ def get_relation_distribution(date_range: Optional[DateRange] = None, head_entit
         >>> get_relation_distribution(date_range=DateRange(start_date=Date("2022-01-01"), end_date=Date("2022-01-31")), head_entities=[ISOCode("USA"), ISOCode("CHN")], tail_entities=None)
         {CAMEOCode("010"): 3, CAMEOCode("011"): 1}
     """
+    pass
+
+def count_events_many(filter_specs: List[dict]) -> List[int]:
+    """
+    Counts the number of events in the knowledge graph for each of many sets of conditions, in one pass.
+
+    Parameters:
+        filter_specs (List[dict]): List of conditions, each a dictionary of keyword arguments of count_events (date_range, head_entities, tail_entities, relations). Missing keys mean no condition.
+
+    Returns:
+        List[int]: For each set of conditions, the result of count_events.
+
+    Example:
+        >>> count_events_many([{"head_entities": [ISOCode("USA")], "tail_entities": [ISOCode("CHN")]}, {"head_entities": [ISOCode("CHN")], "tail_entities": [ISOCode("USA")], "relations": [CAMEOCode("19")]}])
+        [1523, 12]
+    """
+    pass
+
+def get_entity_distribution_many(filter_specs: List[dict]) -> List[Dict[ISOCode, int]]:
+    """
+    Gets the distribution of entities in the knowledge graph for each of many sets of conditions, in one pass.
+
+    Parameters:
+        filter_specs (List[dict]): List of conditions, each a dictionary of keyword arguments of get_entity_distribution (date_range, involved_relations, interacted_entities, entity_role, limit, offset). Missing keys mean no condition.
+
+    Returns:
+        List[Dict[ISOCode, int]]: For each set of conditions, the result of get_entity_distribution.
+
+    Example:
+        >>> get_entity_distribution_many([{"involved_relations": [CAMEOCode("19")], "interacted_entities": [ISOCode("USA")]}, {"involved_relations": [CAMEOCode("19")], "interacted_entities": [ISOCode("CHN")]}])
+        [{ISOCode("USA"): 210, ISOCode("IRQ"): 35, ...}, {ISOCode("CHN"): 48, ISOCode("TWN"): 9, ...}]
+    """
+    pass
+
+def get_relation_distribution_many(filter_specs: List[dict]) -> List[Dict[CAMEOCode, int]]:
+    """
+    Gets the distribution of second level relations in the knowledge graph for each of many sets of conditions, in one pass.
+
+    Parameters:
+        filter_specs (List[dict]): List of conditions, each a dictionary of keyword arguments of get_relation_distribution (date_range, head_entities, tail_entities, limit, offset). Missing keys mean no condition.
+
+    Returns:
+        List[Dict[CAMEOCode, int]]: For each set of conditions, the result of get_relation_distribution.
+
+    Example:
+        >>> get_relation_distribution_many([{"head_entities": [ISOCode("USA")], "tail_entities": [ISOCode("CHN")]}, {"head_entities": [ISOCode("CHN")], "tail_entities": [ISOCode("USA")]}])
+        [{CAMEOCode("042"): 120, CAMEOCode("036"): 85, ...}, {CAMEOCode("042"): 98, CAMEOCode("112"): 40, ...}]
+    """
     pass
\ No newline at end of file
@@ -78,6 +78,22 @@ def map_country_name_to_iso(name: str) -> List[Country]:
     """
     pass
 
+def map_country_names_to_iso(names: List[str]) -> List[List[Country]]:
+    """
+    Maps a list of country names to the most likely corresponding Country objects with ISO codes, in one call.
+
+    Parameters:
+        names (List[str]): The country names to map.
+
+    Returns:
+        List[List[Country]]: For each name, in order, the result of map_country_name_to_iso for that name.
+
+    Example:
+        >>> map_country_names_to_iso(["China", "Korea"])
+        [[Country(iso_code=ISOCode("CHN"), name="China")], [Country(iso_code=ISOCode("KOR"), name="Republic of Korea"), Country(iso_code=ISOCode("PRK"), name="Democratic People's Republic of Korea")]]
+    """
+    pass
+
 def map_iso_to_country_name(iso_code: ISOCode) -> str:
     """
     Maps an ISO code to a country name.
@@ -110,6 +126,22 @@ def map_relation_description_to_cameo(description: str) -> List[Relation]:
     """
     pass
 
+def map_relation_descriptions_to_cameo(descriptions: List[str]) -> List[List[Relation]]:
+    """
+    Maps a list of relation descriptions to the most likely Relation objects, in one call.
+
+    Parameters:
+        descriptions (List[str]): The relation descriptions to map.
+
+    Returns:
+        List[List[Relation]]: For each description, in order, the result of map_relation_description_to_cameo for that description.
+
+    Example:
+        >>> map_relation_descriptions_to_cameo(["Fight", "Provide economic aid"])
+        [[Relation(cameo_code=CAMEOCode("19"), name="Fight", description="All uses of conventional force and acts of war typically by organized armed groups.")], [Relation(cameo_code=CAMEOCode("071"), name="Provide economic aid", description="Extend monetary aid and financial guarantees, grants, gifts, and credit.")]]
+    """
+    pass
+
 def map_cameo_to_relation(cameo_code: CAMEOCode) -> Relation:
     """
     Maps a CAMEO code to a relation, including its name and description.
@@ -194,16 +226,18 @@ def count_news_articles(date_range: Optional[DateRange] = None, head_entities: O
     """
     pass
 
-def get_news_articles(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, keywords: Optional[List[str]] = None, text_description: Optional[str] = None) -> List[Tuple[Date, str]]:
+def get_news_articles(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, keywords: Optional[List[str]] = None, text_description: Optional[str] = None, limit: int = 15, offset: int = 0) -> List[Tuple[Date, str]]:
     """
     Retrieves news articles based on specified conditions.
     Inherits common filter parameters from count_news_articles. See count_news_articles for more details on these parameters.
 
     Additional Parameters:
         text_description (Optional[str]): Textual description to match with the news articles. If None, the returned articles are sorted by date in descending order; otherwise, sorted by relevance to the description.
+        limit (int): Maximum number of news articles to return. Defaults to 15.
+        offset (int): Number of top-ranked news articles to skip, to page through the results of the same conditions. Defaults to 0.
 
     Returns:
-        List[Tuple[Date, str]]: A list of maximum 15 news articles matching the specified conditions, each represented by a tuple of date and title.
+        List[Tuple[Date, str]]: A list of maximum limit news articles matching the specified conditions, each represented by a tuple of date and title.
 
     Example:
         >>> get_news_articles(date_range=DateRange(start_date=Date("2022-01-01"), end_date=Date("2022-01-31")), head_entities=[ISOCode("USA"), ISOCode("CHN")], tail_entities=[ISOCode("USA"), ISOCode("CHN")], relations=[CAMEOCode("010")], keywords=["trade"], text_description="Economic trade is encouraged between USA and China.")
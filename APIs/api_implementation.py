@@ -1,44 +1,181 @@
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Tuple
+from functools import partial
 import datetime
 import json
-import openai
 import pandas as pd
 import numpy as np
+import contextvars
 import os
-from rank_bm25 import BM25Okapi
-
-OPENAI_API_KEY = os.environ['OPENAI_API_KEY']
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from event_index import EventIndex, ordinal_to_date, top_ranked
+from count_cube import CountCube
+from kg_backend import EventQuery, ArrayBackend, SQLiteBackend
+from bm25_index import BM25Index
+from embeddings import OpenAIEmbeddingBackend, EmbeddingCache, get_embedding_backend, embed_texts
+from nearest_neighbors import NearestNeighbors
+from country_resolver import CountryResolver
+from data_store import load_table, source_signature
+from article_store import ArticleStore
+from news_metadata import NewsMetadata
+from keyword_index import KeywordIndex
+from result_cache import ResultCache
+from cameo_taxonomy import CameoTaxonomy
+
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 
 # global variables
 DEFAULT_START_DATE = "2023-01-01"
-DEFAULT_END_DATE = None
+
+# the default end date is a context variable, so that each thread (and asyncio task) has its own and concurrent agents
+# answering queries of different dates do not change each other's end date; a new thread starts with none set.
+# api_implementation.DEFAULT_END_DATE reads the end date of the caller
+_default_end_date = contextvars.ContextVar('DEFAULT_END_DATE', default=None)
 
 # helper function to set and get the default end date
 def set_default_end_date(date: str):
-    global DEFAULT_END_DATE
-    DEFAULT_END_DATE = date
+    _default_end_date.set(date)
 
 def get_default_end_date():
-    return DEFAULT_END_DATE
+    return _default_end_date.get()
 
 def use_end_date():
-    if DEFAULT_END_DATE is None:
+    if get_default_end_date() is None:
         print("DEFAULT_END_DATE is not set.")
     else:
-        print(f"The DEFAULT_END_DATE is set to {DEFAULT_END_DATE}.")
-
-# load kg data
-data_kg = pd.read_csv('./../data/MIRAI/data_kg.csv', sep='\t', dtype=str)
-# columns: DateStr, Actor1CountryCode, Actor2CountryCode, EventBaseCode, Actor1CountryName, Actor2CountryName, RelName, QuadEventCode, QuadEventName, Docid, Docids
-
-# load news data
-data_news = pd.read_csv('./../data/MIRAI/data_news.csv', sep='\t', dtype=str)
-# columns: Docid, MD5, URL, Date, Title, Text, Abstract
+        print(f"The DEFAULT_END_DATE is set to {get_default_end_date()}.")
+
+# data files, relative to this module so that loading them does not depend on the working directory
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+data_kg_path = os.path.join(DATA_DIR, 'MIRAI', 'data_kg.csv')
+data_news_path = os.path.join(DATA_DIR, 'MIRAI', 'data_news.csv')
+bm25_index_dir = os.path.join(DATA_DIR, 'MIRAI', 'bm25_index')
+article_store_dir = os.path.join(DATA_DIR, 'MIRAI', 'article_store')
+keyword_index_dir = os.path.join(DATA_DIR, 'MIRAI', 'keyword_index')
+event_index_dir = os.path.join(DATA_DIR, 'MIRAI', 'event_index')
+count_cube_dir = os.path.join(DATA_DIR, 'MIRAI', 'count_cube')
+news_metadata_dir = os.path.join(DATA_DIR, 'MIRAI', 'news_metadata')
+kg_database_path = os.path.join(DATA_DIR, 'MIRAI', 'data_kg.sqlite')
+
+# the indexes of the KG and news data are loaded by the first API call that needs them, so that importing this module
+# is fast; reading them as module attributes (e.g. api_implementation.event_index) also loads them
+_data_names = ['kg_backend', 'event_index', 'news_metadata', 'news_docids', 'news_row_of_docid', 'news_date_order', 'bm25_index', 'article_store', 'news_title_index', 'keyword_index']
+_data_lock = threading.Lock()
+_data_loaded = False
+
+# the API functions only use the indexes; the data tables themselves are read, through their typed Parquet caches, when
+# accessed as module attributes (e.g. api_implementation.data_kg)
+_table_names = ['data_kg', 'data_news']
+
+def _load_table(name: str) -> pd.DataFrame:
+    if name == 'data_kg':
+        # columns: DateStr, Actor1CountryCode, Actor2CountryCode, EventBaseCode, Actor1CountryName, Actor2CountryName, RelName, QuadEventCode, QuadEventName, Docid, Docids
+        return load_table(data_kg_path, categorical_columns=['DateStr', 'Actor1CountryCode', 'Actor2CountryCode', 'EventBaseCode', 'Actor1CountryName', 'Actor2CountryName', 'RelName', 'QuadEventCode', 'QuadEventName', 'Docids'], int_columns=['Docid'])
+    # columns: Docid, MD5, URL, Date, Title, Abstract; the article bodies are in the article store
+    return load_table(data_news_path, categorical_columns=['Date'], int_columns=['Docid'], columns=['Docid', 'MD5', 'URL', 'Date', 'Title', 'Abstract'])
+
+def _load_count_cube(event_index: EventIndex, kg_source: str) -> CountCube:
+    # daily cumulative counts of unique events per (head, tail, relation), answering counts and distributions without
+    # scanning events; loaded by the array backend once a date range holds enough events per cell, and saved like the
+    # event index
+    count_cube = CountCube.load(count_cube_dir, event_index, source=kg_source)
+    if count_cube is None:
+        count_cube = CountCube(event_index)
+        count_cube.save(count_cube_dir, source=kg_source)
+    return count_cube
+
+def _load_data():
+    global kg_backend, event_index, news_metadata, news_docids, news_row_of_docid, news_date_order, bm25_index, article_store, news_title_index, keyword_index, _data_loaded
+    if _data_loaded:
+        return
+    with _data_lock:
+        if _data_loaded:
+            return
+
+        # the event index and news metadata are saved as .npy files next to the data and memory-mapped
+        # read-only, so that every process serving the APIs shares one copy of them and starts without parsing data_kg
+        # or data_news; they are rebuilt whenever the data files change
+        kg_source, news_source = source_signature(data_kg_path), source_signature(data_news_path)
+
+        # the KG queries are answered by a storage backend: 'arrays' (the default) keeps the event index memory-mapped,
+        # 'sqlite' queries an SQLite file of the events from disk, for KGs that do not fit in memory
+        kg_backend_name = os.environ.get('MIRAI_KG_BACKEND', 'arrays')
+        if kg_backend_name not in ['arrays', 'sqlite']:
+            raise ValueError(f"KG backend must be 'arrays' or 'sqlite', but received: {kg_backend_name}")
+        event_index = None
+        if kg_backend_name == 'sqlite':
+            kg_backend = SQLiteBackend.load(kg_database_path, cameo_taxonomy, source=kg_source)
+            if kg_backend is None:
+                # streamed from data_kg in chunks, without loading the KG in memory
+                kg_backend = SQLiteBackend.build(kg_database_path, data_kg_path, cameo_taxonomy, source=kg_source)
+        else:
+            # deduplicated, date-sorted and dictionary-encoded event view used by all KG filters
+            event_index = EventIndex.load(event_index_dir, source=kg_source)
+            if event_index is None:
+                event_index = EventIndex(_load_table('data_kg'))
+                event_index.save(event_index_dir, source=kg_source)
+            kg_backend = ArrayBackend(event_index, cameo_taxonomy, load_count_cube=partial(_load_count_cube, event_index, kg_source))
+
+        # docids, date order and (date, title) index of the data_news rows, which are the documents of the news indexes
+        news_metadata = NewsMetadata.load(news_metadata_dir, source=news_source)
+        if news_metadata is None:
+            data_news = load_table(data_news_path, categorical_columns=['Date'], int_columns=['Docid'], columns=['Docid', 'Date', 'Title'])
+            news_metadata = NewsMetadata.build(data_news['Docid'], data_news['Date'], data_news['Title'])
+            news_metadata.save(news_metadata_dir, source=news_source)
+        news_docids, news_row_of_docid = news_metadata.docids, news_metadata.row_of_docid
+        news_date_order, news_title_index = news_metadata.date_order, news_metadata.title_index
+
+        # article bodies live in a memory-mapped store, decoded on demand by docid; set MIRAI_ARTICLE_COMPRESSION="zstd"
+        # to compress them
+        article_compression = os.environ.get('MIRAI_ARTICLE_COMPRESSION') or None
+        if ArticleStore.is_current(article_store_dir, news_source, article_compression):
+            article_store = ArticleStore(article_store_dir)
+        else:
+            data_news = load_table(data_news_path, categorical_columns=['Date'], int_columns=['Docid'], columns=['Docid', 'Text'])
+            article_store = ArticleStore.build(article_store_dir, data_news['Docid'], data_news['Text'], compression=article_compression, source=news_source)
+
+        def titles():
+            return pd.Series(news_title_index.titles(range(len(news_metadata))))
+
+        def texts():
+            return pd.Series(article_store.get_many(news_docids))
+
+        # load the BM25 index over the title and text of all news articles, or build and save it on first use
+        bm25_index = BM25Index.load(bm25_index_dir, source=news_source)
+        if bm25_index is None or len(bm25_index) != len(news_metadata):
+            bm25_index = BM25Index.build(titles() + ' ' + texts())
+            bm25_index.save(bm25_index_dir, source=news_source)
+
+        # load the lowercase inverted index of the words in the title and text of all news articles, for the keyword filters
+        keyword_index = KeywordIndex.load(keyword_index_dir, source=news_source)
+        if keyword_index is None or len(keyword_index) != len(news_metadata):
+            keyword_index = KeywordIndex.build(zip(titles(), texts()))
+            keyword_index.save(keyword_index_dir, source=news_source)
+
+        _data_loaded = True
+
+def __getattr__(name):
+    if name == 'DEFAULT_END_DATE':
+        return get_default_end_date()
+    # load the data on first access of a data attribute from outside the module
+    if name in _data_names:
+        _load_data()
+        return globals()[name]
+    if name in _table_names:
+        with _data_lock:
+            if name not in globals():
+                globals()[name] = _load_table(name)
+        return globals()[name]
+    if name in _embedding_names:
+        _load_embeddings()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # load country data
-dict_iso2alternames = json.load(open('./../data/info/dict_iso2alternames_GeoNames.json'))
-country_embeddings = np.load('./../data/info/country_embeddings.npy')
+dict_iso2alternames = json.load(open(os.path.join(DATA_DIR, 'info', 'dict_iso2alternames_GeoNames.json')))
 
 # create a dictionary mapping country names to ISO codes
 dict_countryname2iso = {}
@@ -46,9 +183,11 @@ for iso, names in dict_iso2alternames.items():
     for name in names:
         dict_countryname2iso[name] = iso
 
+# local resolver of country names over all alternate names, tried before the embedding fallback
+country_resolver = CountryResolver(dict_iso2alternames)
+
 # load relation data
-dict_code2relation = json.load(open('./../data/info/dict_code2relation.json'))
-relation_embeddings = np.load('./../data/info/relation_embeddings.npy')
+dict_code2relation = json.load(open(os.path.join(DATA_DIR, 'info', 'dict_code2relation.json')))
 
 # create a dictionary mapping relation names or descriptions to CAMEO codes
 dict_relation2code = {}
@@ -56,36 +195,139 @@ for code, info in dict_code2relation.items():
     dict_relation2code[info['Name']] = code
     dict_relation2code[info['Description']] = code
 
+# parent/child structure of the CAMEO codes, resolving relation filters into boolean masks over code ids
+cameo_taxonomy = CameoTaxonomy(dict_code2relation.keys())
+
+# embedding backend for names that miss the exact-match dictionaries: 'openai' (default) or 'local' for offline use
+embedding_backend = get_embedding_backend(os.environ.get('MIRAI_EMBEDDING_BACKEND', 'openai'))
+
+# persistent LRU cache of embedded names, keyed by (model, normalized text) and shared across runs; opened with the
+# embeddings, under DATA_DIR like the embeddings themselves
+embedding_cache_path = os.path.join(DATA_DIR, 'info', 'embedding_cache.sqlite')
+
+# version of the API results, part of the keys of the persisted results: bump it whenever a change to the API functions
+# changes what they return for the same data and arguments
+RESULT_VERSION = 2
+
+# LRU cache of KG and news API results, keyed on the canonicalized arguments and DEFAULT_END_DATE
+# set MIRAI_RESULT_CACHE to an SQLite file path to also persist the results between runs
+result_cache = ResultCache(os.environ.get('MIRAI_RESULT_CACHE'),
+                           namespace=':'.join([f'v{RESULT_VERSION}', source_signature(data_kg_path), source_signature(data_news_path)]))
+
+# the country and relation embeddings and their nearest-neighbour search are loaded by the first name that misses the
+# exact-match dictionaries, like the KG and news data
+_embedding_names = ['country_embeddings', 'relation_embeddings', 'country_neighbors', 'relation_neighbors', 'embedding_cache']
+_embeddings_loaded = False
+
+def _load_embeddings():
+    global country_embeddings, relation_embeddings, country_neighbors, relation_neighbors, embedding_cache, _embeddings_loaded
+    if _embeddings_loaded:
+        return
+    with _data_lock:
+        if _embeddings_loaded:
+            return
+        embedding_cache = EmbeddingCache(embedding_cache_path)
+        country_embeddings = np.load(os.path.join(DATA_DIR, 'info', 'country_embeddings.npy'))
+        relation_embeddings = np.load(os.path.join(DATA_DIR, 'info', 'relation_embeddings.npy'))
+        if not isinstance(embedding_backend, OpenAIEmbeddingBackend):
+            # the shipped embedding matrices are in the OpenAI space, so embed the reference names with the selected backend
+            country_names = [names for names in dict_iso2alternames.values()]
+            name_embeddings = embedding_backend.embed([name for names in country_names for name in names])
+            country_embeddings = np.add.reduceat(name_embeddings, np.cumsum([0] + [len(names) for names in country_names[:-1]])) / np.array([[len(names)] for names in country_names])
+            relation_embeddings = embedding_backend.embed([info['Name'] + ' ' + info['Description'] for info in dict_code2relation.values()])
+
+        # nearest-neighbour search over the normalized country and relation embeddings
+        country_neighbors = NearestNeighbors(list(dict_iso2alternames.keys()), country_embeddings)
+        relation_neighbors = NearestNeighbors(list(dict_code2relation.keys()), relation_embeddings)
+        _embeddings_loaded = True
+
 # embedding functions
-def get_embedding(text, model="text-embedding-3-small"):
-   text = text.replace("\n", " ")
-   return openai.Embedding.create(input = [text], model=model).data[0].embedding
+def get_embedding(text):
+    return get_embeddings([text])[0]
+
+def get_embeddings(texts):
+    # embeds all texts with a single backend request for the cache misses
+    _load_embeddings()
+    return embed_texts(texts, embedding_backend, embedding_cache)
 
-def cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+class _Interned:
+    """
+    Base of the immutable value types: one shared instance per distinct value (flyweight), validated once.
+
+    Constructing a value that was already constructed returns the shared instance without repeating the validation of
+    its attributes. _fields lists the attributes that identify a value, in constructor order.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._instances = {}
+
+    def __new__(cls, *args, **kwargs):
+        # look up the shared instance of the value; malformed arguments are left to __init__ to reject
+        try:
+            key = args + tuple(kwargs[field] for field in cls._fields[len(args):])
+            instance = cls._instances.get(key) if len(args) + len(kwargs) == len(cls._fields) else None
+        except (KeyError, TypeError):
+            instance = None
+        return instance if instance is not None else super().__new__(cls)
+
+    def _is_interned(self) -> bool:
+        return hasattr(self, self._fields[0])
+
+    def _init_fields(self, *values):
+        # set the attributes of a newly validated value and share it
+        for field, value in zip(self._fields, values):
+            object.__setattr__(self, field, value)
+        type(self)._instances[values] = self
+
+    @classmethod
+    def _from_fields(cls, *values):
+        # shared instance of an already validated value, e.g. when unpickling cached results
+        instance = cls._instances.get(values)
+        if instance is None:
+            instance = object.__new__(cls)
+            instance._init_fields(*values)
+        return instance
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Objects of class {type(self).__name__} are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Objects of class {type(self).__name__} are immutable")
+
+    def __reduce__(self):
+        return (type(self)._from_fields, tuple(getattr(self, field) for field in self._fields))
 
 @dataclass
-class Date:
+class Date(_Interned):
     """Represents a date."""
+    __slots__ = ('date',)
+    _fields = ('date',)
     date: str # Date in the format 'YYYY-MM-DD'
     # Example: Date("2022-01-01")
 
     def __init__(self, date: str):
-        # check type
-        if not isinstance(date, str):
-            raise ValueError(f"Attribute 'date' of class Date must be a string in the format 'YYYY-MM-DD', but received: {date} in type {type(date)}")
-
-        # check if date is in the correct format by trying to convert it to a date object
-        try:
-            datetime.datetime.strptime(date, '%Y-%m-%d')
-        except ValueError:
-            raise ValueError(f"Date must be in the format 'YYYY-MM-DD', but received: {date}")
+        if not self._is_interned():
+            # check type
+            if not isinstance(date, str):
+                raise ValueError(f"Attribute 'date' of class Date must be a string in the format 'YYYY-MM-DD', but received: {date} in type {type(date)}")
+
+            # check if date is in the correct format by trying to convert it to a date object
+            try:
+                datetime.datetime.strptime(date, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"Date must be in the format 'YYYY-MM-DD', but received: {date}")
+        # the bounds change with the default end date, so they are checked on every construction
         if date < DEFAULT_START_DATE:
             raise ValueError(f"Date must be on or after {DEFAULT_START_DATE}, but received: {date}")
-        if DEFAULT_END_DATE and date > DEFAULT_END_DATE:
-            raise ValueError(f"Date must be on or before the current date {DEFAULT_END_DATE}, but received: {date}")
+        end_date = get_default_end_date()
+        if end_date and date > end_date:
+            raise ValueError(f"Date must be on or before the current date {end_date}, but received: {date}")
 
-        self.date = date
+        if not self._is_interned():
+            self._init_fields(date)
 
     def __str__(self):
         return f"Date('{self.date}')"
@@ -114,7 +356,7 @@ class DateRange:
             raise ValueError(f"Attribute 'end_date' of class DateRange must be a Date object, but received type {type(end_date)}")
 
         self.start_date = start_date if start_date else Date(DEFAULT_START_DATE)
-        self.end_date = end_date if end_date else Date(DEFAULT_END_DATE)
+        self.end_date = end_date if end_date else Date(get_default_end_date())
         if start_date and end_date and start_date.date > end_date.date:
             raise ValueError("Start date must be before or equal to end date, but received: start_date={}, end_date={}".format(start_date.date, end_date.date))
 
@@ -130,12 +372,16 @@ class DateRange:
         return False
 
 @dataclass
-class ISOCode:
+class ISOCode(_Interned):
     """Represents an ISO alpha-3 country code."""
+    __slots__ = ('code',)
+    _fields = ('code',)
     code: str # 3-letter ISO code
     # Example: ISOCode("USA")
 
     def __init__(self, code: str):
+        if self._is_interned():
+            return
         # check type
         if not isinstance(code, str):
             raise ValueError(f"Attribute 'code' of class ISOCode must be a string, but received type {type(code)}")
@@ -144,7 +390,7 @@ class ISOCode:
             raise ValueError(f"ISO code must be a 3-letter string, but received: {code}")
         if code not in dict_iso2alternames:
             raise ValueError(f"ISO code must be a valid ISO alpha-3 country code, but received: {code}")
-        self.code = code
+        self._init_fields(code)
 
     def __str__(self):
         return f"ISOCode('{self.code}')"
@@ -158,13 +404,17 @@ class ISOCode:
         return False
 
 @dataclass
-class Country:
+class Country(_Interned):
     """Represents a country entity."""
+    __slots__ = ('iso_code', 'name')
+    _fields = ('iso_code', 'name')
     iso_code: ISOCode
     name: str
     # Example: Country(iso_code=ISOCode("USA"), name="United States")
 
     def __init__(self, iso_code: ISOCode, name: str):
+        if self._is_interned():
+            return
         # check type
         if not isinstance(iso_code, ISOCode):
             raise ValueError(f"Attribute 'iso_code' of class Country must be an ISOCode object, but received type {type(iso_code)}")
@@ -173,8 +423,7 @@ class Country:
 
         if dict_iso2alternames[iso_code.code][0] != name:
             raise ValueError(f"Country name must match the name corresponding to the ISO code, but received: {name} for ISO code: {iso_code.code}")
-        self.iso_code = iso_code
-        self.name = name
+        self._init_fields(iso_code, name)
 
     def __str__(self):
         return f"Country(iso_code={self.iso_code}, name='{self.name}')"
@@ -188,12 +437,16 @@ class Country:
         return False
 
 @dataclass
-class CAMEOCode:
+class CAMEOCode(_Interned):
     """Represents a CAMEO verb code."""
+    __slots__ = ('code',)
+    _fields = ('code',)
     code: str # 2-digit CAMEO code for first level relations, 3-digit CAMEO code for second level relations
     # Example: CAMEOCode("01"), CAMEOCode("010")
 
     def __init__(self, code: str):
+        if self._is_interned():
+            return
         # check type
         if not isinstance(code, str):
             raise ValueError(f"Attribute 'code' of class CAMEOCode must be a string, but received type {type(code)}")
@@ -202,7 +455,7 @@ class CAMEOCode:
             raise ValueError(f"CAMEO code must be a valid 2 or 3-digit string defined in the 'Conflict and Mediation Event Observations' Codebook, but received: {code}")
         if code not in dict_code2relation:
             raise ValueError(f"CAMEO code must be a valid CAMEO code defined in the 'Conflict and Mediation Event Observations' Codebook, but received: {code}")
-        self.code = code
+        self._init_fields(code)
 
     def __str__(self):
         return f"CAMEOCode('{self.code}')"
@@ -216,14 +469,18 @@ class CAMEOCode:
         return False
 
 @dataclass
-class Relation:
+class Relation(_Interned):
     """Represents a relation."""
+    __slots__ = ('cameo_code', 'name', 'description')
+    _fields = ('cameo_code', 'name', 'description')
     cameo_code: CAMEOCode
     name: str
     description: str # A brief description of what event the relation represents
     # Example: Relation(cameo_code=CAMEOCode("010"), name="Make statement, not specified", description="All public statements expressed verbally or in action, not otherwise specified."
 
     def __init__(self, cameo_code: CAMEOCode, name: str, description: str):
+        if self._is_interned():
+            return
         # check type
         if not isinstance(cameo_code, CAMEOCode):
             raise ValueError(f"Attribute 'cameo_code' of class Relation must be a CAMEOCode object, but received type {type(cameo_code)}")
@@ -236,9 +493,7 @@ class Relation:
             raise ValueError(f"Relation name must match the name corresponding to the CAMEO code, but received: {name} for CAMEO code {cameo_code.code}")
         if dict_code2relation[cameo_code.code]['Description'] != description:
             raise ValueError(f"Relation description must match the description corresponding to the CAMEO code, but received: {description} for CAMEO code {cameo_code.code}")
-        self.cameo_code = cameo_code
-        self.name = name
-        self.description = description
+        self._init_fields(cameo_code, name, description)
 
     def __str__(self):
         return f"Relation(cameo_code={self.cameo_code}, name='{self.name}', description='{self.description}')"
@@ -252,8 +507,10 @@ class Relation:
         return False
 
 @dataclass
-class Event:
+class Event(_Interned):
     """Represents an event characterized by date, head entity, relation, and tail entity."""
+    __slots__ = ('date', 'head_entity', 'relation', 'tail_entity')
+    _fields = ('date', 'head_entity', 'relation', 'tail_entity')
     date: Date
     head_entity: ISOCode
     relation: CAMEOCode
@@ -261,6 +518,8 @@ class Event:
     # Example: Event(date=Date("2022-01-01"), head_entity=ISOCode("USA"), relation=CAMEOCode("010"), tail_entity=ISOCode("CAN"))
 
     def __init__(self, date: Date, head_entity: ISOCode, relation: CAMEOCode, tail_entity: ISOCode):
+        if self._is_interned():
+            return
         # check type
         if not isinstance(date, Date):
             raise ValueError(f"Attribute 'date' of class Event must be a Date object, but received type {type(date)}")
@@ -271,10 +530,7 @@ class Event:
         if not isinstance(tail_entity, ISOCode):
             raise ValueError(f"Attribute 'tail_entity' of class Event must be an ISOCode object, but received type {type(tail_entity)}")
 
-        self.date = date
-        self.head_entity = head_entity
-        self.relation = relation
-        self.tail_entity = tail_entity
+        self._init_fields(date, head_entity, relation, tail_entity)
 
     def __str__(self):
         return f"Event(date={self.date}, head_entity={self.head_entity}, relation={self.relation}, tail_entity={self.tail_entity})"
@@ -341,19 +597,44 @@ def map_country_name_to_iso(name: str) -> List[Country]:
     if not isinstance(name, str):
         raise ValueError(f"Input 'name' must be a string, but received type {type(name)}")
 
-    if name in dict_countryname2iso:
-        return [Country(iso_code=ISOCode(dict_countryname2iso[name]), name=name)]
-    else:
-        # get top 5 ISO codes with the highest cosine similarity
-        name_embeddings = get_embedding(name)
-        similarities = cosine_similarity(country_embeddings, name_embeddings)
-        top_indices = np.argsort(similarities)[::-1][:5]
-        countries = []
-        for idx in top_indices:
-            iso_code = list(dict_iso2alternames.keys())[idx]
-            curr_name = dict_iso2alternames[iso_code][0]
-            countries.append(Country(iso_code=ISOCode(iso_code), name=curr_name))
-        return countries
+    return map_country_names_to_iso([name])[0]
+
+def map_country_names_to_iso(names: List[str]) -> List[List[Country]]:
+    """
+    Maps a list of country names to the most likely corresponding Country objects with ISO codes.
+
+    Parameters:
+        names (List[str]): The country names to map.
+
+    Returns:
+        List[List[Country]]: For each name, the result of map_country_name_to_iso.
+
+    Example:
+        >>> map_country_names_to_iso(["China", "Korea"])
+        [[Country(iso_code=ISOCode("CHN"), name="China")], [Country(iso_code=ISOCode("KOR"), name="Republic of Korea"), Country(iso_code=ISOCode("PRK"), name="Democratic People's Republic of Korea")]]
+    """
+    # check type
+    if not isinstance(names, list):
+        raise ValueError(f"Input 'names' must be a list, but received type {type(names)}")
+    if not all(isinstance(name, str) for name in names):
+        raise ValueError(f"Elements in 'names' must be strings")
+
+    results = [None] * len(names)
+    missing = []
+    for idx, name in enumerate(names):
+        # resolve exact, normalized, prefix and misspelled alternate names locally
+        tier, iso_codes = country_resolver.resolve(name)
+        if iso_codes:
+            results[idx] = [Country(iso_code=ISOCode(iso_code), name=dict_iso2alternames[iso_code][0]) for iso_code in iso_codes]
+        else:
+            missing.append(idx)
+    if missing:
+        _load_embeddings()
+        # get top 5 ISO codes with the highest cosine similarity, embedding all unmatched names at once
+        name_embeddings = get_embeddings([names[idx] for idx in missing])
+        for idx, iso_codes in zip(missing, country_neighbors.query_keys(name_embeddings, k=5)):
+            results[idx] = [Country(iso_code=ISOCode(iso_code), name=dict_iso2alternames[iso_code][0]) for iso_code in iso_codes]
+    return results
 
 def map_iso_to_country_name(iso_code: ISOCode) -> str:
     """
@@ -393,19 +674,43 @@ def map_relation_description_to_cameo(description: str) -> List[Relation]:
     if not isinstance(description, str):
         raise ValueError(f"Input 'description' must be a string, but received type {type(description)}")
 
-    if description in dict_relation2code:
-        code = dict_relation2code[description]
-        return [Relation(cameo_code=CAMEOCode(code), name=dict_code2relation[code]['Name'], description=dict_code2relation[code]['Description'])]
-    else:
-        # get top 5 CAMEO codes with the highest cosine similarity
-        description_embedding = get_embedding(description)
-        similarities = cosine_similarity(relation_embeddings, description_embedding)
-        top_indices = np.argsort(similarities)[::-1][:5]
-        relations = []
-        for idx in top_indices:
-            code = list(dict_code2relation.keys())[idx]
-            relations.append(Relation(cameo_code=CAMEOCode(code), name=dict_code2relation[code]['Name'], description=dict_code2relation[code]['Description']))
-        return relations
+    return map_relation_descriptions_to_cameo([description])[0]
+
+def map_relation_descriptions_to_cameo(descriptions: List[str]) -> List[List[Relation]]:
+    """
+    Maps a list of relation descriptions to the most likely Relation objects.
+
+    Parameters:
+        descriptions (List[str]): The relation descriptions to map.
+
+    Returns:
+        List[List[Relation]]: For each description, the result of map_relation_description_to_cameo.
+
+    Example:
+        >>> map_relation_descriptions_to_cameo(["Fight", "military aid"])
+        [[Relation(cameo_code=CAMEOCode("19"), name="Fight", description="All uses of conventional force and acts of war typically by organized armed groups.")], [Relation(cameo_code=CAMEOCode("071"), name="Provide economic aid", description=...), ...]]
+    """
+    # check type
+    if not isinstance(descriptions, list):
+        raise ValueError(f"Input 'descriptions' must be a list, but received type {type(descriptions)}")
+    if not all(isinstance(description, str) for description in descriptions):
+        raise ValueError(f"Elements in 'descriptions' must be strings")
+
+    results = [None] * len(descriptions)
+    missing = []
+    for idx, description in enumerate(descriptions):
+        if description in dict_relation2code:
+            code = dict_relation2code[description]
+            results[idx] = [Relation(cameo_code=CAMEOCode(code), name=dict_code2relation[code]['Name'], description=dict_code2relation[code]['Description'])]
+        else:
+            missing.append(idx)
+    if missing:
+        _load_embeddings()
+        # get top 5 CAMEO codes with the highest cosine similarity, embedding all unmatched descriptions at once
+        description_embeddings = get_embeddings([descriptions[idx] for idx in missing])
+        for idx, codes in zip(missing, relation_neighbors.query_keys(description_embeddings, k=5)):
+            results[idx] = [Relation(cameo_code=CAMEOCode(code), name=dict_code2relation[code]['Name'], description=dict_code2relation[code]['Description']) for code in codes]
+    return results
 
 def map_cameo_to_relation(cameo_code: CAMEOCode) -> Relation:
     """
@@ -448,8 +753,7 @@ def get_parent_relation(cameo_code: CAMEOCode) -> Relation:
 
     if len(cameo_code.code) != 3:
         raise ValueError("Only second level relations are accepted, but received: {}".format(cameo_code.code))
-    parent_code =cameo_code.code[:2]
-    return map_cameo_to_relation(CAMEOCode(parent_code))
+    return map_cameo_to_relation(CAMEOCode(cameo_taxonomy.parent_of(cameo_code.code)))
 
 def get_child_relations(cameo_code: CAMEOCode) -> List[Relation]:
     """
@@ -471,11 +775,7 @@ def get_child_relations(cameo_code: CAMEOCode) -> List[Relation]:
 
     if len(cameo_code.code) != 2:
         raise ValueError("Only first level relations are accepted, but received: {}".format(cameo_code.code))
-    children = []
-    for code, info in dict_code2relation.items():
-        if code[:2] == cameo_code.code and len(code) == 3:
-            children.append(Relation(cameo_code=CAMEOCode(code), name=info['Name'], description=info['Description']))
-    return children
+    return [map_cameo_to_relation(CAMEOCode(code)) for code in cameo_taxonomy.children_of(cameo_code.code)]
 
 def get_sibling_relations(cameo_code: CAMEOCode) -> List[Relation]:
     """
@@ -499,12 +799,53 @@ def get_sibling_relations(cameo_code: CAMEOCode) -> List[Relation]:
         return get_child_relations(get_parent_relation(cameo_code).cameo_code)
     elif len(cameo_code.code) == 2:
         # get '01' to '20' relations
-        first_level_codes = [str(i).zfill(2) for i in range(1, 21)]
-        relations = []
-        for code in first_level_codes:
-            relations.append(map_cameo_to_relation(CAMEOCode(code)))
-        return relations
+        return [map_cameo_to_relation(CAMEOCode(code)) for code in cameo_taxonomy.first_level_codes()]
 
+def _date_bounds(date_range: Optional[DateRange] = None) -> Tuple[Optional[str], Optional[str]]:
+    # the default end date and the date range both become bounds of a slice of the date-sorted index
+    start_date, end_date = None, get_default_end_date()
+    if date_range:
+        start_date = date_range.start_date.date
+        end_date = min(end_date, date_range.end_date.date) if end_date else date_range.end_date.date
+    return start_date, end_date
+
+def _event_query(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None,
+                 interacted_entities: Optional[List[ISOCode]] = None, entity_role: Optional[str] = None) -> EventQuery:
+    # the conditions of a KG query as passed to the backend, empty lists meaning no condition
+    # if first level relations are listed, all second level relations under them are included
+    start_date, end_date = _date_bounds(date_range)
+    return EventQuery(start_date=start_date, end_date=end_date,
+                      head_codes=[iso.code for iso in head_entities] if head_entities else None,
+                      tail_codes=[iso.code for iso in tail_entities] if tail_entities else None,
+                      relation_mask=cameo_taxonomy.mask([code.code for code in relations]) if relations else None,
+                      interacted_codes=[iso.code for iso in interacted_entities] if interacted_entities else None,
+                      entity_role=entity_role)
+
+def _news_rows_of(docids: np.ndarray) -> np.ndarray:
+    # rows of data_news holding the given docids, in data_news order
+    docids = docids[docids < len(news_row_of_docid)]
+    rows = news_row_of_docid[docids]
+    return np.sort(rows[rows >= 0])
+
+def _keyword_mask(news_rows: np.ndarray, keywords: List[str]) -> np.ndarray:
+    # whether each article contains at least one of the keywords, ignoring case, in the title or text string
+    return keyword_index.match(keywords, news_rows, lambda rows: zip(news_title_index.titles(rows.tolist()), article_store.get_many(news_docids[rows])))
+
+def _build_events(events: List[Tuple[str, str, str, str]]) -> List[Event]:
+    # builds the events from the (date, head, relation, tail) strings of the backend, constructing each distinct date and code once
+    date_objects = {date: Date(date) for date in {event[0] for event in events}}
+    entity_objects = {code: ISOCode(code) for code in {event[1] for event in events} | {event[3] for event in events}}
+    relation_objects = {code: CAMEOCode(code) for code in {event[2] for event in events}}
+    return [Event(date_objects[date], entity_objects[head], relation_objects[relation], entity_objects[tail])
+            for date, head, relation, tail in events]
+
+def _entity_distribution(ranked: List[Tuple[str, int]]) -> Dict[ISOCode, int]:
+    return {ISOCode(code): count for code, count in ranked}
+
+def _relation_distribution(ranked: List[Tuple[str, int]]) -> Dict[CAMEOCode, int]:
+    return {CAMEOCode(code): count for code, count in ranked}
+
+@result_cache.memoize(get_default_end_date)
 def count_events(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None) -> int:
     """
     Counts the number of events in the knowledge graph based on specified conditions.
@@ -538,34 +879,24 @@ def count_events(date_range: Optional[DateRange] = None, head_entities: Optional
     if relations and not all(isinstance(code, CAMEOCode) for code in relations):
         raise ValueError(f"Elements in 'relations' must be CAMEOCode objects")
 
-    # process data_kg by filtering based on the specified conditions
-    curr_data = data_kg.copy()
-    curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
-    curr_data = curr_data[curr_data['DateStr'] <= DEFAULT_END_DATE]
-    if date_range:
-        curr_data = curr_data[(curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
-    if head_entities:
-        curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in head_entities])]
-    if tail_entities:
-        curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in tail_entities])]
-    if relations:
-        # if first level relations are listed, include all second level relations under them
-        for code in relations:
-            if len(code.code) == 2:
-                relations.extend([CAMEOCode(c) for c in dict_code2relation if c[:2] == code.code and len(c) == 3])
-        curr_data = curr_data[curr_data['EventBaseCode'].isin([code.code for code in relations])]
-    return len(curr_data)
-
-def get_events(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, text_description: Optional[str] = None) -> List[Event]:
+    _load_data()
+    # count the events based on the specified conditions
+    # if first level relations are listed, include all second level relations under them
+    return kg_backend.count(_event_query(date_range, head_entities, tail_entities, relations))
+
+@result_cache.memoize(get_default_end_date)
+def get_events(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, text_description: Optional[str] = None, limit: int = 30, offset: int = 0) -> List[Event]:
     """
     Retrieves events from the knowledge graph based on specified conditions.
     Inherits common filter parameters from count_events. See count_events for more details on these parameters.
 
     Additional Parameters:
         text_description (Optional[str]): Textual description to match with the source news articles of events. If None, the returned events are sorted by date in descending order; otherwise, sorted by relevance of the source news article to the description.
+        limit (int): Maximum number of events to return. Defaults to 30.
+        offset (int): Number of top-ranked events to skip, to page through the results of the same conditions. Defaults to 0.
 
     Returns:
-        List[Event]: A list of maximum 30 events matching the specified conditions.
+        List[Event]: A list of maximum limit events matching the specified conditions.
 
     Example:
         >>> get_events(date_range=DateRange(start_date=Date("2022-01-01"), end_date=Date("2022-01-31")), head_entities=[ISOCode("USA"), ISOCode("CHN")], tail_entities=None, relations=[CAMEOCode("010")], text_description="economic trade")
@@ -588,62 +919,42 @@ def get_events(date_range: Optional[DateRange] = None, head_entities: Optional[L
         raise ValueError(f"Elements in 'relations' must be CAMEOCode objects")
     if text_description and not isinstance(text_description, str):
         raise ValueError(f"Input 'text_description' must be a string, but received type {type(text_description)}")
-
-    # process data_kg by filtering based on the specified conditions
-    curr_data = data_kg.copy()
-    curr_data = curr_data[curr_data['DateStr'] <= DEFAULT_END_DATE]
-    if date_range:
-        curr_data = curr_data[(curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
-    if head_entities:
-        curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in head_entities])]
-    if tail_entities:
-        curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in tail_entities])]
-    if relations:
-        # if first level relations are listed, include all second level relations under them
-        for code in relations:
-            if len(code.code) == 2:
-                relations.extend([CAMEOCode(c) for c in dict_code2relation if c[:2] == code.code and len(c) == 3])
-        curr_data = curr_data[curr_data['EventBaseCode'].isin([code.code for code in relations])]
+    if not isinstance(limit, int) or limit < 0:
+        raise ValueError(f"Input 'limit' must be a non-negative integer, but received: {limit}")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Input 'offset' must be a non-negative integer, but received: {offset}")
+
+    _load_data()
+    # filter the events based on the specified conditions
+    # if first level relations are listed, include all second level relations under them
+    query = _event_query(date_range, head_entities, tail_entities, relations)
     if not text_description:
-        # get max 30 events from the filtered data
-        events = []
-        curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
-        # sorted by date in descending order
-        curr_data.sort_values(by='DateStr', ascending=False, inplace=True)
-        count = 0
-        for _, row in curr_data.iterrows():
-            if count >= 30:
-                break
-            events.append(Event(date=Date(row['DateStr']), head_entity=ISOCode(row['Actor1CountryCode']), relation=CAMEOCode(row['EventBaseCode']), tail_entity=ISOCode(row['Actor2CountryCode'])))
-        return events[:30]
+        # get the unique events ranked offset to offset + limit from the filtered data, sorted by date in descending order
+        return _build_events(kg_backend.latest_events(query, limit, offset))
     else:
-        # concat the Docids list of current data to get the news articles
-        docids_list = [eval(docids) for docids in curr_data['Docids'].unique().tolist()]
-        docids = list(set([item for sublist in docids_list for item in sublist]))
-        docids = [str(docid) for docid in docids]
-        news_articles = data_news[data_news['Docid'].isin(docids)]
-        # get the max 30 docids with the highest BM25 score to the text_description
-        corpus = news_articles['Title'] + ' ' + news_articles['Text']
-        tokenized_corpus = [doc.split(" ") for doc in corpus]
-        bm25 = BM25Okapi(tokenized_corpus)
+        # gather the source docids of the filtered events to get the news articles
+        event_docids, docid_events = kg_backend.event_docid_pairs(query)
+        news_rows = _news_rows_of(np.unique(event_docids))
+        # score the candidate articles by BM25 to the text_description
         tokenized_query = text_description.split(" ")
-        doc_scores = bm25.get_scores(tokenized_query)
-        top_indices = np.argsort(doc_scores)[::-1][:30]
-        news_articles = news_articles.iloc[top_indices]
-        docids = news_articles['Docid'].tolist()
-        # get max 30 events from the filtered data
-        events = set()
-        for docid in docids:
-            if len(events) >= 30:
-                break
-            doc_curr_data = curr_data[curr_data['Docid'] == docid]
-            # reverse the order of the events to get the latest events first
-            doc_curr_data = doc_curr_data.sort_values(by='DateStr', ascending=False)
-            for _, row in doc_curr_data.iterrows():
-                events.add(Event(date=Date(row['DateStr']), head_entity=ISOCode(row['Actor1CountryCode']), relation=CAMEOCode(row['EventBaseCode']), tail_entity=ISOCode(row['Actor2CountryCode'])))
-        return list(events)
-
-def get_entity_distribution(date_range: Optional[DateRange] = None, involved_relations: Optional[List[CAMEOCode]] = None, interacted_entities: Optional[List[ISOCode]] = None, entity_role: Optional[str] = None) -> Dict[ISOCode, int]:
+        doc_scores = bm25_index.get_scores(tokenized_query, news_rows)
+        # collect the events of the articles in order of relevance until offset + limit events are found; each candidate
+        # article is the source of at least one filtered event, but articles share events, so the articles are ranked
+        # in slices of as many articles as events are still missing
+        events = {}
+        n_ranked = 0
+        while len(events) < offset + limit and n_ranked < len(news_rows):
+            top_indices = top_ranked(doc_scores, offset + limit - len(events), n_ranked, later_ties_first=True)
+            n_ranked += len(top_indices)
+            for docid in news_docids[news_rows[top_indices]].tolist():
+                if len(events) >= offset + limit:
+                    break
+                # reverse the order of the events to get the latest events first
+                events.update(dict.fromkeys(_build_events(kg_backend.latest_events_of(docid_events[event_docids == docid]))))
+        return list(events)[offset:offset + limit]
+
+@result_cache.memoize(get_default_end_date)
+def get_entity_distribution(date_range: Optional[DateRange] = None, involved_relations: Optional[List[CAMEOCode]] = None, interacted_entities: Optional[List[ISOCode]] = None, entity_role: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> Dict[ISOCode, int]:
     """
     Gets the distribution of entities in the knowledge graph under specified conditions.
 
@@ -652,6 +963,8 @@ def get_entity_distribution(date_range: Optional[DateRange] = None, involved_rel
         involved_relations (Optional[List[CAMEOCode]]): List of relations that the returned entities must be involved in any of. If first level relations are listed, all second level relations under them are included. If None, all relations are included.
         interacted_entities (Optional[List[ISOCode]]): List of entities that the returned entities must have interacted with any of. If None, all entities are included.
         entity_role (Optional[EntityRole]): Specifies the role of the returned entity in the events. Options are 'head', 'tail', or 'both'. If 'both' or None, the returned entity can be either head or tail.
+        limit (Optional[int]): Maximum number of entities to return, i.e. the top entities by count. If None, all entities are returned.
+        offset (int): Number of top entities to skip, to page through the distribution. Defaults to 0.
 
     Returns:
         Dict[ISOCode, int]: A dictionary mapping returned entities' ISO codes to the number of events with the specified conditions in which they are involved, sorted by counts in descending order.
@@ -673,35 +986,19 @@ def get_entity_distribution(date_range: Optional[DateRange] = None, involved_rel
         raise ValueError(f"Elements in 'interacted_entities' must be ISOCode objects")
     if entity_role and entity_role not in ['head', 'tail', 'both']:
         raise ValueError(f"Input 'entity_role' must be a string 'head', 'tail', or 'both', but received: {entity_role}")
-
-    # process data_kg by filtering based on the specified conditions
-    curr_data = data_kg.copy()
-    curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
-    curr_data = curr_data[curr_data['DateStr'] <= DEFAULT_END_DATE]
-    if date_range:
-        curr_data = curr_data[(curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
-    if involved_relations:
-        # if first level relations are listed, include all second level relations under them
-        for code in involved_relations:
-            if len(code.code) == 2:
-                involved_relations.extend([CAMEOCode(c) for c in dict_code2relation if c[:2] == code.code and len(c) == 3])
-        curr_data = curr_data[curr_data['EventBaseCode'].isin([code.code for code in involved_relations])]
-    if interacted_entities:
-        if entity_role=='head':
-            curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in interacted_entities])]
-        elif entity_role=='tail':
-            curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in interacted_entities])]
-        else:
-            curr_data = curr_data[(curr_data['Actor1CountryCode'].isin([iso.code for iso in interacted_entities])) | (curr_data['Actor2CountryCode'].isin([iso.code for iso in interacted_entities]))]
-    # count the number of events for each entity
-    entity_counts = curr_data['Actor1CountryCode']._append(curr_data['Actor2CountryCode']).value_counts()
-    entity_counts = entity_counts.to_dict()
-    # sort the dictionary by values in descending order
-    entity_counts = dict(sorted(entity_counts.items(), key=lambda item: item[1], reverse=True))
-    entity_counts = {ISOCode(key): value for key, value in entity_counts.items()}
-    return entity_counts
-
-def get_relation_distribution(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None) -> Dict[CAMEOCode, int]:
+    if limit is not None and (not isinstance(limit, int) or limit < 0):
+        raise ValueError(f"Input 'limit' must be a non-negative integer, but received: {limit}")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Input 'offset' must be a non-negative integer, but received: {offset}")
+
+    _load_data()
+    # count the number of events for each entity based on the specified conditions, sorted by counts in descending order
+    # if first level relations are listed, include all second level relations under them
+    query = _event_query(date_range, relations=involved_relations, interacted_entities=interacted_entities, entity_role=entity_role)
+    return _entity_distribution(kg_backend.entity_distribution(query, limit, offset))
+
+@result_cache.memoize(get_default_end_date)
+def get_relation_distribution(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, limit: Optional[int] = None, offset: int = 0) -> Dict[CAMEOCode, int]:
     """
     Gets the distribution of second level relations in the knowledge graph under specified conditions.
 
@@ -709,6 +1006,8 @@ def get_relation_distribution(date_range: Optional[DateRange] = None, head_entit
         date_range (Optional[DateRange]): Range of dates to filter the events. If None, all dates are included.
         head_entities (Optional[List[ISOCode]]): List of head entities that the events must involve any of. If None, all head entities are included.
         tail_entities (Optional[List[ISOCode]]): List of tail entities that the events must involve any of. If None, all tail entities are included.
+        limit (Optional[int]): Maximum number of relations to return, i.e. the top relations by count. If None, all relations are returned.
+        offset (int): Number of top relations to skip, to page through the distribution. Defaults to 0.
 
     Returns:
         Dict[CAMEOCode, int]: A dictionary mapping second level relations' CAMEO codes to the number of events with the specified conditions in which they are involved, sorted by counts in descending order.
@@ -728,25 +1027,111 @@ def get_relation_distribution(date_range: Optional[DateRange] = None, head_entit
         raise ValueError(f"Input 'tail_entities' must be a list, but received type {type(tail_entities)}")
     if tail_entities and not all(isinstance(iso, ISOCode) for iso in tail_entities):
         raise ValueError(f"Elements in 'tail_entities' must be ISOCode objects")
+    if limit is not None and (not isinstance(limit, int) or limit < 0):
+        raise ValueError(f"Input 'limit' must be a non-negative integer, but received: {limit}")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Input 'offset' must be a non-negative integer, but received: {offset}")
+
+    _load_data()
+    # count the number of events for each relation based on the specified conditions, sorted by counts in descending order
+    query = _event_query(date_range, head_entities, tail_entities)
+    return _relation_distribution(kg_backend.relation_distribution(query, limit, offset))
+
+# element types of the list filters accepted by the KG functions
+_list_filter_types = {'head_entities': ISOCode, 'tail_entities': ISOCode, 'relations': CAMEOCode,
+                      'involved_relations': CAMEOCode, 'interacted_entities': ISOCode}
+
+def _check_filter_specs(filter_specs: List[dict], parameters: List[str]):
+    # each spec holds keyword arguments of the corresponding single query function, checked as that function does
+    if not isinstance(filter_specs, list):
+        raise ValueError(f"Input 'filter_specs' must be a list, but received type {type(filter_specs)}")
+    for spec in filter_specs:
+        if not isinstance(spec, dict):
+            raise ValueError(f"Elements in 'filter_specs' must be dictionaries, but received type {type(spec)}")
+        unknown = [name for name in spec if name not in parameters]
+        if unknown:
+            raise ValueError(f"Filter specs only accept the keys {parameters}, but received: {unknown}")
+        for name, value in spec.items():
+            if name == 'date_range' and value and not isinstance(value, DateRange):
+                raise ValueError(f"Input 'date_range' must be a DateRange object, but received type {type(value)}")
+            if name == 'entity_role' and value and value not in ['head', 'tail', 'both']:
+                raise ValueError(f"Input 'entity_role' must be a string 'head', 'tail', or 'both', but received: {value}")
+            if name == 'limit' and value is not None and (not isinstance(value, int) or value < 0):
+                raise ValueError(f"Input 'limit' must be a non-negative integer, but received: {value}")
+            if name == 'offset' and (not isinstance(value, int) or value < 0):
+                raise ValueError(f"Input 'offset' must be a non-negative integer, but received: {value}")
+            if name in _list_filter_types and value and not isinstance(value, list):
+                raise ValueError(f"Input '{name}' must be a list, but received type {type(value)}")
+            if name in _list_filter_types and value and not all(isinstance(item, _list_filter_types[name]) for item in value):
+                raise ValueError(f"Elements in '{name}' must be {_list_filter_types[name].__name__} objects")
+
+def count_events_many(filter_specs: List[dict]) -> List[int]:
+    """
+    Counts the number of events in the knowledge graph for each of many sets of conditions, in one pass.
 
-    # process data_kg by filtering based on the specified conditions
-    curr_data = data_kg.copy()
-    curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
-    curr_data = curr_data[curr_data['DateStr'] <= DEFAULT_END_DATE]
-    if date_range:
-        curr_data = curr_data[(curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
-    if head_entities:
-        curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in head_entities])]
-    if tail_entities:
-        curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in tail_entities])]
-    # count the number of events for each relation
-    relation_counts = curr_data['EventBaseCode'].value_counts()
-    relation_counts = relation_counts.to_dict()
-    # sort the dictionary by values in descending order
-    relation_counts = dict(sorted(relation_counts.items(), key=lambda item: item[1], reverse=True))
-    relation_counts = {CAMEOCode(key): value for key, value in relation_counts.items()}
-    return relation_counts
+    Parameters:
+        filter_specs (List[dict]): List of conditions, each a dictionary of keyword arguments of count_events (date_range, head_entities, tail_entities, relations). Missing keys mean no condition.
+
+    Returns:
+        List[int]: For each set of conditions, the result of count_events.
+
+    Example:
+        >>> count_events_many([{"head_entities": [ISOCode("USA")], "tail_entities": [ISOCode("CHN")]}, {"head_entities": [ISOCode("CHN")], "tail_entities": [ISOCode("USA")], "relations": [CAMEOCode("19")]}])
+        [1523, 12]
+    """
+    # check type
+    _check_filter_specs(filter_specs, ['date_range', 'head_entities', 'tail_entities', 'relations'])
+
+    _load_data()
+    # the backend evaluates the specs together, e.g. the specs with the same date range in one pass
+    return kg_backend.count_many([_event_query(**spec) for spec in filter_specs])
+
+def get_entity_distribution_many(filter_specs: List[dict]) -> List[Dict[ISOCode, int]]:
+    """
+    Gets the distribution of entities in the knowledge graph for each of many sets of conditions, in one pass.
+
+    Parameters:
+        filter_specs (List[dict]): List of conditions, each a dictionary of keyword arguments of get_entity_distribution (date_range, involved_relations, interacted_entities, entity_role, limit, offset). Missing keys mean no condition.
+
+    Returns:
+        List[Dict[ISOCode, int]]: For each set of conditions, the result of get_entity_distribution.
+
+    Example:
+        >>> get_entity_distribution_many([{"involved_relations": [CAMEOCode("19")], "interacted_entities": [ISOCode("USA")]}, {"involved_relations": [CAMEOCode("19")], "interacted_entities": [ISOCode("CHN")]}])
+        [{ISOCode("USA"): 210, ISOCode("IRQ"): 35, ...}, {ISOCode("CHN"): 48, ISOCode("TWN"): 9, ...}]
+    """
+    # check type
+    _check_filter_specs(filter_specs, ['date_range', 'involved_relations', 'interacted_entities', 'entity_role', 'limit', 'offset'])
+
+    _load_data()
+    queries = [_event_query(spec.get('date_range'), relations=spec.get('involved_relations'), interacted_entities=spec.get('interacted_entities'),
+                            entity_role=spec.get('entity_role')) for spec in filter_specs]
+    distributions = kg_backend.entity_distribution_many(queries, [spec.get('limit') for spec in filter_specs], [spec.get('offset', 0) for spec in filter_specs])
+    return [_entity_distribution(ranked) for ranked in distributions]
+
+def get_relation_distribution_many(filter_specs: List[dict]) -> List[Dict[CAMEOCode, int]]:
+    """
+    Gets the distribution of second level relations in the knowledge graph for each of many sets of conditions, in one pass.
+
+    Parameters:
+        filter_specs (List[dict]): List of conditions, each a dictionary of keyword arguments of get_relation_distribution (date_range, head_entities, tail_entities, limit, offset). Missing keys mean no condition.
+
+    Returns:
+        List[Dict[CAMEOCode, int]]: For each set of conditions, the result of get_relation_distribution.
 
+    Example:
+        >>> get_relation_distribution_many([{"head_entities": [ISOCode("USA")], "tail_entities": [ISOCode("CHN")]}, {"head_entities": [ISOCode("CHN")], "tail_entities": [ISOCode("USA")]}])
+        [{CAMEOCode("042"): 120, CAMEOCode("036"): 85, ...}, {CAMEOCode("042"): 98, CAMEOCode("112"): 40, ...}]
+    """
+    # check type
+    _check_filter_specs(filter_specs, ['date_range', 'head_entities', 'tail_entities', 'limit', 'offset'])
+
+    _load_data()
+    queries = [_event_query(spec.get('date_range'), spec.get('head_entities'), spec.get('tail_entities')) for spec in filter_specs]
+    distributions = kg_backend.relation_distribution_many(queries, [spec.get('limit') for spec in filter_specs], [spec.get('offset', 0) for spec in filter_specs])
+    return [_relation_distribution(ranked) for ranked in distributions]
+
+@result_cache.memoize(get_default_end_date)
 def count_news_articles(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, keywords: Optional[List[str]] = None) -> int:
     """
     Counts the number of news articles based on specified conditions.
@@ -785,42 +1170,29 @@ def count_news_articles(date_range: Optional[DateRange] = None, head_entities: O
     if keywords and not all(isinstance(keyword, str) for keyword in keywords):
         raise ValueError(f"Elements in 'keywords' must be strings")
 
-    # process data_kg by filtering based on the specified conditions
-    curr_data = data_kg.copy()
-    curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
-    curr_data = curr_data[curr_data['DateStr'] <= DEFAULT_END_DATE]
-    if date_range:
-        curr_data = curr_data[(curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
-    if head_entities:
-        curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in head_entities])]
-    if tail_entities:
-        curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in tail_entities])]
-    if relations:
-        # if first level relations are listed, include all second level relations under them
-        for code in relations:
-            if len(code.code) == 2:
-                relations.extend([CAMEOCode(c) for c in dict_code2relation if c[:2] == code.code and len(c) == 3])
-        curr_data = curr_data[curr_data['EventBaseCode'].isin([code.code for code in relations])]
-    # concat the Docids list of current data to get the news articles
-    docids_list = [eval(docids) for docids in curr_data['Docids'].unique().tolist()]
-    docids = list(set([item for sublist in docids_list for item in sublist]))
-    docids = [str(docid) for docid in docids]
-    news_articles = data_news[data_news['Docid'].isin(docids)]
+    _load_data()
+    # filter the events based on the specified conditions
+    # if first level relations are listed, include all second level relations under them
+    # gather the source docids of the filtered events to get the news articles
+    news_rows = _news_rows_of(kg_backend.docids_of(_event_query(date_range, head_entities, tail_entities, relations)))
     if keywords:
         # filter the news articles that contain at least one of the keywords in the title or text string
-        news_articles = news_articles[news_articles['Title'].str.contains('|'.join(keywords), case=False) | news_articles['Text'].str.contains('|'.join(keywords), case=False)]
-    return len(news_articles)
+        news_rows = news_rows[_keyword_mask(news_rows, keywords)]
+    return len(news_rows)
 
-def get_news_articles(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, keywords: Optional[List[str]] = None, text_description: Optional[str] = None) -> List[Tuple[Date, str]]:
+@result_cache.memoize(get_default_end_date)
+def get_news_articles(date_range: Optional[DateRange] = None, head_entities: Optional[List[ISOCode]] = None, tail_entities: Optional[List[ISOCode]] = None, relations: Optional[List[CAMEOCode]] = None, keywords: Optional[List[str]] = None, text_description: Optional[str] = None, limit: int = 15, offset: int = 0) -> List[Tuple[Date, str]]:
     """
     Retrieves news articles based on specified conditions.
     Inherits common filter parameters from count_news_articles. See count_news_articles for more details on these parameters.
 
     Additional Parameters:
         text_description (Optional[str]): Textual description to match with the news articles. If None, the returned articles are sorted by date in descending order; otherwise, sorted by relevance to the description.
+        limit (int): Maximum number of news articles to return. Defaults to 15.
+        offset (int): Number of top-ranked news articles to skip, to page through the results of the same conditions. Defaults to 0.
 
     Returns:
-        List[Tuple[Date, str]]: A list of maximum 15 news articles matching the specified conditions, each represented by a tuple of date and title.
+        List[Tuple[Date, str]]: A list of maximum limit news articles matching the specified conditions, each represented by a tuple of date and title.
 
     Example:
         >>> get_news_articles(date_range=DateRange(start_date=Date("2022-01-01"), end_date=Date("2022-01-31")), head_entities=[ISOCode("USA"), ISOCode("CHN")], tail_entities=[ISOCode("USA"), ISOCode("CHN")], relations=[CAMEOCode("010")], keywords=["trade"], text_description="Economic trade is encouraged between USA and China.")
@@ -847,48 +1219,30 @@ def get_news_articles(date_range: Optional[DateRange] = None, head_entities: Opt
         raise ValueError(f"Elements in 'keywords' must be strings")
     if text_description and not isinstance(text_description, str):
         raise ValueError(f"Input 'text_description' must be a string, but received type {type(text_description)}")
-
-    # process data_kg by filtering based on the specified conditions
-    curr_data = data_kg.copy()
-    curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
-    curr_data = curr_data[curr_data['DateStr'] <= DEFAULT_END_DATE]
-    if date_range:
-        curr_data = curr_data[
-            (curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
-    if head_entities:
-        curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in head_entities])]
-    if tail_entities:
-        curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in tail_entities])]
-    if relations:
-        # if first level relations are listed, include all second level relations under them
-        for code in relations:
-            if len(code.code) == 2:
-                relations.extend([CAMEOCode(c) for c in dict_code2relation if c[:2] == code.code and len(c) == 3])
-        curr_data = curr_data[curr_data['EventBaseCode'].isin([code.code for code in relations])]
-    docids_list = [eval(docids) for docids in curr_data['Docids'].unique().tolist()]
-    docids = list(set([item for sublist in docids_list for item in sublist]))
-    docids = [str(docid) for docid in docids]
-    news_articles = data_news[data_news['Docid'].isin(docids)]
+    if not isinstance(limit, int) or limit < 0:
+        raise ValueError(f"Input 'limit' must be a non-negative integer, but received: {limit}")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Input 'offset' must be a non-negative integer, but received: {offset}")
+
+    _load_data()
+    # filter the events based on the specified conditions
+    # if first level relations are listed, include all second level relations under them
+    news_rows = _news_rows_of(kg_backend.docids_of(_event_query(date_range, head_entities, tail_entities, relations)))
     if keywords:
         # filter the news articles that contain at least one of the keywords in the title or text string
-        news_articles = news_articles[news_articles['Title'].str.contains('|'.join(keywords), case=False) | news_articles['Text'].str.contains('|'.join(keywords), case=False)]
+        news_rows = news_rows[_keyword_mask(news_rows, keywords)]
     if not text_description:
-        # get max 15 news articles from the filtered data
+        # get the news articles ranked offset to offset + limit from the filtered data
         # sorted by date in descending order
-        news_articles.sort_values(by='Date', ascending=False, inplace=True)
-        news_articles = news_articles[['Date', 'Title']].head(15)
-        return [(Date(row['Date']), row['Title']) for _, row in news_articles.iterrows()]
+        news_rows = news_date_order.latest_first(news_rows, limit, offset)
     else:
-        # get the max 15 news articles with the highest BM25 score to the text_description
-        corpus = news_articles['Title'] + ' ' + news_articles['Text']
-        tokenized_corpus = [doc.split(" ") for doc in corpus]
-        bm25 = BM25Okapi(tokenized_corpus)
+        # get the news articles ranked offset to offset + limit by BM25 score to the text_description, scoring only the candidate articles
         tokenized_query = text_description.split(" ")
-        doc_scores = bm25.get_scores(tokenized_query)
-        top_indices = np.argsort(doc_scores)[::-1][:15]
-        news_articles = news_articles.iloc[top_indices]
-        return [(Date(row['Date']), row['Title']) for _, row in news_articles.iterrows()]
+        doc_scores = bm25_index.get_scores(tokenized_query, news_rows)
+        news_rows = news_rows[top_ranked(doc_scores, limit, offset, later_ties_first=True)]
+    return [(Date(ordinal_to_date(date)), title) for date, title in zip(news_date_order.dates[news_rows].tolist(), news_title_index.titles(news_rows.tolist()))]
 
+@result_cache.memoize(get_default_end_date)
 def browse_news_article(date: Date, title: str) -> str:
     """
     Retrieves the full text of a news article by its title.
@@ -912,8 +1266,9 @@ def browse_news_article(date: Date, title: str) -> str:
     if not isinstance(title, str):
         raise ValueError(f"Input 'title' must be a string, but received type {type(title)}")
 
-    # process data_news to find the news article with the specified date and title
-    curr_data = data_news[(data_news['Date'] == date.date) & (data_news['Title'] == title)]
-    if len(curr_data) == 0:
+    _load_data()
+    # look up the news article with the specified date and title, falling back to titles differing only in case or whitespace
+    row = news_title_index.lookup(date.date, title)
+    if row is None:
         raise ValueError(f"No news article found with the specified date {date.date} and title {title}")
-    return f"{date}:\n{title}\n{curr_data['Text'].values[0]}"
\ No newline at end of file
+    return f"{date}:\n{news_title_index.title(row)}\n{article_store.get(news_docids[row])}"
\ No newline at end of file
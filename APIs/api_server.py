@@ -0,0 +1,142 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "APIs")))
+sys.path.append(os.path.abspath(os.path.join(os.getcwd(), "../APIs")))
+
+from multiprocessing.connection import Listener
+from typing import Optional, Tuple, Union
+import argparse
+import ipaddress
+import secrets
+import socket
+import stat
+import threading
+
+import APIs.api_implementation as api
+
+
+# public API functions served to clients; the value types and the default end date stay in the client process
+SERVED_FUNCTIONS = ['map_country_name_to_iso', 'map_country_names_to_iso', 'map_iso_to_country_name',
+                    'map_relation_description_to_cameo', 'map_relation_descriptions_to_cameo', 'map_cameo_to_relation',
+                    'get_parent_relation', 'get_child_relations', 'get_sibling_relations',
+                    'count_events', 'get_events', 'get_entity_distribution', 'get_relation_distribution',
+                    'count_events_many', 'get_entity_distribution_many', 'get_relation_distribution_many',
+                    'count_news_articles', 'get_news_articles', 'browse_news_article']
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    Parses 'host:port' into a TCP address and anything else (e.g. '/tmp/mirai_api.sock') into a Unix socket path.
+
+    Requests are unpickled, so only loopback hosts are accepted: a reachable server would run the code of any client.
+    """
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        host = host.strip('[]')
+        if host != 'localhost':
+            try:
+                is_loopback = ipaddress.ip_address(host).is_loopback
+            except ValueError:
+                is_loopback = False
+            if not is_loopback:
+                raise ValueError(f"The API server only listens on localhost, but received the host: {host}")
+        return host, int(port)
+    return address
+
+
+# file of the generated shared secret, readable by the current user only
+authkey_path = os.environ.get('MIRAI_API_AUTHKEY_FILE', os.path.expanduser('~/.mirai_api_authkey'))
+
+
+def get_authkey(create: bool = False) -> Optional[bytes]:
+    """
+    Shared secret of the server and its clients, required to connect: MIRAI_API_AUTHKEY if set, and otherwise the key
+    in authkey_path, which the server generates on first start if create is set. Returns None if there is no key.
+    """
+    authkey = os.environ.get('MIRAI_API_AUTHKEY')
+    if authkey:
+        return authkey.encode('utf-8')
+    if create and not os.path.exists(authkey_path):
+        try:
+            fd = os.open(authkey_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass # created concurrently by another server
+        else:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+    if not os.path.exists(authkey_path):
+        return None
+    with open(authkey_path) as f:
+        return f.read().strip().encode('utf-8')
+
+
+def _remove_stale_socket(path: str):
+    # the socket file of a server that exited without closing it would make binding fail; a live server is kept
+    if not os.path.exists(path) or not stat.S_ISSOCK(os.stat(path).st_mode):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+            return
+    raise OSError(f"Another API server is already listening at {path}")
+
+
+def _call(name: str, args: tuple, kwargs: dict, end_date: Optional[str]):
+    if name not in SERVED_FUNCTIONS:
+        return False, AttributeError(f"API function {name!r} is not served")
+    # the default end date is per thread, so the calls of different connections run concurrently, each with the end
+    # date of the client that sent it
+    api.set_default_end_date(end_date)
+    try:
+        return True, getattr(api, name)(*args, **kwargs)
+    except Exception as e:
+        return False, e
+
+
+def _serve_connection(connection):
+    # requests of a connection are answered one at a time, in the order they were sent
+    with connection:
+        while True:
+            try:
+                name, args, kwargs, end_date = connection.recv()
+            except (EOFError, ConnectionResetError):
+                return
+            connection.send(_call(name, args, kwargs, end_date))
+
+
+def serve(address: str):
+    """Loads the data and indexes once and answers API calls from api_client connections until interrupted."""
+    api._load_data()
+    api._load_embeddings()
+    address = parse_address(address)
+    authkey = get_authkey(create=True)
+    if isinstance(address, str):
+        _remove_stale_socket(address)
+        # the socket is created accessible to the current user only
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(address, authkey=authkey)
+        finally:
+            os.umask(umask)
+    else:
+        listener = Listener(address, authkey=authkey)
+    with listener:
+        print(f"Serving the MIRAI APIs at {address}")
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                # a client failing authentication must not stop the server
+                print(f"Rejected a connection: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(connection,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--address", type=str, default=os.environ.get('MIRAI_API_SERVER', '/tmp/mirai_api.sock'),
+                        help="Unix socket path, or host:port to listen on localhost TCP")
+    args = parser.parse_args()
+    serve(args.address)
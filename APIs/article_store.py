@@ -0,0 +1,116 @@
+from typing import Iterable, List, Optional
+import json
+import os
+import threading
+import numpy as np
+
+
+class ArticleStore:
+    """
+    Offset-indexed store of article bodies, memory-mapped and decoded on demand by docid.
+
+    The bodies are concatenated into one blob file (texts.bin) as UTF-8, optionally compressed article by article with
+    zstd and a dictionary trained on the corpus, so that any single article can be decoded without its neighbours.
+    The body of the i-th article is blob[offsets[i]:offsets[i + 1]], and entry_of_docid maps docids to articles. Only
+    the pages of the articles actually read are brought into memory, and they are shared between processes.
+    """
+
+    def __init__(self, directory: str, mmap_mode: str = 'r'):
+        self.directory = directory
+        self.meta = json.load(open(os.path.join(directory, 'meta.json')))
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode=mmap_mode)
+        self.entry_of_docid = np.load(os.path.join(directory, 'entry_of_docid.npy'), mmap_mode=mmap_mode)
+        blob_path = os.path.join(directory, 'texts.bin')
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r') if os.path.getsize(blob_path) > 0 else np.zeros(0, dtype=np.uint8)
+        self.dictionary = None
+        # zstd decompressors must not be used by several threads at once, so each thread creates its own
+        self.local = threading.local()
+        if self.meta['compression'] == 'zstd':
+            import zstandard
+            dictionary_path = os.path.join(directory, 'dictionary.bin')
+            self.dictionary = zstandard.ZstdCompressionDict(open(dictionary_path, 'rb').read()) if os.path.exists(dictionary_path) else None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __contains__(self, docid: int):
+        return 0 <= docid < len(self.entry_of_docid) and self.entry_of_docid[docid] >= 0
+
+    @classmethod
+    def build(cls, directory: str, docids: Iterable[int], texts: Iterable[str], compression: Optional[str] = None,
+              level: int = 3, source: Optional[str] = None) -> 'ArticleStore':
+        """
+        Writes the bodies of the given articles to a store in directory and opens it.
+
+        compression is None or 'zstd' (requires the zstandard package). source identifies the data the store was
+        built from (e.g. the signature of data_news.csv), so that stale stores can be detected with is_current().
+        """
+        docids = np.asarray(list(docids), dtype=np.int64)
+        encoded = [('' if not isinstance(text, str) else text).encode('utf-8') for text in texts]
+        if len(encoded) != len(docids):
+            raise ValueError(f"Number of docids ({len(docids)}) must match the number of texts ({len(encoded)})")
+
+        os.makedirs(directory, exist_ok=True)
+        dictionary_path = os.path.join(directory, 'dictionary.bin')
+        if os.path.exists(dictionary_path):
+            os.remove(dictionary_path)
+        if compression == 'zstd':
+            import zstandard
+            try:
+                # a dictionary of the phrases shared across articles makes compressing short articles one by one effective
+                dictionary = zstandard.train_dictionary(112640, encoded)
+                open(dictionary_path, 'wb').write(dictionary.as_bytes())
+            except zstandard.ZstdError:
+                dictionary = None
+            compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+            encoded = [compressor.compress(body) for body in encoded]
+        elif compression is not None:
+            raise ValueError(f"Compression must be None or 'zstd', but received: {compression}")
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(body) for body in encoded], out=offsets[1:])
+        with open(os.path.join(directory, 'texts.bin'), 'wb') as f:
+            for body in encoded:
+                f.write(body)
+        entry_of_docid = np.full(int(docids.max()) + 1 if len(docids) else 0, -1, dtype=np.int64)
+        entry_of_docid[docids] = np.arange(len(docids))
+        np.save(os.path.join(directory, 'offsets.npy'), offsets)
+        np.save(os.path.join(directory, 'entry_of_docid.npy'), entry_of_docid)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'n_docs': len(docids), 'compression': compression, 'source': source}, f)
+        return cls(directory)
+
+    @staticmethod
+    def is_current(directory: str, source: Optional[str] = None, compression: Optional[str] = None) -> bool:
+        """Whether directory holds a complete store built from the given source with the given compression."""
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return False
+        meta = json.load(open(meta_path))
+        return meta.get('source') == source and meta.get('compression') == compression
+
+    def _decode(self, entry: int) -> str:
+        body = self.blob[self.offsets[entry]:self.offsets[entry + 1]].tobytes()
+        if self.meta['compression'] == 'zstd':
+            body = self._decompressor().decompress(body)
+        return body.decode('utf-8')
+
+    def _decompressor(self):
+        decompressor = getattr(self.local, 'decompressor', None)
+        if decompressor is None:
+            import zstandard
+            decompressor = self.local.decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+        return decompressor
+
+    def get(self, docid: int) -> str:
+        """Returns the body of the article with the given docid."""
+        if docid not in self:
+            raise KeyError(f"No article body stored for docid {docid}")
+        return self._decode(int(self.entry_of_docid[docid]))
+
+    def get_many(self, docids: Iterable[int]) -> List[str]:
+        return [self.get(docid) for docid in docids]
+
+    def stats(self) -> dict:
+        """Returns the number of articles, the compression and the stored size of the bodies."""
+        return {'n_docs': len(self), 'compression': self.meta['compression'], 'stored_bytes': int(self.offsets[-1])}
@@ -0,0 +1,142 @@
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional
+import json
+import math
+import os
+import numpy as np
+
+from data_store import save_arrays, load_arrays
+
+
+class BM25Index:
+    """
+    Corpus-wide inverted index for Okapi BM25 scoring over data_news.
+
+    Documents are tokenized with str.split(" "), as in the original per-call BM25Okapi. The index keeps term postings
+    (documents and term frequencies, grouped by term), document lengths and the per-document term lists. Queries
+    score only a candidate subset of documents: the collection statistics (document frequencies, average document length and the epsilon floor of negative IDFs) are computed
+    over the candidates from the index, so the scores equal those of BM25Okapi built over the candidate articles.
+    """
+
+    array_names = ['term_offsets', 'posting_docs', 'posting_tfs', 'doc_lengths', 'doc_term_offsets', 'doc_terms']
+
+    def __init__(self, vocab: List[str], arrays: dict, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.vocab = vocab
+        self.dict_term2id = {term: idx for idx, term in enumerate(vocab)}
+        for name in self.array_names:
+            setattr(self, name, arrays[name])
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, corpus: Iterable[str], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> 'BM25Index':
+        """Tokenizes and indexes the corpus; document i of the corpus gets docno i."""
+        dict_term2id = {}
+        doc_lengths, doc_sizes, doc_terms, doc_tfs = array('i'), array('i'), array('i'), array('i')
+        for doc in corpus:
+            tokens = doc.split(" ")
+            counts = Counter(tokens)
+            doc_lengths.append(len(tokens))
+            doc_sizes.append(len(counts))
+            for term, tf in counts.items():
+                doc_terms.append(dict_term2id.setdefault(term, len(dict_term2id)))
+                doc_tfs.append(tf)
+
+        doc_lengths = np.frombuffer(doc_lengths, dtype=np.int32).copy()
+        doc_terms = np.frombuffer(doc_terms, dtype=np.int32).copy()
+        doc_tfs = np.frombuffer(doc_tfs, dtype=np.int32)
+        doc_term_offsets = np.zeros(len(doc_lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(doc_sizes, dtype=np.int32), out=doc_term_offsets[1:])
+
+        # regroup the (doc, term, tf) entries by term to get the postings, with documents ascending within a term
+        order = np.argsort(doc_terms, kind='stable')
+        doc_of_entry = np.repeat(np.arange(len(doc_lengths), dtype=np.int32), np.diff(doc_term_offsets))
+        doc_freqs = np.bincount(doc_terms, minlength=len(dict_term2id)).astype(np.int32)
+        term_offsets = np.zeros(len(dict_term2id) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=term_offsets[1:])
+
+
+        arrays = {
+            'term_offsets': term_offsets,
+            'posting_docs': doc_of_entry[order],
+            'posting_tfs': doc_tfs[order],
+            'doc_lengths': doc_lengths,
+            'doc_term_offsets': doc_term_offsets,
+            'doc_terms': doc_terms,
+        }
+        return cls(list(dict_term2id.keys()), arrays, k1=k1, b=b, epsilon=epsilon)
+
+    def save(self, directory: str, source: Optional[str] = None):
+        """Saves the index as one .npy file per array plus the vocabulary and parameters; source identifies the indexed data."""
+        os.makedirs(directory, exist_ok=True)
+        # the vocabulary is written before meta.json, which save_arrays writes last
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        with open(os.path.join(directory, 'vocab.json'), 'w') as f:
+            json.dump(self.vocab, f)
+        save_arrays(directory, {name: getattr(self, name) for name in self.array_names}, source=source,
+                    n_docs=len(self), k1=self.k1, b=self.b, epsilon=self.epsilon)
+
+    @classmethod
+    def load(cls, directory: str, source: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional['BM25Index']:
+        """
+        Loads a saved index, or returns None if there is none built from the given source. By default the arrays are
+        memory-mapped rather than read into memory.
+        """
+        loaded = load_arrays(directory, cls.array_names, source=source, mmap_mode=mmap_mode)
+        if loaded is None:
+            return None
+        arrays, meta = loaded
+        vocab = json.load(open(os.path.join(directory, 'vocab.json')))
+        return cls(vocab, arrays, k1=meta['k1'], b=meta['b'], epsilon=meta['epsilon'])
+
+    def _average_idf(self, candidates: np.ndarray) -> float:
+        # mean IDF over every term occurring in the candidate documents, as computed by BM25Okapi over the candidates
+        starts = self.doc_term_offsets[candidates]
+        lengths = self.doc_term_offsets[candidates + 1] - starts
+        shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        _, doc_freqs = np.unique(self.doc_terms[np.arange(lengths.sum()) + shifts], return_counts=True)
+        return float(np.sum(np.log(len(candidates) - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)) / len(doc_freqs))
+
+    def get_scores(self, query: List[str], candidates: np.ndarray) -> np.ndarray:
+        """
+        Scores the candidate documents (docnos) against the tokenized query.
+
+        Returns an array aligned with candidates, equal to BM25Okapi([tokenized docs of candidates]).get_scores(query).
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        scores = np.zeros(len(candidates))
+        if len(candidates) == 0:
+            return scores
+        candidate_of_doc = np.full(len(self), -1, dtype=np.int64)
+        candidate_of_doc[candidates] = np.arange(len(candidates))
+        doc_lengths = self.doc_lengths[candidates]
+        avgdl = int(doc_lengths.sum()) / len(candidates)
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / avgdl)
+
+        average_idf = None
+        for term in query:
+            term_id = self.dict_term2id.get(term)
+            if term_id is None:
+                continue
+            postings = slice(self.term_offsets[term_id], self.term_offsets[term_id + 1])
+            positions = candidate_of_doc[self.posting_docs[postings]]
+            in_candidates = positions >= 0
+            doc_freq = int(in_candidates.sum())
+            if doc_freq == 0:
+                continue
+            positions = positions[in_candidates]
+            tfs = self.posting_tfs[postings][in_candidates]
+            idf = math.log(len(candidates) - doc_freq + 0.5) - math.log(doc_freq + 0.5)
+            if idf < 0:
+                if average_idf is None:
+                    average_idf = self._average_idf(candidates)
+                idf = self.epsilon * average_idf
+            scores[positions] += idf * (tfs * (self.k1 + 1) / (tfs + length_norm[positions]))
+        return scores
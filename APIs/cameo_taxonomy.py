@@ -0,0 +1,107 @@
+from typing import Iterable, List, Optional
+import ast
+import os
+import numpy as np
+
+from event_index import csr_gather
+
+
+def _eval_class_tables() -> dict:
+    # the binary and quad classes are defined once, by agent_evaluation/eval.py; its assignments are read as literals
+    # rather than imported, since importing eval.py changes the working directory and loads the evaluation data
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agent_evaluation', 'eval.py')
+    tables = {}
+    for node in ast.parse(open(path, encoding='utf-8').read()).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) \
+                and node.targets[0].id in ('dict_binary2first', 'dict_quad2first'):
+            tables[node.targets[0].id] = ast.literal_eval(node.value)
+    return tables
+
+# first level relations of each binary and quad class
+_class_tables = _eval_class_tables()
+dict_binary2first = _class_tables['dict_binary2first']
+dict_quad2first = _class_tables['dict_quad2first']
+
+
+class CameoTaxonomy:
+    """
+    Parent/child structure of the CAMEO codes, with relation sets represented as boolean masks over code ids.
+
+    Codes get ids in the order given (the order of dict_code2relation), and the parent of a code is the code without
+    its last digit. subtree[i] is the mask of code i and every code under it, so the mask of a list of relations in
+    which first level relations stand for all the relations under them is the union of a few precomputed rows.
+    Every code also belongs to the binary and quad class of its first level ancestor.
+    """
+
+    def __init__(self, codes: Iterable[str]):
+        self.codes = list(codes)
+        self.dict_code2id = {code: idx for idx, code in enumerate(self.codes)}
+        n_codes = len(self.codes)
+        self.parents = np.array([self.dict_code2id.get(code[:-1], -1) for code in self.codes], dtype=np.int64)
+
+        # children of each code in compressed sparse row form, in code id order
+        child_ids = np.flatnonzero(self.parents >= 0)
+        self.child_offsets = np.zeros(n_codes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parents[child_ids], minlength=n_codes), out=self.child_offsets[1:])
+        self.children = child_ids[np.argsort(self.parents[child_ids], kind='stable')]
+
+        # a code's subtree holds itself and the subtrees of its children, filled from the deepest codes up
+        self.subtree = np.eye(n_codes, dtype=bool)
+        for idx in sorted(child_ids.tolist(), key=lambda idx: -len(self.codes[idx])):
+            self.subtree[self.parents[idx]] |= self.subtree[idx]
+
+        roots = np.arange(n_codes)
+        while (self.parents[roots] >= 0).any():
+            roots = np.where(self.parents[roots] >= 0, self.parents[roots], roots)
+        self.roots = roots
+        self.binary_classes = list(dict_binary2first.keys())
+        self.quad_classes = list(dict_quad2first.keys())
+        self.binary_of = self._classes_of(dict_binary2first)
+        self.quad_of = self._classes_of(dict_quad2first)
+        # class name -> mask over code ids of the codes rolled up into the class
+        self.class_masks = {name: self.binary_of == idx for idx, name in enumerate(self.binary_classes)}
+        self.class_masks.update({name: self.quad_of == idx for idx, name in enumerate(self.quad_classes)})
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code: str):
+        return code in self.dict_code2id
+
+    def _classes_of(self, dict_class2first: dict) -> np.ndarray:
+        # class index of every code through its first level ancestor, -1 for codes outside all classes
+        class_of_first = {first: idx for idx, firsts in enumerate(dict_class2first.values()) for first in firsts}
+        return np.array([class_of_first.get(self.codes[root], -1) for root in self.roots], dtype=np.int64)
+
+    def mask(self, codes: Iterable[str]) -> np.ndarray:
+        """Returns the mask of the given codes and all codes under them; unknown codes match nothing."""
+        ids = [self.dict_code2id[code] for code in codes if code in self.dict_code2id]
+        return self.subtree[ids].any(axis=0)
+
+    def class_mask(self, name: str) -> np.ndarray:
+        """Returns the mask of the codes of a binary class (e.g. 'conflict') or quad class (e.g. 'verbal cooperation')."""
+        if name in self.class_masks:
+            return self.class_masks[name]
+        raise ValueError(f"Class must be one of {self.binary_classes + self.quad_classes}, but received: {name}")
+
+    def codes_of(self, mask: np.ndarray) -> List[str]:
+        return [self.codes[idx] for idx in np.flatnonzero(mask)]
+
+    def vocab_ids(self, vocab: Iterable[str]) -> np.ndarray:
+        """Maps the codes of a vocabulary to code ids, or to len(self) for codes outside the taxonomy."""
+        return np.array([self.dict_code2id.get(code, len(self)) for code in vocab], dtype=np.int64)
+
+    def vocab_table(self, mask: np.ndarray, vocab_ids: np.ndarray) -> np.ndarray:
+        """Translates a mask over code ids into a boolean lookup table over a vocabulary mapped with vocab_ids()."""
+        return np.append(mask, False)[vocab_ids]
+
+    def parent_of(self, code: str) -> Optional[str]:
+        parent = self.parents[self.dict_code2id[code]]
+        return self.codes[parent] if parent >= 0 else None
+
+    def children_of(self, code: str) -> List[str]:
+        children, _ = csr_gather(self.child_offsets, self.children, np.array([self.dict_code2id[code]]))
+        return [self.codes[idx] for idx in children.tolist()]
+
+    def first_level_codes(self) -> List[str]:
+        return [code for code, parent in zip(self.codes, self.parents.tolist()) if parent < 0]
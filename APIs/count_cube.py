@@ -0,0 +1,178 @@
+from typing import Optional, Tuple
+import numpy as np
+
+from data_store import save_arrays, load_arrays
+from event_index import EventIndex
+
+
+class CountCube:
+    """
+    Sparse (day, head, tail, relation) cube of unique event counts with cumulative sums over days.
+
+    Every distinct (head, tail, relation) triple of the event index is a cell. The non-empty (cell, day) entries are
+    stored sorted by cell and day, together with the cumulative event count up to and including each entry, so the
+    number of events of any set of cells within a date range is a difference of two prefix sums, found by binary
+    search. Filters on entities and relations select cells through the lookup tables of the event index, so the cost
+    of a count or distribution depends on the number of matching cells, not on the number of events or the width of
+    the date range.
+
+    Like the event index, the cube is made of flat arrays that save() writes and load() memory-maps read-only.
+    """
+
+    # maximum number of (spec, cell) entries weighted at once by the batched counts
+    max_block_size = 1 << 22
+
+    array_names = ['cell_heads', 'cell_tails', 'cell_relations', 'keys', 'cumulative_counts']
+    group_names = ['relation_groups', 'head_groups', 'tail_groups']
+
+    def __init__(self, event_index: EventIndex):
+        self.event_index = event_index
+        n_entities, n_relations = len(event_index.entity_vocab), len(event_index.relation_vocab)
+        triples, cell_of_event = np.unique(self._triples(event_index), return_inverse=True)
+        cell_of_event = cell_of_event.reshape(-1)
+        self.cell_heads = (triples // (n_entities * n_relations)).astype(np.int16)
+        self.cell_tails = (triples // n_relations % n_entities).astype(np.int16)
+        self.cell_relations = (triples % n_relations).astype(np.int16)
+
+        # days are offsets from the first event day, so that a (cell, day) pair packs into one sortable key
+        self.first_day = int(event_index.dates[0]) if len(event_index) else 0
+        self.n_days = int(event_index.dates[-1]) - self.first_day + 1 if len(event_index) else 0
+        keys, counts = np.unique(cell_of_event.astype(np.int64) * self.n_days + (event_index.dates - self.first_day), return_counts=True)
+        self.keys = keys
+        self.cumulative_counts = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.cumulative_counts[1:])
+
+        # cells grouped by relation, head and tail, for the grouped sums of the batched distributions
+        self.relation_groups = self._groups(self.cell_relations, n_relations)
+        self.head_groups = self._groups(self.cell_heads, n_entities)
+        self.tail_groups = self._groups(self.cell_tails, n_entities)
+
+    def __len__(self):
+        return len(self.cell_heads)
+
+    @staticmethod
+    def _triples(event_index: EventIndex) -> np.ndarray:
+        # (head, tail, relation) of every event packed into one integer
+        n_entities, n_relations = len(event_index.entity_vocab), len(event_index.relation_vocab)
+        return (event_index.heads.astype(np.int64) * n_entities + event_index.tails) * n_relations + event_index.relations
+
+    @classmethod
+    def n_cells_of(cls, event_index: EventIndex) -> int:
+        """Number of cells of the cube over the given event index, without building it."""
+        return len(np.unique(cls._triples(event_index)))
+
+    def save(self, directory: str, source: Optional[str] = None):
+        """Saves the cube as one .npy file per array; source identifies the data it was built from."""
+        arrays = {name: getattr(self, name) for name in self.array_names}
+        for name in self.group_names:
+            arrays[f'{name}_order'], arrays[f'{name}_offsets'] = getattr(self, name)
+        save_arrays(directory, arrays, source=source, first_day=self.first_day, n_days=self.n_days)
+
+    @classmethod
+    def load(cls, directory: str, event_index: EventIndex, source: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional['CountCube']:
+        """Loads a saved cube over the given event index, or returns None if there is none built from the given source."""
+        group_array_names = [f'{name}_{part}' for name in cls.group_names for part in ['order', 'offsets']]
+        loaded = load_arrays(directory, cls.array_names + group_array_names, source=source, mmap_mode=mmap_mode)
+        if loaded is None:
+            return None
+        arrays, meta = loaded
+        cube = cls.__new__(cls)
+        cube.event_index = event_index
+        cube.first_day, cube.n_days = meta['first_day'], meta['n_days']
+        for name in cls.array_names:
+            setattr(cube, name, arrays[name])
+        for name in cls.group_names:
+            setattr(cube, name, (arrays[f'{name}_order'], arrays[f'{name}_offsets']))
+        return cube
+
+    @staticmethod
+    def _groups(keys: np.ndarray, n_keys: int) -> Tuple[np.ndarray, np.ndarray]:
+        # cells ordered by key, and the offsets of the cells of each key in that order
+        offsets = np.zeros(n_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n_keys), out=offsets[1:])
+        return np.argsort(keys, kind='stable'), offsets
+
+    @staticmethod
+    def _grouped_sums(weights: np.ndarray, groups: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        # sums of the (n_specs x n_cells) weights over the cells of each key, as differences of row-wise cumulative sums
+        order, offsets = groups
+        cumulative = np.zeros((len(weights), len(order) + 1), dtype=np.int64)
+        np.cumsum(weights[:, order], axis=1, out=cumulative[:, 1:])
+        return cumulative[:, offsets[1:]] - cumulative[:, offsets[:-1]]
+
+    def _day_bounds(self, start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+        # inclusive range of day offsets, clipped to the days covered by the data
+        lo, hi = self.event_index.date_bounds(start_date, end_date)
+        if lo >= hi:
+            return 0, -1
+        return int(self.event_index.dates[lo]) - self.first_day, int(self.event_index.dates[hi - 1]) - self.first_day
+
+    def select_cells(self, head_table: Optional[np.ndarray] = None, tail_table: Optional[np.ndarray] = None,
+                     relation_table: Optional[np.ndarray] = None) -> np.ndarray:
+        """Returns the cells whose head, tail and relation pass the given boolean lookup tables (None keeps all)."""
+        mask = np.ones(len(self), dtype=bool)
+        if head_table is not None:
+            mask &= head_table[self.cell_heads]
+        if tail_table is not None:
+            mask &= tail_table[self.cell_tails]
+        if relation_table is not None:
+            mask &= relation_table[self.cell_relations]
+        return np.flatnonzero(mask)
+
+    def cell_counts(self, cells: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Returns the number of unique events of each given cell dated within [start_date, end_date]."""
+        first, last = self._day_bounds(start_date, end_date)
+        if first > last:
+            return np.zeros(len(cells), dtype=np.int64)
+        cells = np.asarray(cells, dtype=np.int64)
+        lo = np.searchsorted(self.keys, cells * self.n_days + first, side='left')
+        hi = np.searchsorted(self.keys, cells * self.n_days + last, side='right')
+        return self.cumulative_counts[hi] - self.cumulative_counts[lo]
+
+    def count(self, cells: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> int:
+        return int(self.cell_counts(cells, start_date, end_date).sum())
+
+    def entity_counts(self, cells: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Counts the events of the given cells in which each entity id is head, plus those in which it is tail."""
+        counts = self.cell_counts(cells, start_date, end_date)
+        n_entities = len(self.event_index.entity_vocab)
+        return (np.bincount(self.cell_heads[cells], weights=counts, minlength=n_entities) +
+                np.bincount(self.cell_tails[cells], weights=counts, minlength=n_entities)).astype(np.int64)
+
+    def relation_counts(self, cells: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Counts the events of the given cells for each relation id."""
+        counts = self.cell_counts(cells, start_date, end_date)
+        return np.bincount(self.cell_relations[cells], weights=counts, minlength=len(self.event_index.relation_vocab)).astype(np.int64)
+
+    def cell_masks(self, head_tables: np.ndarray, tail_tables: np.ndarray, relation_tables: np.ndarray) -> np.ndarray:
+        """
+        Selects the cells of many filter specs at once.
+
+        Each argument stacks one boolean lookup table per spec (a row of all True keeps every value); returns the
+        (n_specs x n_cells) boolean matrix of the cells matching each spec.
+        """
+        return head_tables[:, self.cell_heads] & tail_tables[:, self.cell_tails] & relation_tables[:, self.cell_relations]
+
+    def _weighted_blocks(self, masks: np.ndarray, start_date: Optional[str], end_date: Optional[str]):
+        # the event counts of every cell within the date range are computed once and shared by all specs, then weighted
+        # by the masks a block of specs at a time, to bound the size of the (specs x cells) count matrix
+        counts = self.cell_counts(np.arange(len(self)), start_date, end_date)
+        block = max(1, self.max_block_size // max(1, len(self)))
+        for first in range(0, len(masks), block):
+            yield masks[first:first + block] * counts
+
+    def count_many(self, masks: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Counts, for each spec (row of masks), the events of its cells within [start_date, end_date]."""
+        results = [weights.sum(axis=1) for weights in self._weighted_blocks(masks, start_date, end_date)]
+        return np.concatenate(results) if results else np.zeros(0, dtype=np.int64)
+
+    def entity_counts_many(self, masks: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Like entity_counts, for each spec (row of masks); returns an (n_specs x n_entities) matrix."""
+        results = [self._grouped_sums(weights, self.head_groups) + self._grouped_sums(weights, self.tail_groups)
+                   for weights in self._weighted_blocks(masks, start_date, end_date)]
+        return np.concatenate(results) if results else np.zeros((0, len(self.event_index.entity_vocab)), dtype=np.int64)
+
+    def relation_counts_many(self, masks: np.ndarray, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Like relation_counts, for each spec (row of masks); returns an (n_specs x n_relations) matrix."""
+        results = [self._grouped_sums(weights, self.relation_groups) for weights in self._weighted_blocks(masks, start_date, end_date)]
+        return np.concatenate(results) if results else np.zeros((0, len(self.event_index.relation_vocab)), dtype=np.int64)
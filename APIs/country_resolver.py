@@ -0,0 +1,153 @@
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import Dict, List, Tuple
+import re
+import threading
+import unicodedata
+
+
+def normalize_name(name: str) -> str:
+    """Case-folds a country name, strips accents and punctuation, and collapses whitespace."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char)).casefold()
+    name = name.replace('&', ' and ')
+    name = re.sub(r"[-_/,;:()\[\]]", ' ', name)
+    name = re.sub(r"[^\w\s]", '', name)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def char_ngrams(name: str, n: int = 3) -> List[str]:
+    padded = f"  {name} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance: insertions, deletions, substitutions and transpositions of adjacent characters."""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+class CountryResolver:
+    """
+    Local resolution of country names over all alternate names, tried before falling back to embeddings.
+
+    Tiers, in order: exact match, normalized match (case, accents, punctuation and whitespace insensitive), prefix
+    match of the normalized name over the sorted normalized aliases, and fuzzy matching of misspelled names. A fuzzy
+    match has a character trigram similarity of at least min_ngram_similarity, or is within max_edits(name) edits of
+    the name, which catches the short names and abbreviations that have too few trigrams to score high ("chna" has a
+    similarity of 0.55 to "china", "us" one of 0.57 to "usa"). tier_counts records how many lookups each tier
+    answered, including 'embedding' for the fallback.
+    """
+    tiers = ['exact', 'normalized', 'prefix', 'ngram', 'embedding']
+
+    def __init__(self, dict_iso2alternames: Dict[str, List[str]], max_results: int = 5, min_prefix_length: int = 3, min_ngram_similarity: float = 0.7):
+        self.max_results = max_results
+        self.min_prefix_length = min_prefix_length
+        self.min_ngram_similarity = min_ngram_similarity
+
+        self.dict_name2iso = {}
+        self.dict_normalized2isos = OrderedDict()
+        for iso, names in dict_iso2alternames.items():
+            for name in names:
+                self.dict_name2iso.setdefault(name, iso)
+                normalized = normalize_name(name)
+                if normalized:
+                    isos = self.dict_normalized2isos.setdefault(normalized, [])
+                    if iso not in isos:
+                        isos.append(iso)
+
+        # sorted normalized aliases for prefix search
+        self.aliases = sorted(self.dict_normalized2isos.keys())
+
+        # inverted index from character trigram to aliases
+        self.alias_ngrams = [Counter(char_ngrams(alias)) for alias in self.aliases]
+        self.ngram_postings = {}
+        for alias_id, ngrams in enumerate(self.alias_ngrams):
+            for ngram in ngrams:
+                self.ngram_postings.setdefault(ngram, []).append(alias_id)
+
+        self.tier_counts = Counter({tier: 0 for tier in self.tiers})
+        # lookups may run concurrently, e.g. in the threads of concurrent agents
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def max_edits(normalized: str) -> int:
+        # one edit in names of up to 7 characters, two in longer ones
+        return 1 if len(normalized) < 8 else 2
+
+    def _prefix_matches(self, normalized: str) -> List[str]:
+        isos = []
+        # shorter aliases first, as they are the closest completions of the prefix
+        aliases = []
+        idx = bisect_left(self.aliases, normalized)
+        while idx < len(self.aliases) and self.aliases[idx].startswith(normalized):
+            aliases.append(self.aliases[idx])
+            idx += 1
+        for alias in sorted(aliases, key=len):
+            for iso in self.dict_normalized2isos[alias]:
+                if iso not in isos:
+                    isos.append(iso)
+        return isos
+
+    def _ngram_matches(self, normalized: str) -> List[str]:
+        ngrams = Counter(char_ngrams(normalized))
+        overlaps = Counter()
+        for ngram, count in ngrams.items():
+            for alias_id in self.ngram_postings.get(ngram, []):
+                overlaps[alias_id] += min(count, self.alias_ngrams[alias_id][ngram])
+        n_ngrams = sum(ngrams.values())
+        max_edits = self.max_edits(normalized)
+        dict_iso2score = {}
+        for alias_id, overlap in overlaps.items():
+            alias = self.aliases[alias_id]
+            # Dice coefficient between the trigram multisets
+            score = 2 * overlap / (n_ngrams + sum(self.alias_ngrams[alias_id].values()))
+            # an edit changes at most 4 trigrams (3, or 4 for a transposition), so aliases sharing fewer are not within max_edits
+            if score < self.min_ngram_similarity and abs(len(alias) - len(normalized)) <= max_edits and overlap >= n_ngrams - 4 * max_edits:
+                distance = edit_distance(normalized, alias)
+                if distance <= max_edits:
+                    score = max(score, 1 - distance / max(len(alias), len(normalized)))
+                    score = max(score, self.min_ngram_similarity)
+            if score < self.min_ngram_similarity:
+                continue
+            for iso in self.dict_normalized2isos[self.aliases[alias_id]]:
+                dict_iso2score[iso] = max(dict_iso2score.get(iso, 0.0), score)
+        return sorted(dict_iso2score, key=lambda iso: -dict_iso2score[iso])
+
+    def resolve(self, name: str) -> Tuple[str, List[str]]:
+        """
+        Resolves a country name to candidate ISO codes, sorted by relevance.
+
+        Returns the tier that answered and at most max_results ISO codes, or ('embedding', []) if no local tier could
+        resolve the name. The returned tier is counted in tier_counts.
+        """
+        tier, isos = 'embedding', []
+        normalized = normalize_name(name)
+        if name in self.dict_name2iso:
+            tier, isos = 'exact', [self.dict_name2iso[name]]
+        elif normalized in self.dict_normalized2isos:
+            tier, isos = 'normalized', self.dict_normalized2isos[normalized]
+        elif normalized:
+            if len(normalized) >= self.min_prefix_length:
+                isos = self._prefix_matches(normalized)
+            if 0 < len(isos) <= self.max_results:
+                tier = 'prefix'
+            else:
+                isos = self._ngram_matches(normalized)
+                tier = 'ngram' if isos else 'embedding'
+        with self.lock:
+            self.tier_counts[tier] += 1
+        return tier, isos[:self.max_results]
+
+    def stats(self) -> dict:
+        """Returns the number and share of lookups answered by each tier."""
+        with self.lock:
+            tier_counts = dict(self.tier_counts)
+        total = sum(tier_counts.values())
+        return {tier: {'count': tier_counts[tier], 'share': tier_counts[tier] / total if total > 0 else 0.0} for tier in self.tiers}
@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+def source_signature(path: str) -> str:
+    """Identifies a version of a source file by its size and modification time."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_table(csv_path: str, categorical_columns: Iterable[str] = (), int_columns: Iterable[str] = (), columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Loads a tab-separated table through a typed Parquet cache stored next to it.
+
+    On first use, the CSV is parsed with dtype=str, the given columns are converted to categoricals (repeated codes,
+    names and dates) or integers (docids), and the result is written to <name>.parquet with the signature of the CSV.
+    Later loads read the Parquet file, which skips text parsing and keeps the repeated strings as small integer codes.
+    The cache is rebuilt whenever the CSV changes, and CSV parsing is used as is if pyarrow is not installed.
+    If columns is given, only these columns are returned (and read from the cache).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = pq = None
+
+    cache_path = os.path.splitext(csv_path)[0] + '.parquet'
+    signature = source_signature(csv_path).encode('utf-8')
+    if pq is not None and os.path.exists(cache_path):
+        if (pq.read_schema(cache_path).metadata or {}).get(b'mirai_source') == signature:
+            return pq.read_table(cache_path, columns=columns).to_pandas()
+
+    data = pd.read_csv(csv_path, sep='\t', dtype=str)
+    for column in categorical_columns:
+        data[column] = data[column].astype('category')
+    for column in int_columns:
+        data[column] = data[column].astype('int64')
+    if pq is not None:
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'mirai_source': signature})
+        pq.write_table(table, cache_path + '.tmp')
+        os.replace(cache_path + '.tmp', cache_path)
+    return data if columns is None else data[columns]
+
+
+def save_arrays(directory: str, arrays: Dict[str, np.ndarray], source: Optional[str] = None, **meta):
+    """
+    Saves arrays as one .npy file each, with a meta.json holding source (the signature of the data they derive from)
+    and any other metadata. meta.json is written last, so an interrupted save is never loaded as current.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), np.asarray(array))
+    with open(meta_path, 'w') as f:
+        json.dump({**meta, 'source': source}, f)
+
+
+def load_arrays(directory: str, names: Iterable[str], source: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional[Tuple[Dict[str, np.ndarray], dict]]:
+    """
+    Loads arrays saved by save_arrays, along with their metadata, or returns None if they were not saved from source.
+
+    By default the arrays are memory-mapped read-only, so processes loading the same files share their pages.
+    """
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    meta = json.load(open(meta_path))
+    if meta.get('source') != source:
+        return None
+    return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in names}, meta
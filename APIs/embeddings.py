@@ -0,0 +1,190 @@
+from collections import OrderedDict
+from typing import List, Optional
+import atexit
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text before embedding: newlines and runs of whitespace become single spaces."""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class EmbeddingBackend:
+    """Interface of the embedding backends used to map country names and relation descriptions."""
+    model = None # identifies the embedding space, also used as part of the cache key
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds a batch of texts in one request, returning a float32 matrix with one row per text."""
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings, the space of the shipped country_embeddings.npy and relation_embeddings.npy."""
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model = model
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        import openai
+        response = openai.Embedding.create(input=texts, model=self.model)
+        # the response items carry their input index
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.array([item.embedding for item in data], dtype=np.float32)
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic offline embeddings from hashed character n-grams and words.
+
+    Needs no network access or model weights, so name mapping works in sandboxed hosts. The vectors live in their
+    own space: reference matrices must be embedded with the same backend rather than loaded from the shipped
+    OpenAI .npy files.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: tuple = (2, 4)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.model = f"local-hash-{dim}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def _features(self, text: str) -> List[str]:
+        text = text.lower()
+        features = [f"w:{word}" for word in re.findall(r'\w+', text)]
+        padded = f" {text} "
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            features += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                # stable signed feature hashing, independent of PYTHONHASHSEED
+                digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+                embeddings[row, digest % self.dim] += 1.0 if (digest >> 63) else -1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1.0)
+
+
+def get_embedding_backend(name: str) -> EmbeddingBackend:
+    """Returns the embedding backend registered under the given name: 'openai' or 'local'."""
+    if name == 'openai':
+        return OpenAIEmbeddingBackend()
+    elif name == 'local':
+        return LocalEmbeddingBackend()
+    raise ValueError(f"Embedding backend must be 'openai' or 'local', but received: {name}")
+
+
+class EmbeddingCache:
+    """
+    LRU cache of embeddings keyed by (model, normalized text), optionally persisted to an SQLite file.
+
+    The most recently used max_entries embeddings are kept both in memory and on disk; least recently used entries
+    are evicted from both. Hits do not write to the file: their times are kept in memory and written in batches of
+    flush_every, by flush() and at exit. hits, misses and hit_rate() report the effectiveness of the cache.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 100000, flush_every: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # serializes the concurrent name mappings of threads sharing the cache
+        self.lock = threading.RLock()
+        self.db = None
+        self.flush_every = flush_every
+        self.last_used = {} # times of the hits not yet written to the file
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS embeddings (model TEXT, text TEXT, vector BLOB, last_used REAL, PRIMARY KEY (model, text))")
+            self.db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self.db.commit()
+            self.n_stored = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            atexit.register(self.flush)
+
+    def __len__(self):
+        with self.lock:
+            if self.db is not None:
+                return self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return len(self.memory)
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        with self.lock:
+            key = (model, normalize_text(text))
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                self.memory.move_to_end(key)
+            elif self.db is not None:
+                row = self.db.execute("SELECT vector FROM embeddings WHERE model = ? AND text = ?", key).fetchone()
+                if row is not None:
+                    embedding = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, embedding)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.db is not None:
+                self.last_used[key] = time.time()
+                if len(self.last_used) >= self.flush_every:
+                    self.flush()
+            return embedding
+
+    def put(self, model: str, text: str, embedding: np.ndarray):
+        with self.lock:
+            key = (model, normalize_text(text))
+            embedding = np.asarray(embedding, dtype=np.float32)
+            self._remember(key, embedding)
+            if self.db is not None:
+                stored = self.db.execute("SELECT 1 FROM embeddings WHERE model = ? AND text = ?", key).fetchone()
+                self.db.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", key + (embedding.tobytes(), time.time()))
+                self.n_stored += stored is None
+                self.last_used.pop(key, None)
+                if self.n_stored > self.max_entries:
+                    # evict the least recently used entries beyond the capacity, counting those added by other processes
+                    self.flush()
+                    self.db.execute("DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+                    self.n_stored = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self.db.commit()
+
+    def flush(self):
+        """Writes the times of the recent hits to the SQLite file."""
+        with self.lock:
+            if self.db is None or not self.last_used:
+                return
+            self.db.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?", [(used,) + key for key, used in self.last_used.items()])
+            self.db.commit()
+            self.last_used.clear()
+
+    def _remember(self, key: tuple, embedding: np.ndarray):
+        self.memory[key] = embedding
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'size': len(self)}
+
+
+def embed_texts(texts: List[str], backend: EmbeddingBackend, cache: Optional[EmbeddingCache] = None) -> np.ndarray:
+    """Embeds texts through the cache, sending all cache misses to the backend in a single request."""
+    texts = [normalize_text(text) for text in texts]
+    embeddings = [cache.get(backend.model, text) if cache is not None else None for text in texts]
+    # deduplicate the misses so that repeated texts are embedded once
+    missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+    if missing:
+        dict_text2embedding = dict(zip(missing, backend.embed(missing)))
+        for text, embedding in dict_text2embedding.items():
+            if cache is not None:
+                cache.put(backend.model, text, embedding)
+        embeddings = [dict_text2embedding[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+    return np.array(embeddings, dtype=np.float32)
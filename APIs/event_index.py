@@ -0,0 +1,335 @@
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from data_store import save_arrays, load_arrays
+
+
+def date_to_ordinal(date: str) -> int:
+    """Converts a 'YYYY-MM-DD' string to the number of days since 1970-01-01."""
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+
+def ordinal_to_date(ordinal: int) -> str:
+    """Converts a day ordinal back to a 'YYYY-MM-DD' string."""
+    return str(np.datetime64(int(ordinal), 'D'))
+
+
+def parse_docid_lists(docid_lists: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parses Docids strings such as '[12, 5031]' into compressed sparse row form without eval().
+
+    Returns the offsets array (length n + 1) and the concatenated int32 docids; the docids of the i-th string are
+    docids[offsets[i]:offsets[i + 1]].
+    """
+    docid_lists = np.asarray(docid_lists, dtype=str)
+    stripped = np.char.strip(np.char.strip(docid_lists), '[] ')
+    lengths = np.char.count(stripped, ',') + 1
+    lengths[np.char.str_len(stripped) == 0] = 0
+    offsets = np.zeros(len(docid_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    docids = np.array(' '.join(stripped.tolist()).replace(',', ' ').split(), dtype=np.int32)
+    if len(docids) != offsets[-1]:
+        raise ValueError("Docids must be lists of integer docids, e.g. '[12, 5031]'")
+    return offsets, docids
+
+
+def csr_gather(offsets: np.ndarray, values: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenates the CSR slices of the given positions, returning the values and the position owning each value."""
+    starts = offsets[positions]
+    lengths = offsets[positions + 1] - starts
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return values[np.arange(lengths.sum()) + shifts], np.repeat(positions, lengths)
+
+
+def top_ranked(scores: np.ndarray, limit: Optional[int] = None, offset: int = 0, later_ties_first: bool = False) -> np.ndarray:
+    """
+    Returns the indices of the scores ranked offset to offset + limit (all if limit is None) by descending score.
+
+    Ties are ranked by ascending index, or by descending index if later_ties_first. Only the scores reaching the score
+    ranked offset + limit, found with np.partition, are sorted, so beyond one linear pass the cost depends on
+    offset + limit rather than on the number of scores.
+    """
+    scores = np.asarray(scores)
+    end = len(scores) if limit is None else min(len(scores), offset + limit)
+    if offset >= end:
+        return np.zeros(0, dtype=np.int64)
+    indices = np.arange(len(scores))
+    if end < len(scores):
+        threshold = np.partition(scores, len(scores) - end)[len(scores) - end]
+        indices = np.flatnonzero(scores >= threshold)
+    order = np.lexsort((-indices if later_ties_first else indices, -scores[indices]))
+    return indices[order[offset:end]]
+
+
+class DayOffsets:
+    """
+    Offsets of the first row of every day in a date-sorted array of day ordinals.
+
+    offsets[i] is the number of rows dated before first_day + i, so the rows dated within [start, end] are the slice
+    [start_of(start), end_of(end)), found with two array lookups. Both methods also accept arrays of ordinals, to
+    resolve many cutoffs at once.
+    """
+
+    def __init__(self, sorted_dates: np.ndarray):
+        self.first_day = int(sorted_dates[0]) if len(sorted_dates) else 0
+        n_days = int(sorted_dates[-1]) - self.first_day + 1 if len(sorted_dates) else 0
+        self.offsets = np.searchsorted(sorted_dates, np.arange(self.first_day, self.first_day + n_days + 1), side='left').astype(np.int64)
+
+    def start_of(self, ordinal):
+        """Returns the index of the first row dated on or after the given day."""
+        return self.offsets[np.clip(np.asarray(ordinal, dtype=np.int64) - self.first_day, 0, len(self.offsets) - 1)]
+
+    def end_of(self, ordinal):
+        """Returns the index past the last row dated on or before the given day."""
+        return self.start_of(np.asarray(ordinal, dtype=np.int64) + 1)
+
+
+class DateOrder:
+    """
+    Date-sorted order of the rows of a table with a 'YYYY-MM-DD' date column, such as data_news.
+
+    The table itself keeps its row order (which other indexes refer to); rows holds the row numbers sorted by date,
+    with rows of the same day in table order, and day_offsets gives the slice of rows of any date range.
+    """
+
+    def __init__(self, date_strs: np.ndarray):
+        self.dates = np.asarray(date_strs).astype('datetime64[D]').astype(np.int32)
+        self.rows = np.argsort(self.dates, kind='stable')
+        self.day_offsets = DayOffsets(self.dates[self.rows])
+
+    @classmethod
+    def from_arrays(cls, dates: np.ndarray, rows: np.ndarray) -> 'DateOrder':
+        """Rebuilds the order of the given day ordinals from its saved rows."""
+        order = cls.__new__(cls)
+        order.dates, order.rows = dates, rows
+        order.day_offsets = DayOffsets(dates[rows])
+        return order
+
+    def rows_between(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Returns the rows dated within [start_date, end_date], in ascending date order."""
+        lo = 0 if start_date is None else int(self.day_offsets.start_of(date_to_ordinal(start_date)))
+        hi = len(self.rows) if end_date is None else int(self.day_offsets.end_of(date_to_ordinal(end_date)))
+        return self.rows[lo:max(lo, hi)]
+
+    def latest_first(self, rows: np.ndarray, limit: Optional[int] = None, offset: int = 0) -> np.ndarray:
+        """Reorders rows by descending date, keeping table order within a day; limit and offset select a slice."""
+        return rows[top_ranked(self.dates[rows], limit, offset)]
+
+
+class EventIndex:
+    """
+    Materialized, deduplicated and columnar view of data_kg used by the KG and news APIs.
+
+    Each index position is one unique QuadEventCode, represented by its first data_kg row (the row kept by
+    drop_duplicates(subset=['QuadEventCode'])). Positions are sorted by date, with events of the same day kept in
+    data_kg order; dates are stored as integer day ordinals, and ISO codes and CAMEO codes are encoded as small
+    integers into sorted vocabularies. Date filters are slices found through the day offsets, and the other filters
+    are boolean lookups over the encoded columns.
+
+    Posting lists hold the ascending positions of the events of every head, tail, (head, tail) pair and relation, and
+    their sizes serve as cardinality statistics: select() starts from whichever of the date slice and the posting
+    lists of the filters selects the fewest positions, and checks the other filters on those positions only.
+
+    The data_kg rows behind every event and the docids of its source articles (parsed once from Docids) are kept
+    in compressed sparse row form: the rows of the event at position p are
+    event_rows[event_row_offsets[p]:event_row_offsets[p + 1]], and likewise for event_docid_offsets/event_docids.
+
+    All of this is held in flat arrays, which save() writes as .npy files and load() memory-maps read-only, so that
+    processes serving the same data share one copy of the index in the page cache instead of each parsing data_kg.
+    """
+
+    array_names = ['first_rows', 'dates', 'entity_vocab', 'heads', 'tails', 'relation_vocab', 'relations',
+                   'event_rows', 'event_row_offsets', 'event_docid_offsets', 'event_docids']
+    posting_names = ['head_postings', 'tail_postings', 'pair_postings', 'relation_postings']
+
+    def __init__(self, data_kg: pd.DataFrame):
+        # deduplicate by QuadEventCode, keeping the first data_kg row of each event
+        _, first_rows, event_of_row = np.unique(data_kg['QuadEventCode'].to_numpy(), return_index=True, return_inverse=True)
+        event_of_row = event_of_row.reshape(-1)
+        dates = data_kg['DateStr'].to_numpy()[first_rows].astype('datetime64[D]').astype(np.int32)
+        order = np.lexsort((first_rows, dates))
+
+        # position in data_kg of the row representing each event
+        self.first_rows = first_rows[order].astype(np.int64)
+        self.dates = dates[order]
+
+        # head and tail entities share one vocabulary so that codes are comparable across roles
+        heads = data_kg['Actor1CountryCode'].to_numpy()[self.first_rows]
+        tails = data_kg['Actor2CountryCode'].to_numpy()[self.first_rows]
+        # vocabularies are fixed-width string arrays rather than object arrays, so that they can be memory-mapped
+        entity_vocab, entity_codes = np.unique(np.concatenate([heads, tails]), return_inverse=True)
+        self.entity_vocab = entity_vocab.astype(str)
+        entity_codes = entity_codes.reshape(-1)
+        self.heads = entity_codes[:len(heads)].astype(np.int16)
+        self.tails = entity_codes[len(heads):].astype(np.int16)
+
+        relation_vocab, relation_codes = np.unique(data_kg['EventBaseCode'].to_numpy()[self.first_rows], return_inverse=True)
+        self.relation_vocab = relation_vocab.astype(str)
+        self.relations = relation_codes.reshape(-1).astype(np.int16)
+
+        # map every data_kg row to the position of its event and group the rows by position
+        position_of_event = np.empty(len(order), dtype=np.int64)
+        position_of_event[order] = np.arange(len(order))
+        position_of_row = position_of_event[event_of_row]
+        self.event_rows = np.argsort(position_of_row, kind='stable')
+        self.event_row_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(position_of_row, minlength=len(order)), out=self.event_row_offsets[1:])
+
+        # parse the Docids list of every event once
+        self.event_docid_offsets, self.event_docids = parse_docid_lists(data_kg['Docids'].to_numpy()[self.first_rows])
+
+        # posting lists of the positions of each head, tail, (head, tail) pair and relation, as (offsets, positions)
+        n_entities = len(self.entity_vocab)
+        self.head_postings = self._postings(self.heads, n_entities)
+        self.tail_postings = self._postings(self.tails, n_entities)
+        self.pair_postings = self._postings(self.heads.astype(np.int64) * n_entities + self.tails, n_entities * n_entities)
+        self.relation_postings = self._postings(self.relations, len(self.relation_vocab))
+        self._init_lookups()
+
+    def _init_lookups(self):
+        # small structures derived from the arrays, rebuilt rather than saved
+        self.day_offsets = DayOffsets(self.dates)
+        self.dict_entity2id = {code: idx for idx, code in enumerate(self.entity_vocab.tolist())}
+        self.dict_relation2id = {code: idx for idx, code in enumerate(self.relation_vocab.tolist())}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def save(self, directory: str, source: Optional[str] = None):
+        """Saves the index as one .npy file per array; source identifies the data_kg it was built from."""
+        arrays = {name: getattr(self, name) for name in self.array_names}
+        for name in self.posting_names:
+            arrays[f'{name}_offsets'], arrays[f'{name}_positions'] = getattr(self, name)
+        save_arrays(directory, arrays, source=source)
+
+    @classmethod
+    def load(cls, directory: str, source: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional['EventIndex']:
+        """Loads a saved index, or returns None if there is none built from the given source."""
+        posting_array_names = [f'{name}_{part}' for name in cls.posting_names for part in ['offsets', 'positions']]
+        loaded = load_arrays(directory, cls.array_names + posting_array_names, source=source, mmap_mode=mmap_mode)
+        if loaded is None:
+            return None
+        arrays, _ = loaded
+        index = cls.__new__(cls)
+        for name in cls.array_names:
+            setattr(index, name, arrays[name])
+        for name in cls.posting_names:
+            setattr(index, name, (arrays[f'{name}_offsets'], arrays[f'{name}_positions']))
+        index._init_lookups()
+        return index
+
+    @staticmethod
+    def _postings(keys: np.ndarray, n_keys: int) -> Tuple[np.ndarray, np.ndarray]:
+        offsets = np.zeros(n_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n_keys), out=offsets[1:])
+        return offsets, np.argsort(keys, kind='stable').astype(np.int32)
+
+    @staticmethod
+    def posting_size(postings: Tuple[np.ndarray, np.ndarray], ids: np.ndarray) -> int:
+        """Returns the number of positions in the posting lists of the given ids."""
+        offsets, _ = postings
+        return int((offsets[ids + 1] - offsets[ids]).sum())
+
+    def date_bounds(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[int, int]:
+        """Returns the [lo, hi) slice of positions whose date lies in [start_date, end_date]."""
+        lo = 0 if start_date is None else int(self.day_offsets.start_of(date_to_ordinal(start_date)))
+        hi = len(self.dates) if end_date is None else int(self.day_offsets.end_of(date_to_ordinal(end_date)))
+        return lo, max(lo, hi)
+
+    def _lookup_table(self, codes: List[str], dict_code2id: dict, size: int) -> np.ndarray:
+        # boolean table over the vocabulary; codes that never occur in the data match nothing
+        table = np.zeros(size, dtype=bool)
+        ids = [dict_code2id[code] for code in codes if code in dict_code2id]
+        table[ids] = True
+        return table
+
+    def entity_table(self, codes: List[str]) -> np.ndarray:
+        return self._lookup_table(codes, self.dict_entity2id, len(self.entity_vocab))
+
+    def relation_table(self, codes: List[str]) -> np.ndarray:
+        return self._lookup_table(codes, self.dict_relation2id, len(self.relation_vocab))
+
+    def select(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+               head_codes: Optional[List[str]] = None, tail_codes: Optional[List[str]] = None,
+               relation_codes: Optional[List[str]] = None, relation_table: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the positions of unique events matching all given conditions, in ascending date order.
+
+        start_date/end_date are inclusive 'YYYY-MM-DD' bounds; head_codes, tail_codes and relation_codes keep events
+        whose value is any of the listed codes. relation_table is a boolean lookup table over the relation vocabulary,
+        for relation sets resolved by the caller.
+        """
+        lo, hi = self.date_bounds(start_date, end_date)
+        head_table = self.entity_table(head_codes) if head_codes is not None else None
+        tail_table = self.entity_table(tail_codes) if tail_codes is not None else None
+        if relation_codes is not None:
+            codes_table = self.relation_table(relation_codes)
+            relation_table = codes_table if relation_table is None else codes_table & relation_table
+
+        # plan: the candidate sources of positions with their sizes, the date slice being scanned by default
+        plans = [(hi - lo, None, None)]
+        if head_table is not None:
+            head_ids = np.flatnonzero(head_table)
+            plans.append((self.posting_size(self.head_postings, head_ids), self.head_postings, head_ids))
+        if tail_table is not None:
+            tail_ids = np.flatnonzero(tail_table)
+            plans.append((self.posting_size(self.tail_postings, tail_ids), self.tail_postings, tail_ids))
+        if head_table is not None and tail_table is not None:
+            pair_ids = (head_ids[:, np.newaxis] * len(self.entity_vocab) + tail_ids[np.newaxis, :]).reshape(-1)
+            plans.append((self.posting_size(self.pair_postings, pair_ids), self.pair_postings, pair_ids))
+        if relation_table is not None:
+            relation_ids = np.flatnonzero(relation_table)
+            plans.append((self.posting_size(self.relation_postings, relation_ids), self.relation_postings, relation_ids))
+        _, postings, ids = min(plans, key=lambda plan: plan[0])
+
+        if postings is None:
+            # scan the date slice
+            candidates = slice(lo, hi)
+        else:
+            # the posting lists of the most selective filter, merged in ascending order and cut to the date slice
+            candidates, _ = csr_gather(*postings, ids)
+            candidates = np.sort(candidates).astype(np.int64)
+            candidates = candidates[np.searchsorted(candidates, lo):np.searchsorted(candidates, hi)]
+        # the remaining filters are lookups on the candidate positions only
+        mask = np.ones(hi - lo if postings is None else len(candidates), dtype=bool)
+        if head_table is not None:
+            mask &= head_table[self.heads[candidates]]
+        if tail_table is not None:
+            mask &= tail_table[self.tails[candidates]]
+        if relation_table is not None:
+            mask &= relation_table[self.relations[candidates]]
+        return np.flatnonzero(mask) + lo if postings is None else candidates[mask]
+
+    def latest_first(self, positions: np.ndarray, limit: Optional[int] = None, offset: int = 0) -> np.ndarray:
+        """Reorders ascending-date positions by descending date, keeping data_kg order within a day; limit and offset select a slice."""
+        return positions[top_ranked(self.dates[positions], limit, offset)]
+
+    def rows_of(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the data_kg rows behind the given events, along with the event position of each row."""
+        return csr_gather(self.event_row_offsets, self.event_rows, positions)
+
+    def event_docid_pairs(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the source docids of the given events, along with the event position of each docid."""
+        return csr_gather(self.event_docid_offsets, self.event_docids, positions)
+
+    def docids_of(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the sorted unique docids of the source articles of the given events."""
+        docids, _ = self.event_docid_pairs(positions)
+        return np.unique(docids)
+
+    def date_str(self, position: int) -> str:
+        return ordinal_to_date(self.dates[position])
+
+    def entity_counts(self, positions: np.ndarray, heads: bool = True, tails: bool = True) -> np.ndarray:
+        """Counts occurrences of each entity id over the given positions."""
+        counts = np.zeros(len(self.entity_vocab), dtype=np.int64)
+        if heads:
+            counts += np.bincount(self.heads[positions], minlength=len(self.entity_vocab))
+        if tails:
+            counts += np.bincount(self.tails[positions], minlength=len(self.entity_vocab))
+        return counts
+
+    def relation_counts(self, positions: np.ndarray) -> np.ndarray:
+        """Counts occurrences of each relation id over the given positions."""
+        return np.bincount(self.relations[positions], minlength=len(self.relation_vocab))
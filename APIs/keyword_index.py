@@ -0,0 +1,179 @@
+from array import array
+from collections import deque
+from typing import Callable, Iterable, List, Optional
+import json
+import os
+import re
+import numpy as np
+
+from event_index import csr_gather
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton finding whether any of a set of patterns occurs in a text, in one pass over the text."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.accepting = [False]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.accepting.append(False)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.accepting[state] = True
+
+        # breadth-first construction of the failure links; a state accepts if any suffix of its path is a pattern
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.accepting[child] = self.accepting[child] or self.accepting[self.fail[child]]
+
+    def contains_any(self, text: str) -> bool:
+        if self.accepting[0]:
+            return True
+        goto, fail, accepting = self.goto, self.fail, self.accepting
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if accepting[state]:
+                return True
+        return False
+
+
+class KeywordIndex:
+    """
+    Lowercase inverted index of the word tokens (\\w+ runs) of news articles, for regex-free keyword filtering.
+
+    A keyword matches an article if it occurs, ignoring case, as a literal substring of any of the article's fields
+    (title or text). A keyword made only of word characters can only occur inside a single token, so its matching
+    articles are exactly the postings of the vocabulary terms containing it, found by scanning the vocabulary rather
+    than the articles. Other keywords (phrases, punctuation) are verified with an Aho-Corasick automaton, only over the
+    articles whose tokens contain each of the keyword's word runs.
+    """
+
+    array_names = ['term_starts', 'term_offsets', 'posting_docs']
+
+    def __init__(self, vocab_blob: str, arrays: dict, n_docs: int):
+        # the vocabulary is stored as one newline-separated string, so that finding the terms containing a keyword is a
+        # sequence of str.find calls; term_starts holds the position of each term in the string
+        self.vocab_blob = vocab_blob
+        for name in self.array_names:
+            setattr(self, name, arrays[name])
+        self.n_docs = n_docs
+
+    def __len__(self):
+        return self.n_docs
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return re.findall(r'\w+', text.lower())
+
+    @classmethod
+    def build(cls, docs: Iterable[Iterable[str]]) -> 'KeywordIndex':
+        """Indexes the documents; document i is given as the list of its fields and gets docno i."""
+        dict_term2id = {}
+        doc_sizes, doc_terms = array('i'), array('i')
+        for fields in docs:
+            terms = set()
+            for field in fields:
+                if isinstance(field, str):
+                    terms.update(cls.tokenize(field))
+            doc_sizes.append(len(terms))
+            for term in terms:
+                doc_terms.append(dict_term2id.setdefault(term, len(dict_term2id)))
+
+        doc_terms = np.frombuffer(doc_terms, dtype=np.int32)
+        doc_sizes = np.frombuffer(doc_sizes, dtype=np.int32)
+        doc_of_entry = np.repeat(np.arange(len(doc_sizes), dtype=np.int32), doc_sizes)
+        order = np.argsort(doc_terms, kind='stable')
+        term_offsets = np.zeros(len(dict_term2id) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(doc_terms, minlength=len(dict_term2id)), out=term_offsets[1:])
+        term_starts = np.zeros(len(dict_term2id), dtype=np.int64)
+        np.cumsum([len(term) + 1 for term in list(dict_term2id.keys())[:-1]], out=term_starts[1:])
+        arrays = {'term_starts': term_starts, 'term_offsets': term_offsets, 'posting_docs': doc_of_entry[order]}
+        return cls('\n'.join(dict_term2id.keys()), arrays, len(doc_sizes))
+
+    def save(self, directory: str, source: Optional[str] = None):
+        """Saves the index as one .npy file per array plus the vocabulary; source identifies the indexed data."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.array_names:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'vocab.txt'), 'w', encoding='utf-8') as f:
+            f.write(self.vocab_blob)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'n_docs': self.n_docs, 'source': source}, f)
+
+    @classmethod
+    def load(cls, directory: str, source: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional['KeywordIndex']:
+        """Loads a saved index, or returns None if there is none built from the given source."""
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        meta = json.load(open(meta_path))
+        if meta['source'] != source:
+            return None
+        vocab_blob = open(os.path.join(directory, 'vocab.txt'), encoding='utf-8').read()
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in cls.array_names}
+        return cls(vocab_blob, arrays, meta['n_docs'])
+
+    def _terms_containing(self, word: str) -> np.ndarray:
+        # ids of the vocabulary terms containing the word
+        term_ids = []
+        position = self.vocab_blob.find(word)
+        while position >= 0:
+            term_id = int(np.searchsorted(self.term_starts, position, side='right')) - 1
+            term_ids.append(term_id)
+            # continue after the end of this term, as one hit per term is enough
+            next_start = self.term_starts[term_id + 1] if term_id + 1 < len(self.term_starts) else len(self.vocab_blob)
+            position = self.vocab_blob.find(word, int(next_start))
+        return np.array(term_ids, dtype=np.int64)
+
+    def word_bitmap(self, word: str) -> np.ndarray:
+        """Returns the bitmap over documents of those with a token containing the lowercase word."""
+        bitmap = np.zeros(self.n_docs, dtype=bool)
+        docs, _ = csr_gather(self.term_offsets, self.posting_docs, self._terms_containing(word))
+        bitmap[docs] = True
+        return bitmap
+
+    def match(self, keywords: List[str], candidates: np.ndarray, fetch_fields: Callable[[np.ndarray], Iterable[Iterable[str]]]) -> np.ndarray:
+        """
+        Returns, for each candidate docno, whether at least one keyword occurs in one of its fields (ignoring case).
+
+        fetch_fields(docnos) returns the fields of the given documents and is only called for the documents that
+        need to be verified against phrase keywords.
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        bitmap = np.zeros(self.n_docs, dtype=bool)
+        phrases = []
+        for keyword in dict.fromkeys(keyword.lower() for keyword in keywords):
+            if re.fullmatch(r'\w+', keyword):
+                bitmap |= self.word_bitmap(keyword)
+            else:
+                phrases.append(keyword)
+        mask = bitmap[candidates]
+        if phrases:
+            # only candidates containing every word run of some phrase can contain the phrase
+            possible = np.zeros(self.n_docs, dtype=bool)
+            for phrase in phrases:
+                phrase_bitmap = np.ones(self.n_docs, dtype=bool)
+                for word in re.findall(r'\w+', phrase):
+                    phrase_bitmap &= self.word_bitmap(word)
+                possible |= phrase_bitmap
+            to_verify = np.flatnonzero(~mask & possible[candidates])
+            automaton = AhoCorasick(phrases)
+            for position, fields in zip(to_verify, fetch_fields(candidates[to_verify])):
+                mask[position] = any(isinstance(field, str) and automaton.contains_any(field.lower()) for field in fields)
+        return mask
@@ -0,0 +1,458 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+from event_index import EventIndex, date_to_ordinal, ordinal_to_date, parse_docid_lists, top_ranked
+from count_cube import CountCube
+from cameo_taxonomy import CameoTaxonomy
+
+
+@dataclass
+class EventQuery:
+    """
+    Conditions on the unique events of the KG, each None when absent.
+
+    start_date/end_date are inclusive 'YYYY-MM-DD' bounds; events must have any of head_codes as head and any of
+    tail_codes as tail, and a relation in relation_mask (a boolean mask over the code ids of the CAMEO taxonomy). For
+    entity distributions, interacted_codes are the entities the counted entities interacted with: as tails if
+    entity_role is 'head', as heads if it is 'tail', and as either otherwise.
+    """
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    head_codes: Optional[List[str]] = None
+    tail_codes: Optional[List[str]] = None
+    relation_mask: Optional[np.ndarray] = None
+    interacted_codes: Optional[List[str]] = None
+    entity_role: Optional[str] = None
+
+
+# an event as (date, head ISO code, CAMEO code, tail ISO code) strings
+EventTuple = Tuple[str, str, str, str]
+
+
+class KGBackend:
+    """
+    Interface of the storage backends answering the KG queries of the API functions.
+
+    Events are identified by ids that sort like the events: by date, and in data_kg order within a day. Distributions
+    are lists of (code, count) pairs of the codes with a non-zero count, by descending count and ascending code, cut
+    to offset to offset + limit (all if limit is None). The batched methods answer many queries at once; by default
+    they answer them one by one.
+    """
+
+    def count(self, query: EventQuery) -> int:
+        """Returns the number of unique events matching the query."""
+        raise NotImplementedError
+
+    def latest_events(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[EventTuple]:
+        """Returns the events matching the query ranked offset to offset + limit by descending date."""
+        raise NotImplementedError
+
+    def event_docid_pairs(self, query: EventQuery) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the source docids of the events matching the query, along with the event id of each docid."""
+        raise NotImplementedError
+
+    def latest_events_of(self, event_ids: np.ndarray) -> List[EventTuple]:
+        """Returns the given events by descending date."""
+        raise NotImplementedError
+
+    def docids_of(self, query: EventQuery) -> np.ndarray:
+        """Returns the sorted unique docids of the source articles of the events matching the query."""
+        raise NotImplementedError
+
+    def entity_distribution(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, int]]:
+        """Counts the events matching the query in which each entity is head, plus those in which it is tail."""
+        raise NotImplementedError
+
+    def relation_distribution(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, int]]:
+        """Counts the events matching the query of each relation."""
+        raise NotImplementedError
+
+    def count_many(self, queries: List[EventQuery]) -> List[int]:
+        return [self.count(query) for query in queries]
+
+    def entity_distribution_many(self, queries: List[EventQuery], limits: List[Optional[int]], offsets: List[int]) -> List[List[Tuple[str, int]]]:
+        return [self.entity_distribution(query, limit, offset) for query, limit, offset in zip(queries, limits, offsets)]
+
+    def relation_distribution_many(self, queries: List[EventQuery], limits: List[Optional[int]], offsets: List[int]) -> List[List[Tuple[str, int]]]:
+        return [self.relation_distribution(query, limit, offset) for query, limit, offset in zip(queries, limits, offsets)]
+
+
+class ArrayBackend(KGBackend):
+    """
+    In-memory (or memory-mapped) backend over the event index and, for large KGs, the count cube.
+
+    Event lists come from the event index, whose positions are the event ids. Counts and distributions come from a
+    scan of the matching events by default, and from the cells of the count cube when the date range holds at least
+    cube_min_events_per_cell events per cell: a cube query passes over all cells, so it only pays off when the cells
+    compress many events (on the bundled data, 7,994 events make 6,716 cells, and the scan is 1.6-3.8x faster at
+    every date-range width). The cube is therefore only loaded, by load_count_cube, on the first query whose date
+    range reaches the threshold, which never happens for KGs with fewer than cube_min_events_per_cell events per cell
+    such as the bundled one. The batched methods evaluate the queries sharing a date range in one vectorized pass.
+    """
+
+    # events of the date range per cube cell above which the cube is used; a cube query costs about 2.5 times as
+    # much per cell as a scan per event (benchmarks/bench_count_cube.py)
+    cube_min_events_per_cell = 4.0
+
+    def __init__(self, event_index: EventIndex, taxonomy: CameoTaxonomy,
+                 load_count_cube: Optional[Callable[[], CountCube]] = None):
+        self.event_index = event_index
+        self.taxonomy = taxonomy
+        # taxonomy code id of each relation of the event index, to translate relation masks into lookup tables
+        self.relation_taxonomy_ids = taxonomy.vocab_ids(event_index.relation_vocab.tolist())
+        # the count cube, loaded or built by load_count_cube on first use; without it, all counts are scans
+        self.load_count_cube = load_count_cube
+        self.count_cube = None
+        self.n_cells = None
+        self.lock = threading.Lock()
+
+    def _relation_table(self, relation_mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        return self.taxonomy.vocab_table(relation_mask, self.relation_taxonomy_ids) if relation_mask is not None else None
+
+    def _entity_table(self, codes: Optional[List[str]]) -> Optional[np.ndarray]:
+        return self.event_index.entity_table(codes) if codes is not None else None
+
+    def _positions(self, query: EventQuery) -> np.ndarray:
+        index = self.event_index
+        positions = index.select(start_date=query.start_date, end_date=query.end_date,
+                                 head_codes=query.head_codes, tail_codes=query.tail_codes,
+                                 relation_table=self._relation_table(query.relation_mask))
+        if query.interacted_codes is not None:
+            entity_table = index.entity_table(query.interacted_codes)
+            if query.entity_role == 'head':
+                positions = positions[entity_table[index.tails[positions]]]
+            elif query.entity_role == 'tail':
+                positions = positions[entity_table[index.heads[positions]]]
+            else:
+                positions = positions[entity_table[index.heads[positions]] | entity_table[index.tails[positions]]]
+        return positions
+
+    def _use_cube(self, start_date: Optional[str], end_date: Optional[str]) -> bool:
+        if self.load_count_cube is None:
+            return False
+        if self.n_cells is None:
+            self.n_cells = CountCube.n_cells_of(self.event_index)
+        lo, hi = self.event_index.date_bounds(start_date, end_date)
+        if hi - lo < self.cube_min_events_per_cell * self.n_cells:
+            return False
+        with self.lock:
+            if self.count_cube is None:
+                self.count_cube = self.load_count_cube()
+        return True
+
+    def _cells(self, query: EventQuery) -> np.ndarray:
+        cube = self.count_cube
+        cells = cube.select_cells(head_table=self._entity_table(query.head_codes), tail_table=self._entity_table(query.tail_codes),
+                                  relation_table=self._relation_table(query.relation_mask))
+        if query.interacted_codes is not None:
+            entity_table = self.event_index.entity_table(query.interacted_codes)
+            if query.entity_role == 'head':
+                cells = cells[entity_table[cube.cell_tails[cells]]]
+            elif query.entity_role == 'tail':
+                cells = cells[entity_table[cube.cell_heads[cells]]]
+            else:
+                cells = cells[entity_table[cube.cell_heads[cells]] | entity_table[cube.cell_tails[cells]]]
+        return cells
+
+    def _events(self, positions: np.ndarray) -> List[EventTuple]:
+        index = self.event_index
+        dates = index.dates[positions].tolist()
+        date_strs = {ordinal: ordinal_to_date(ordinal) for ordinal in set(dates)}
+        return list(zip([date_strs[ordinal] for ordinal in dates], index.entity_vocab[index.heads[positions]].tolist(),
+                        index.relation_vocab[index.relations[positions]].tolist(), index.entity_vocab[index.tails[positions]].tolist()))
+
+    @staticmethod
+    def _ranked(vocab: np.ndarray, counts: np.ndarray, limit: Optional[int], offset: int) -> List[Tuple[str, int]]:
+        # ids with a non-zero count ranked offset to offset + limit by descending count, ties in id (= code) order
+        ids = np.flatnonzero(counts)
+        ids = ids[top_ranked(counts[ids], limit, offset)]
+        return list(zip(vocab[ids].tolist(), counts[ids].tolist()))
+
+    def count(self, query: EventQuery) -> int:
+        if not self._use_cube(query.start_date, query.end_date):
+            return len(self._positions(query))
+        return self.count_cube.count(self._cells(query), query.start_date, query.end_date)
+
+    def latest_events(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[EventTuple]:
+        return self._events(self.event_index.latest_first(self._positions(query), limit, offset))
+
+    def event_docid_pairs(self, query: EventQuery) -> Tuple[np.ndarray, np.ndarray]:
+        return self.event_index.event_docid_pairs(self._positions(query))
+
+    def latest_events_of(self, event_ids: np.ndarray) -> List[EventTuple]:
+        return self._events(self.event_index.latest_first(np.asarray(event_ids, dtype=np.int64)))
+
+    def docids_of(self, query: EventQuery) -> np.ndarray:
+        return self.event_index.docids_of(self._positions(query))
+
+    def entity_distribution(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, int]]:
+        if self._use_cube(query.start_date, query.end_date):
+            counts = self.count_cube.entity_counts(self._cells(query), query.start_date, query.end_date)
+        else:
+            counts = self.event_index.entity_counts(self._positions(query))
+        return self._ranked(self.event_index.entity_vocab, counts, limit, offset)
+
+    def relation_distribution(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, int]]:
+        if self._use_cube(query.start_date, query.end_date):
+            counts = self.count_cube.relation_counts(self._cells(query), query.start_date, query.end_date)
+        else:
+            counts = self.event_index.relation_counts(self._positions(query))
+        return self._ranked(self.event_index.relation_vocab, counts, limit, offset)
+
+    @staticmethod
+    def _by_date_bounds(queries: List[EventQuery]) -> Dict[Tuple[Optional[str], Optional[str]], List[int]]:
+        # indices of the queries sharing each date range, whose cell counts are computed once
+        groups = {}
+        for idx, query in enumerate(queries):
+            groups.setdefault((query.start_date, query.end_date), []).append(idx)
+        return groups
+
+    def _entity_tables(self, code_lists: List[Optional[List[str]]]) -> np.ndarray:
+        # one boolean lookup table per query, all True where the filter is absent
+        tables = np.ones((len(code_lists), len(self.event_index.entity_vocab)), dtype=bool)
+        for row, codes in enumerate(code_lists):
+            if codes is not None:
+                tables[row] = self.event_index.entity_table(codes)
+        return tables
+
+    def _relation_tables(self, relation_masks: List[Optional[np.ndarray]]) -> np.ndarray:
+        tables = np.ones((len(relation_masks), len(self.event_index.relation_vocab)), dtype=bool)
+        for row, relation_mask in enumerate(relation_masks):
+            if relation_mask is not None:
+                tables[row] = self._relation_table(relation_mask)
+        return tables
+
+    def _cell_masks(self, queries: List[EventQuery]) -> np.ndarray:
+        # (n_queries x n_cells) matrix of the cells matching each query
+        cube = self.count_cube
+        masks = cube.cell_masks(self._entity_tables([query.head_codes for query in queries]),
+                                self._entity_tables([query.tail_codes for query in queries]),
+                                self._relation_tables([query.relation_mask for query in queries]))
+        if any(query.interacted_codes is not None for query in queries):
+            entity_tables = self._entity_tables([query.interacted_codes for query in queries])
+            head_hits, tail_hits = entity_tables[:, cube.cell_heads], entity_tables[:, cube.cell_tails]
+            # returned heads interacted with the listed entities as tails, returned tails with them as heads
+            roles = np.array([query.entity_role for query in queries], dtype=object)[:, np.newaxis]
+            masks &= np.where(roles == 'head', tail_hits, np.where(roles == 'tail', head_hits, head_hits | tail_hits))
+        return masks
+
+    def count_many(self, queries: List[EventQuery]) -> List[int]:
+        counts = [0] * len(queries)
+        for (start_date, end_date), indices in self._by_date_bounds(queries).items():
+            if not self._use_cube(start_date, end_date):
+                for idx in indices:
+                    counts[idx] = self.count(queries[idx])
+                continue
+            masks = self._cell_masks([queries[idx] for idx in indices])
+            for idx, count in zip(indices, self.count_cube.count_many(masks, start_date, end_date).tolist()):
+                counts[idx] = count
+        return counts
+
+    def entity_distribution_many(self, queries: List[EventQuery], limits: List[Optional[int]], offsets: List[int]) -> List[List[Tuple[str, int]]]:
+        distributions = [None] * len(queries)
+        for (start_date, end_date), indices in self._by_date_bounds(queries).items():
+            if not self._use_cube(start_date, end_date):
+                for idx in indices:
+                    distributions[idx] = self.entity_distribution(queries[idx], limits[idx], offsets[idx])
+                continue
+            masks = self._cell_masks([queries[idx] for idx in indices])
+            for idx, counts in zip(indices, self.count_cube.entity_counts_many(masks, start_date, end_date)):
+                distributions[idx] = self._ranked(self.event_index.entity_vocab, counts, limits[idx], offsets[idx])
+        return distributions
+
+    def relation_distribution_many(self, queries: List[EventQuery], limits: List[Optional[int]], offsets: List[int]) -> List[List[Tuple[str, int]]]:
+        distributions = [None] * len(queries)
+        for (start_date, end_date), indices in self._by_date_bounds(queries).items():
+            if not self._use_cube(start_date, end_date):
+                for idx in indices:
+                    distributions[idx] = self.relation_distribution(queries[idx], limits[idx], offsets[idx])
+                continue
+            masks = self._cell_masks([queries[idx] for idx in indices])
+            for idx, counts in zip(indices, self.count_cube.relation_counts_many(masks, start_date, end_date)):
+                distributions[idx] = self._ranked(self.event_index.relation_vocab, counts, limits[idx], offsets[idx])
+        return distributions
+
+
+def _read_chunks(path: str, columns: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    # the given columns of a tab-separated table or of a Parquet file, chunk_size rows at a time
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, sep='\t', dtype=str, usecols=columns, chunksize=chunk_size)
+
+
+class SQLiteBackend(KGBackend):
+    """
+    On-disk backend over an SQLite file of the unique events, for KGs that do not fit in memory.
+
+    The events table holds one row per event, identified by the data_kg row of its first occurrence (the row kept by
+    drop_duplicates(subset=['QuadEventCode'])), with the date as a day ordinal and the codes as text; it is indexed by
+    date and by (head, date), (tail, date) and (relation, date), so that the filters of a query are pushed down as
+    indexed lookups. event_docids holds the source docids of every event, clustered by event id. Results are identical
+    to those of the ArrayBackend over the same data. Each thread reads through its own read-only connection, and memory
+    use is bounded by the SQLite page cache, both when building the file and when querying it.
+    """
+
+    schema = """
+        CREATE TABLE events (id INTEGER PRIMARY KEY, date INTEGER NOT NULL, head TEXT NOT NULL, tail TEXT NOT NULL, relation TEXT NOT NULL);
+        CREATE TABLE event_docids (id INTEGER NOT NULL, seq INTEGER NOT NULL, docid INTEGER NOT NULL, PRIMARY KEY (id, seq)) WITHOUT ROWID;
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+    columns = ['DateStr', 'Actor1CountryCode', 'Actor2CountryCode', 'EventBaseCode', 'QuadEventCode', 'Docids']
+    indexes = """
+        CREATE INDEX events_date ON events (date);
+        CREATE INDEX events_head ON events (head, date);
+        CREATE INDEX events_tail ON events (tail, date);
+        CREATE INDEX events_relation ON events (relation, date);
+    """
+
+    def __init__(self, path: str, taxonomy: CameoTaxonomy):
+        self.path = path
+        self.taxonomy = taxonomy
+        self.local = threading.local()
+
+    @classmethod
+    def build(cls, path: str, data_kg_path: str, taxonomy: CameoTaxonomy, source: Optional[str] = None,
+              chunk_size: int = 1 << 16) -> 'SQLiteBackend':
+        """
+        Writes the unique events of data_kg to a new SQLite file at path; source identifies the data_kg they come from.
+
+        data_kg_path is the tab-separated data_kg file or a Parquet copy of it, read chunk_size rows at a time, so
+        that building the file never holds the KG in memory. The indexes are created once all events are written.
+        """
+        # written to a temporary file and moved into place, so that an interrupted build is never loaded
+        build_path = path + '.build'
+        if os.path.exists(build_path):
+            os.remove(build_path)
+        with sqlite3.connect(build_path) as connection:
+            connection.executescript(cls.schema)
+            # QuadEventCodes of the events written so far, so that only the first row of each event is kept
+            connection.executescript("""
+                CREATE TEMP TABLE written_quads (quad TEXT PRIMARY KEY) WITHOUT ROWID;
+                CREATE TEMP TABLE chunk_quads (row INTEGER PRIMARY KEY, quad TEXT NOT NULL);
+            """)
+            first_row = 0
+            for chunk in _read_chunks(data_kg_path, cls.columns, chunk_size):
+                rows = np.arange(first_row, first_row + len(chunk))
+                first_row += len(chunk)
+                quads = chunk['QuadEventCode'].astype(str)
+                in_chunk = ~quads.duplicated().to_numpy()
+                connection.execute("DELETE FROM chunk_quads")
+                connection.executemany("INSERT INTO chunk_quads VALUES (?, ?)", zip(rows[in_chunk].tolist(), quads[in_chunk].tolist()))
+                new_rows = np.array([row for row, in connection.execute(
+                    "SELECT row FROM chunk_quads WHERE quad NOT IN (SELECT quad FROM written_quads) ORDER BY row")], dtype=np.int64)
+                connection.execute("INSERT OR IGNORE INTO written_quads SELECT quad FROM chunk_quads")
+                events = chunk.iloc[new_rows - rows[0]]
+                connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", zip(
+                    new_rows.tolist(), events['DateStr'].to_numpy().astype('datetime64[D]').astype(np.int64).tolist(),
+                    events['Actor1CountryCode'].astype(str).tolist(), events['Actor2CountryCode'].astype(str).tolist(),
+                    events['EventBaseCode'].astype(str).tolist()))
+                # rank of each docid within the Docids list of its event
+                offsets, docids = parse_docid_lists(events['Docids'].to_numpy())
+                lengths = np.diff(offsets)
+                seqs = np.arange(len(docids)) - np.repeat(offsets[:-1], lengths)
+                connection.executemany("INSERT INTO event_docids VALUES (?, ?, ?)", zip(np.repeat(new_rows, lengths).tolist(), seqs.tolist(), docids.tolist()))
+            connection.executescript(cls.indexes)
+            connection.execute("INSERT INTO meta VALUES ('source', ?)", (source,))
+        connection.close()
+        os.replace(build_path, path)
+        return cls(path, taxonomy)
+
+    @classmethod
+    def load(cls, path: str, taxonomy: CameoTaxonomy, source: Optional[str] = None) -> Optional['SQLiteBackend']:
+        """Opens a saved SQLite file, or returns None if there is none built from the given source."""
+        if not os.path.exists(path):
+            return None
+        backend = cls(path, taxonomy)
+        row = backend._connection().execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        return backend if row is not None and row[0] == source else None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared across threads, so each thread opens its own
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        return connection
+
+    def _where(self, query: EventQuery) -> Tuple[str, list]:
+        # WHERE clause over the events table holding the conditions of the query, and its parameters
+        clauses, params = [], []
+        if query.start_date is not None:
+            clauses.append("date >= ?")
+            params.append(date_to_ordinal(query.start_date))
+        if query.end_date is not None:
+            clauses.append("date <= ?")
+            params.append(date_to_ordinal(query.end_date))
+        def is_in(column: str, codes: List[str]) -> str:
+            params.extend(codes)
+            return f"{column} IN ({', '.join('?' * len(codes))})"
+        if query.head_codes is not None:
+            clauses.append(is_in('head', query.head_codes))
+        if query.tail_codes is not None:
+            clauses.append(is_in('tail', query.tail_codes))
+        if query.relation_mask is not None:
+            clauses.append(is_in('relation', self.taxonomy.codes_of(query.relation_mask)))
+        if query.interacted_codes is not None:
+            if query.entity_role == 'head':
+                clauses.append(is_in('tail', query.interacted_codes))
+            elif query.entity_role == 'tail':
+                clauses.append(is_in('head', query.interacted_codes))
+            else:
+                clauses.append(f"({is_in('head', query.interacted_codes)} OR {is_in('tail', query.interacted_codes)})")
+        return ' AND '.join(clauses) or '1', params
+
+    def _fetch(self, sql: str, params: list) -> list:
+        return self._connection().execute(sql, params).fetchall()
+
+    def _events(self, rows: list) -> List[EventTuple]:
+        return [(ordinal_to_date(date), head, relation, tail) for date, head, relation, tail in rows]
+
+    def count(self, query: EventQuery) -> int:
+        where, params = self._where(query)
+        return self._fetch(f"SELECT COUNT(*) FROM events WHERE {where}", params)[0][0]
+
+    def latest_events(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[EventTuple]:
+        where, params = self._where(query)
+        return self._events(self._fetch(f"SELECT date, head, relation, tail FROM events WHERE {where} ORDER BY date DESC, id LIMIT ? OFFSET ?",
+                                        params + [-1 if limit is None else limit, offset]))
+
+    def event_docid_pairs(self, query: EventQuery) -> Tuple[np.ndarray, np.ndarray]:
+        where, params = self._where(query)
+        rows = self._fetch(f"SELECT docid, id FROM event_docids WHERE id IN (SELECT id FROM events WHERE {where}) ORDER BY id, seq", params)
+        pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        return pairs[:, 0].astype(np.int32), pairs[:, 1]
+
+    def latest_events_of(self, event_ids: np.ndarray) -> List[EventTuple]:
+        event_ids = np.asarray(event_ids, dtype=np.int64).tolist()
+        return self._events(self._fetch(f"SELECT date, head, relation, tail FROM events WHERE id IN ({', '.join('?' * len(event_ids))}) ORDER BY date DESC, id",
+                                        event_ids))
+
+    def docids_of(self, query: EventQuery) -> np.ndarray:
+        where, params = self._where(query)
+        rows = self._fetch(f"SELECT DISTINCT docid FROM event_docids WHERE id IN (SELECT id FROM events WHERE {where}) ORDER BY docid", params)
+        return np.array([docid for docid, in rows], dtype=np.int32)
+
+    def entity_distribution(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, int]]:
+        where, params = self._where(query)
+        return self._fetch(f"SELECT code, SUM(n) AS n_events FROM (SELECT head AS code, COUNT(*) AS n FROM events WHERE {where} GROUP BY head "
+                           f"UNION ALL SELECT tail AS code, COUNT(*) AS n FROM events WHERE {where} GROUP BY tail) "
+                           f"GROUP BY code ORDER BY n_events DESC, code LIMIT ? OFFSET ?", params + params + [-1 if limit is None else limit, offset])
+
+    def relation_distribution(self, query: EventQuery, limit: Optional[int] = None, offset: int = 0) -> List[Tuple[str, int]]:
+        where, params = self._where(query)
+        return self._fetch(f"SELECT relation, COUNT(*) AS n_events FROM events WHERE {where} GROUP BY relation ORDER BY n_events DESC, relation LIMIT ? OFFSET ?",
+                           params + [-1 if limit is None else limit, offset])
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
@@ -0,0 +1,46 @@
+from typing import List, Tuple
+import numpy as np
+
+
+class NearestNeighbors:
+    """
+    Exact cosine nearest-neighbour search over a fixed set of keyed embeddings.
+
+    The reference matrix is L2-normalized and stored as float32 once, so a batch of queries is answered with a single
+    matrix multiplication followed by an argpartition top-k selection.
+    """
+
+    def __init__(self, keys: List[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(keys) != len(embeddings):
+            raise ValueError(f"Number of keys ({len(keys)}) must match the number of embeddings ({len(embeddings)})")
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.keys = np.asarray(keys)
+        self.embeddings = embeddings / np.where(norms > 0, norms, 1.0)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def query(self, queries: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k most similar keys for each query embedding.
+
+        Returns the indices (n_queries x k) of the keys sorted by decreasing cosine similarity, and the similarities.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        similarities = (queries / np.where(norms > 0, norms, 1.0)) @ self.embeddings.T
+        k = min(k, len(self))
+        if k < len(self):
+            top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top_indices = np.tile(np.arange(len(self)), (len(queries), 1))
+        # order the k candidates of each query by similarity
+        top_similarities = np.take_along_axis(similarities, top_indices, axis=1)
+        order = np.argsort(-top_similarities, axis=1, kind='stable')
+        return np.take_along_axis(top_indices, order, axis=1), np.take_along_axis(top_similarities, order, axis=1)
+
+    def query_keys(self, queries: np.ndarray, k: int = 5) -> List[List[str]]:
+        """Returns the k most similar keys for each query embedding."""
+        top_indices, _ = self.query(queries, k)
+        return [self.keys[indices].tolist() for indices in top_indices]
@@ -0,0 +1,50 @@
+from typing import Iterable, Optional
+import numpy as np
+
+from data_store import save_arrays, load_arrays
+from event_index import DateOrder
+from title_index import TitleIndex
+
+
+class NewsMetadata:
+    """
+    Metadata of the news articles used by the news APIs, in data_news row order: the docid of every row and the row of
+    every docid, the date order of the rows, and the (date, title) index, which also holds the titles.
+
+    save() writes the arrays as .npy files and load() memory-maps them read-only, so that once saved, processes loading
+    the APIs neither read data_news nor keep their own copy of its metadata.
+    """
+
+    def __init__(self, docids: np.ndarray, row_of_docid: np.ndarray, date_order: DateOrder, title_index: TitleIndex):
+        self.docids = docids
+        self.row_of_docid = row_of_docid
+        self.date_order = date_order
+        self.title_index = title_index
+
+    def __len__(self):
+        return len(self.docids)
+
+    @classmethod
+    def build(cls, docids: Iterable[int], dates: Iterable[str], titles: Iterable[str]) -> 'NewsMetadata':
+        # map each docid to its row so that event docids can be joined to articles by a gather
+        docids = np.asarray(docids).astype(np.int32)
+        row_of_docid = np.full(docids.max() + 1, -1, dtype=np.int64)
+        row_of_docid[docids] = np.arange(len(docids))
+        title_index = TitleIndex.build(dates, titles)
+        return cls(docids, row_of_docid, DateOrder(title_index.dates), title_index)
+
+    def save(self, directory: str, source: Optional[str] = None):
+        """Saves the metadata as one .npy file per array; source identifies the data_news it was built from."""
+        arrays = {name: getattr(self.title_index, name) for name in TitleIndex.array_names}
+        arrays.update(docids=self.docids, row_of_docid=self.row_of_docid, date_rows=self.date_order.rows)
+        save_arrays(directory, arrays, source=source)
+
+    @classmethod
+    def load(cls, directory: str, source: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> Optional['NewsMetadata']:
+        """Loads saved metadata, or returns None if there is none built from the given source."""
+        loaded = load_arrays(directory, TitleIndex.array_names + ['docids', 'row_of_docid', 'date_rows'], source=source, mmap_mode=mmap_mode)
+        if loaded is None:
+            return None
+        arrays, _ = loaded
+        title_index = TitleIndex(arrays)
+        return cls(arrays['docids'], arrays['row_of_docid'], DateOrder.from_arrays(title_index.dates, arrays['date_rows']), title_index)
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional
+import atexit
+import hashlib
+import inspect
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class Uncacheable(Exception):
+    """Raised by canonicalize for argument values without a canonical form; such calls bypass the cache."""
+
+
+def canonicalize(value):
+    """
+    Converts an API argument to a hashable, order-independent canonical form.
+
+    API objects are reduced to their type name and codes, and lists are treated as sets (the APIs match any of the
+    listed values), so [ISOCode("CHN"), ISOCode("USA")] and [ISOCode("USA"), ISOCode("CHN"), ISOCode("USA")] share a
+    key. Empty lists are equivalent to None. The type names keep invalid arguments, which the API rejects, from
+    sharing a key with valid ones.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return (type(value).__name__, value)
+    if isinstance(value, list):
+        if not value:
+            return canonicalize(None)
+        return ('list', tuple(sorted(set(canonicalize(item) for item in value), key=repr)))
+    name = type(value).__name__
+    if name in ('ISOCode', 'CAMEOCode'):
+        return (name, value.code)
+    if name == 'Date':
+        return (name, value.date)
+    if name == 'DateRange':
+        return (name, canonicalize(value.start_date), canonicalize(value.end_date))
+    raise Uncacheable(f"No canonical form for values of type {name}")
+
+
+class ResultCache:
+    """
+    LRU cache of API results keyed on the canonicalized arguments and the as-of date, optionally persisted to an
+    SQLite file.
+
+    Results are stored pickled, which both accounts for their size (max_bytes bounds the total size of the cached
+    results) and gives every caller its own copy, so mutating a returned list or dict never alters the cache. hits,
+    misses and hit_rate() report the effectiveness of the cache.
+
+    In the SQLite file, hits only record their time in memory, written in batches of flush_every (and by flush()),
+    and the least recently used results are only evicted when the stored size exceeds max_bytes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024, namespace: str = '',
+                 flush_every: int = 256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.namespace = namespace # e.g. a fingerprint of the data, so that persisted results of other data never match
+        self.memory = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # the cache is shared by the threads of a process, e.g. concurrent agents or the connections of api_server
+        self.lock = threading.RLock()
+        self.db = None
+        self.flush_every = flush_every
+        self.last_used = {} # times of the hits not yet written to the file
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_used REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            self.db.commit()
+            self.stored_size = self._stored_size()
+            atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self.memory)
+
+    def make_key(self, function_name: str, arguments: dict, as_of_date: Optional[str]) -> str:
+        canonical = (self.namespace, function_name, as_of_date, tuple((name, canonicalize(value)) for name, value in sorted(arguments.items())))
+        return hashlib.sha256(repr(canonical).encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """Returns (True, a fresh copy of the result) on a hit, and (False, None) on a miss."""
+        with self.lock:
+            blob = self.memory.get(key)
+            if blob is not None:
+                self.memory.move_to_end(key)
+            elif self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    blob = row[0]
+                    self._remember(key, blob)
+            if blob is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            if self.db is not None:
+                self.last_used[key] = time.time()
+                if len(self.last_used) >= self.flush_every:
+                    self.flush()
+            return True, pickle.loads(blob)
+
+    def put(self, key: str, result):
+        with self.lock:
+            blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(blob) > self.max_bytes:
+                return
+            self._remember(key, blob)
+            if self.db is not None:
+                row = self.db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, blob, len(blob), time.time()))
+                self.last_used.pop(key, None)
+                self.stored_size += len(blob) - (row[0] if row is not None else 0)
+                if self.stored_size > self.max_bytes:
+                    self._evict()
+                self.db.commit()
+
+    def flush(self):
+        """Writes the times of the recent hits to the SQLite file."""
+        with self.lock:
+            if self.db is None or not self.last_used:
+                return
+            self.db.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(used, key) for key, used in self.last_used.items()])
+            self.db.commit()
+            self.last_used.clear()
+
+    def _stored_size(self) -> int:
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _evict(self):
+        # other processes may share the file, so the size is recounted before evicting the least recently used results
+        self.flush()
+        self.stored_size = self._stored_size()
+        evicted = []
+        for key, size in self.db.execute("SELECT key, size FROM results ORDER BY last_used"):
+            if self.stored_size <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self.stored_size -= size
+        self.db.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def _remember(self, key: str, blob: bytes):
+        if key in self.memory:
+            self.size -= len(self.memory.pop(key))
+        self.memory[key] = blob
+        self.size += len(blob)
+        while self.size > self.max_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.size = 0
+            if self.db is not None:
+                self.db.execute("DELETE FROM results")
+                self.db.commit()
+                self.last_used.clear()
+                self.stored_size = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'entries': len(self), 'bytes': self.size}
+
+    def memoize(self, get_as_of_date: Callable[[], Optional[str]]):
+        """
+        Decorates an API function to answer repeated calls from the cache.
+
+        get_as_of_date returns the current as-of date (DEFAULT_END_DATE), which is part of the key. Calls whose
+        arguments have no canonical form and calls that raise are never cached.
+        """
+        def decorator(function):
+            signature = inspect.signature(function)
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                try:
+                    bound = signature.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    key = self.make_key(function.__name__, bound.arguments, get_as_of_date())
+                except (TypeError, Uncacheable):
+                    return function(*args, **kwargs)
+                hit, result = self.get(key)
+                if hit:
+                    return result
+                result = function(*args, **kwargs)
+                self.put(key, result)
+                return result
+            return wrapper
+        return decorator
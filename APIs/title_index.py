@@ -0,0 +1,104 @@
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import re
+import threading
+import unicodedata
+import numpy as np
+
+from event_index import ordinal_to_date
+
+
+def normalize_title(title: str) -> str:
+    """Normalizes a title for near matching: Unicode compatibility forms, case and runs of whitespace are ignored."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', title)).strip().casefold()
+
+
+def key_hash(date: str, title: str) -> int:
+    """Returns a 64-bit hash of a (date, title) key, stable across processes unlike hash()."""
+    return int.from_bytes(hashlib.blake2b(f'{date}\n{title}'.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+class TitleIndex:
+    """
+    Hash index from (date, title) to the row of a news article, which also stores the titles.
+
+    Exact keys resolve to the first article with that date and title, as the original two-column scan did. Titles that
+    differ only in case or whitespace from a stored title fall back to the normalized key, which maps to the first
+    article with that normalized title on that date.
+
+    The index is held in flat arrays so that it can be memory-mapped: titles are UTF-8 encoded into one blob (the title
+    of row i is title_blob[title_offsets[i]:title_offsets[i + 1]]), and the key hashes are sorted along with their rows.
+    A lookup finds the rows of a hash by binary search and checks their date and title, so that a hash collision
+    cannot return another article. Rows without a title are not indexed and have an empty title. exact_hits,
+    normalized_hits and misses count the lookups resolved by each key.
+    """
+
+    array_names = ['dates', 'title_offsets', 'title_blob', 'key_hashes', 'key_rows', 'normalized_hashes', 'normalized_rows']
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.array_names:
+            setattr(self, name, arrays[name])
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        # lookups run concurrently in the threads of the agents and of api_server
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.key_rows)
+
+    @staticmethod
+    def _sorted_hashes(hashes: List[int], rows: np.ndarray):
+        # rows of equal hashes stay in ascending order, so that the first matching row is the first article
+        hashes = np.array(hashes, dtype=np.int64)
+        order = np.argsort(hashes, kind='stable')
+        return hashes[order], rows[order]
+
+    @classmethod
+    def build(cls, dates: Iterable[str], titles: Iterable[str]) -> 'TitleIndex':
+        dates, titles = list(dates), list(titles)
+        encoded = [title.encode('utf-8') if isinstance(title, str) else b'' for title in titles]
+        title_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(title) for title in encoded], out=title_offsets[1:])
+        rows = np.array([row for row, title in enumerate(titles) if isinstance(title, str)], dtype=np.int64)
+        key_hashes, key_rows = cls._sorted_hashes([key_hash(dates[row], titles[row]) for row in rows.tolist()], rows)
+        normalized_hashes, normalized_rows = cls._sorted_hashes([key_hash(dates[row], normalize_title(titles[row])) for row in rows.tolist()], rows)
+        return cls({'dates': np.asarray(dates).astype('datetime64[D]').astype(np.int32),
+                    'title_offsets': title_offsets,
+                    'title_blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+                    'key_hashes': key_hashes, 'key_rows': key_rows,
+                    'normalized_hashes': normalized_hashes, 'normalized_rows': normalized_rows})
+
+    def title(self, row: int) -> str:
+        return self.title_blob[self.title_offsets[row]:self.title_offsets[row + 1]].tobytes().decode('utf-8')
+
+    def titles(self, rows: Iterable[int]) -> List[str]:
+        return [self.title(row) for row in rows]
+
+    def _find(self, hashes: np.ndarray, rows: np.ndarray, date: str, title: str, normalize) -> Optional[int]:
+        # first row with the hash of the key whose date and (normalized) title are those of the key
+        hash_ = key_hash(date, title)
+        lo, hi = np.searchsorted(hashes, hash_, side='left'), np.searchsorted(hashes, hash_, side='right')
+        for row in rows[lo:hi].tolist():
+            if ordinal_to_date(self.dates[row]) == date and normalize(self.title(row)) == title:
+                return row
+        return None
+
+    def lookup(self, date: str, title: str) -> Optional[int]:
+        """Returns the row of the article with the given date and title, or None if there is none."""
+        row = self._find(self.key_hashes, self.key_rows, date, title, lambda title: title)
+        if row is not None:
+            with self.lock:
+                self.exact_hits += 1
+            return row
+        row = self._find(self.normalized_hashes, self.normalized_rows, date, normalize_title(title), normalize_title)
+        with self.lock:
+            if row is not None:
+                self.normalized_hits += 1
+            else:
+                self.misses += 1
+        return row
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'exact_hits': self.exact_hits, 'normalized_hits': self.normalized_hits, 'misses': self.misses}
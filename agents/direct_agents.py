@@ -37,13 +37,23 @@ from agent_prompts.prompt_extraction_direct import extraction_prompt
 
 # to load the api implementation
 import APIs.api_implementation as api
-from APIs.api_implementation import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
-                        map_country_name_to_iso, map_iso_to_country_name, map_relation_description_to_cameo,
-                        map_cameo_to_relation,
-                        get_parent_relation, get_child_relations, get_sibling_relations, count_events, get_events,
-                        get_entity_distribution, get_relation_distribution, count_news_articles, get_news_articles,
-                        browse_news_article,
-                        set_default_end_date, get_default_end_date, use_end_date)
+if os.environ.get('MIRAI_API_SERVER'):
+    # call the APIs of a shared api_server process instead of loading the data and indexes in this process
+    from APIs.api_client import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
+                            map_country_name_to_iso, map_country_names_to_iso, map_iso_to_country_name,
+                            map_relation_description_to_cameo, map_relation_descriptions_to_cameo, map_cameo_to_relation,
+                            get_parent_relation, get_child_relations, get_sibling_relations, count_events, get_events,
+                            get_entity_distribution, get_relation_distribution, count_news_articles, get_news_articles,
+                            browse_news_article, count_events_many, get_entity_distribution_many, get_relation_distribution_many,
+                            set_default_end_date, get_default_end_date, use_end_date)
+else:
+    from APIs.api_implementation import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
+                            map_country_name_to_iso, map_country_names_to_iso, map_iso_to_country_name,
+                            map_relation_description_to_cameo, map_relation_descriptions_to_cameo, map_cameo_to_relation,
+                            get_parent_relation, get_child_relations, get_sibling_relations, count_events, get_events,
+                            get_entity_distribution, get_relation_distribution, count_news_articles, get_news_articles,
+                            browse_news_article, count_events_many, get_entity_distribution_many, get_relation_distribution_many,
+                            set_default_end_date, get_default_end_date, use_end_date)
 print('loaded api_implementation')
 
 OPENAI_API_KEY = os.environ['OPENAI_API_KEY']
@@ -313,10 +323,6 @@ if __name__ == '__main__':
     prompt_module_name = f'prompts_{args.plan}'
     prompt_module = importlib.import_module(prompt_module_name)
 
-    # load database
-    data_kg = pd.read_csv(os.path.join(args.data_dir, "data_kg.csv"), sep='\t', dtype=str)
-    data_news = pd.read_csv(os.path.join(args.data_dir, "data_news.csv"), sep='\t', dtype=str)
-
     # load api description
     api_dir = args.api_dir
     if args.api != 'full':
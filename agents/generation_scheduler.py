@@ -0,0 +1,147 @@
+from typing import Callable, List, Optional
+import threading
+import time
+
+
+class GenerationBackend:
+    """Interface of the open-model backends used by the agents to generate their next step."""
+
+    def generate(self, prompts: List[str]) -> List[str]:
+        """Generates one completion per prompt in one batch, returned in the order of the prompts."""
+        raise NotImplementedError
+
+
+class VLLMBackend(GenerationBackend):
+    """A vLLM engine, whose continuous batching runs all prompts of a batch together."""
+
+    def __init__(self, llm, sample_params):
+        self.llm = llm
+        self.sample_params = sample_params
+
+    def generate(self, prompts: List[str]) -> List[str]:
+        # vLLM returns the outputs in the order of the prompts
+        outputs = self.llm.generate(prompts, self.sample_params, use_tqdm=False)
+        return [output.outputs[0].text for output in outputs]
+
+
+class StubBackend(GenerationBackend):
+    """
+    CPU stand-in for a model, to test the scheduler without a GPU.
+
+    A batch takes batch_latency seconds plus prompt_latency per prompt, modelling an engine whose cost is dominated
+    by one pass per batch. Completions are given by respond(prompt), by default a fixed final answer.
+    """
+
+    def __init__(self, batch_latency: float = 0.2, prompt_latency: float = 0.005,
+                 respond: Optional[Callable[[str], str]] = None):
+        self.batch_latency = batch_latency
+        self.prompt_latency = prompt_latency
+        self.respond = respond or (lambda prompt: 'Thought: I have enough information.\nAction: Final Answer: {}')
+
+    def generate(self, prompts: List[str]) -> List[str]:
+        time.sleep(self.batch_latency + self.prompt_latency * len(prompts))
+        return [self.respond(prompt) for prompt in prompts]
+
+
+class _Request:
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.submitted = time.time()
+        self.done = threading.Event()
+        self.completion = None
+        self.error = None
+
+
+class BatchScheduler:
+    """
+    Collects the prompts of concurrently running agents and generates them in batches.
+
+    generate() is called by the agent threads and blocks until the completion of its prompt is ready. A background
+    thread sends the pending prompts to the backend as one batch, as soon as every one of the n_agents agents is
+    waiting or max_wait seconds after the oldest pending prompt, whichever comes first, and routes the completions
+    back. Batches take the oldest prompts first, so an agent waits for at most ceil(n_agents / max_batch_size) batches.
+    shutdown() generates the prompts still pending without waiting for more and stops the background thread.
+    """
+
+    def __init__(self, backend: GenerationBackend, n_agents: int = 1, max_batch_size: int = 64,
+                 max_wait: float = 0.05):
+        self.backend = backend
+        self.n_agents = n_agents
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = []
+        self.condition = threading.Condition()
+        self.batch_sizes = []
+        self.waits = []
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='BatchScheduler', daemon=True)
+        self.thread.start()
+
+    def generate(self, prompt: str) -> str:
+        request = _Request(prompt)
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("BatchScheduler is shut down")
+            self.pending.append(request)
+            self.condition.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.completion
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stops accepting prompts, generates the pending ones and waits up to timeout seconds for the thread to end."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+    def _next_batch(self) -> List[_Request]:
+        """The next batch of requests, or an empty list once shut down with nothing pending."""
+        with self.condition:
+            while not self.pending and not self.closed:
+                self.condition.wait()
+            if not self.pending:
+                return []
+            # wait for the other agents to submit their prompts, up to max_wait after the oldest one
+            deadline = self.pending[0].submitted + self.max_wait
+            while not self.closed and len(self.pending) < min(self.n_agents, self.max_batch_size):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            batch = self.pending[:self.max_batch_size]
+            del self.pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            started = time.time()
+            try:
+                completions = self.backend.generate([request.prompt for request in batch])
+                if len(completions) != len(batch):
+                    raise RuntimeError(f"Backend returned {len(completions)} completions for {len(batch)} prompts")
+            except Exception as e:
+                # the error is raised to every agent of the batch, which handles it like a failed model call
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+            self.batch_sizes.append(len(batch))
+            for request, completion in zip(batch, completions):
+                self.waits.append(started - request.submitted)
+                request.completion = completion
+                request.done.set()
+
+    def stats(self) -> dict:
+        """Number and mean size of the batches generated so far, and the mean and max queueing time of the prompts."""
+        n_batches = len(self.batch_sizes)
+        return {'batches': n_batches,
+                'prompts': sum(self.batch_sizes),
+                'mean_batch_size': sum(self.batch_sizes) / n_batches if n_batches else 0.0,
+                'mean_wait': sum(self.waits) / len(self.waits) if self.waits else 0.0,
+                'max_wait': max(self.waits) if self.waits else 0.0}
+
@@ -27,6 +27,12 @@ from tqdm import tqdm
 import argparse
 import os
 import io
+import contextlib
+import contextvars
+import ctypes
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # to load prompt template
 import importlib
@@ -34,17 +40,28 @@ from agent_prompts.prompt_extraction import extraction_prompt
 
 # to load the api implementation
 import APIs.api_implementation as api
-from APIs.api_implementation import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
-                        map_country_name_to_iso, map_iso_to_country_name, map_relation_description_to_cameo,
-                        map_cameo_to_relation,
-                        get_parent_relation, get_child_relations, get_sibling_relations, count_events, get_events,
-                        get_entity_distribution, get_relation_distribution, count_news_articles, get_news_articles,
-                        browse_news_article,
-                        set_default_end_date, get_default_end_date, use_end_date)
+if os.environ.get('MIRAI_API_SERVER'):
+    # call the APIs of a shared api_server process instead of loading the data and indexes in this process
+    from APIs.api_client import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
+                            map_country_name_to_iso, map_country_names_to_iso, map_iso_to_country_name,
+                            map_relation_description_to_cameo, map_relation_descriptions_to_cameo, map_cameo_to_relation,
+                            get_parent_relation, get_child_relations, get_sibling_relations, count_events, get_events,
+                            get_entity_distribution, get_relation_distribution, count_news_articles, get_news_articles,
+                            browse_news_article, count_events_many, get_entity_distribution_many, get_relation_distribution_many,
+                            set_default_end_date, get_default_end_date, use_end_date)
+else:
+    from APIs.api_implementation import (Date, DateRange, ISOCode, Country, CAMEOCode, Relation, Event, NewsArticle,
+                            map_country_name_to_iso, map_country_names_to_iso, map_iso_to_country_name,
+                            map_relation_description_to_cameo, map_relation_descriptions_to_cameo, map_cameo_to_relation,
+                            get_parent_relation, get_child_relations, get_sibling_relations, count_events, get_events,
+                            get_entity_distribution, get_relation_distribution, count_news_articles, get_news_articles,
+                            browse_news_article, count_events_many, get_entity_distribution_many, get_relation_distribution_many,
+                            set_default_end_date, get_default_end_date, use_end_date)
 print('loaded api_implementation')
 
 from vllm import LLM, SamplingParams
 import torch
+from generation_scheduler import BatchScheduler, VLLMBackend
 
 
 OPENAI_API_KEY = os.environ['OPENAI_API_KEY']
@@ -75,6 +92,80 @@ def handle_timeout(signum, frame):
 signal.signal(signal.SIGALRM, handle_timeout)
 
 
+# buffer capturing the output of the code action being executed, per thread so that concurrent agents capture only
+# their own output
+action_output = contextvars.ContextVar('action_output', default=None)
+
+class ContextOutput:
+    """Standard stream writing to the action_output buffer of the current thread if set, and to the wrapped stream otherwise."""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def target(self):
+        buffer = action_output.get()
+        return buffer if buffer is not None else self.stream
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+@contextlib.contextmanager
+def context_output():
+    """Routes sys.stdout and sys.stderr through ContextOutput while agents run, so that each captures its own action output."""
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = ContextOutput(stdout), ContextOutput(stderr)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+@contextlib.contextmanager
+def redirect_action_output(buffer):
+    """Redirects the output of the action run by this thread to buffer."""
+    if isinstance(sys.stdout, ContextOutput):
+        token = action_output.set(buffer)
+        try:
+            yield
+        finally:
+            action_output.reset(token)
+    else:
+        # a single agent outside of context_output(): the streams themselves are redirected
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = buffer, buffer
+        try:
+            yield
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+
+def exec_with_timeout(code_str, local_vars, timeout):
+    """
+    Runs code in a thread with the context of the caller, for agents not running in the main thread, where SIGALRM
+    cannot interrupt them. After timeout seconds, TimeoutError is raised in that thread and to the caller, which moves
+    on even if the code does not stop (e.g. while blocked in a C call): the code is then left running in the background.
+    """
+    error = []
+    def run():
+        try:
+            exec(code_str, globals(), local_vars)
+        except Exception as e:
+            error.append(e)
+
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread.ident), ctypes.py_object(TimeoutError))
+        thread.join(1)
+        raise TimeoutError(f"Execution time exceeded {timeout} seconds")
+    if error:
+        raise error[0]
+
+
 # color print
 def red(msg):
     return "\033[91m" + msg + "\033[0m"
@@ -115,6 +206,27 @@ def catch_openai_api_error():
     else:
         print(red("API error:", error))
 
+# the model stops generating a step before it starts the next part of the scratchpad
+STOP_LIST = ['Action:' , 'Observation:', 'Thought:']
+
+def load_open_model(react_llm_name, temperature, n_agents=1):
+    """Loads the vLLM model of a Llama or Mistral agent, behind a scheduler batching the steps of n_agents agents."""
+    if 'llama' in react_llm_name.lower():
+        llm_name = 'meta-llama/Meta-Llama-3-8B-Instruct'
+    else:
+        llm_name = 'mistralai/Mistral-7B-Instruct-v0.2'
+    llm = LLM(model=llm_name,
+              tensor_parallel_size=1,
+              dtype=torch.float16,
+              gpu_memory_utilization=0.7,
+              disable_log_stats=True)
+    sample_params = SamplingParams(temperature=temperature,
+                                   max_tokens=2048,
+                                   stop=STOP_LIST,
+                                   include_stop_str_in_output=False)
+    return BatchScheduler(VLLMBackend(llm, sample_params), n_agents=n_agents)
+
+
 class ReactAgent:
     def __init__(self,
                  action_type: str,
@@ -123,7 +235,8 @@ class ReactAgent:
                  max_steps: int = 30,
                  max_retries: int = 3,
                  react_llm_name = 'gpt-3.5-turbo-1106',
-                 temperature: float = 0.4
+                 temperature: float = 0.4,
+                 scheduler: BatchScheduler = None
                  ) -> None:
 
         self.action_type = action_type
@@ -164,7 +277,7 @@ class ReactAgent:
         self.temp = temperature
 
 
-        self.stop_list = ['Action:' , 'Observation:', 'Thought:']
+        self.stop_list = STOP_LIST
 
         if 'gpt-3.5' in react_llm_name:
             self.max_token_length = 15000
@@ -183,30 +296,12 @@ class ReactAgent:
                      model_kwargs = {"stop": self.stop_list})
             
         elif 'llama' in react_llm_name.lower():
-            llm_name = 'meta-llama/Meta-Llama-3-8B-Instruct'
             self.max_token_length = 32000
-            self.llm = LLM(model=llm_name,
-                           tensor_parallel_size=1,
-                           dtype=torch.float16,
-                           gpu_memory_utilization=0.7,
-                           disable_log_stats=True)
-            self.sample_params = SamplingParams(temperature=self.temp,
-                                                max_tokens=2048,
-                                                stop=self.stop_list,
-                                                include_stop_str_in_output=False)
-            
+            self.scheduler = scheduler or load_open_model(react_llm_name, self.temp)
+
         elif 'mistral' in react_llm_name.lower():
-            llm_name = 'mistralai/Mistral-7B-Instruct-v0.2'
             self.max_token_length = 8000
-            self.llm = LLM(model=llm_name,
-                           tensor_parallel_size=1,
-                           dtype=torch.float16,
-                           gpu_memory_utilization=0.7,
-                           disable_log_stats=True)
-            self.sample_params = SamplingParams(temperature=self.temp,
-                                                max_tokens=2048,
-                                                stop=self.stop_list,
-                                                include_stop_str_in_output=False)
+            self.scheduler = scheduler or load_open_model(react_llm_name, self.temp)
 
 
         self.enc = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -234,6 +329,8 @@ class ReactAgent:
         
         if reset:
             self.__reset_agent()
+        # the prompt is encoded once per query, then the tokens of each text appended to the scratchpad are added
+        self.n_tokens = len(self.enc.encode(sys_prompt + self._build_agent_prompt()))
 
         while True:
             if not self.is_finished():
@@ -248,7 +345,7 @@ class ReactAgent:
                     self.end_state = 'Max Steps Exceeded'
 
                 # check max token length
-                if len(self.enc.encode(sys_prompt + self._build_agent_prompt())) > self.max_token_length:
+                if self.n_tokens > self.max_token_length:
                     self.finished = True
                     self.end_state = 'Max Token Length Exceeded'
 
@@ -352,9 +449,11 @@ class ReactAgent:
                               "action": "",
                               "observation": "",
                               "state":"",
-                              "include_in_extraction": False})
+                              "include_in_extraction": False,
+                              "n_tokens": 0, # tokens added to the prompt by this step
+                              "total_tokens": self.n_tokens}) # tokens of the prompt after this step
 
-        self.scratchpad += f'\nThought:'
+        self.append_scratchpad(f'\nThought:')
         thought = ''
         retry = 0
         # ensure thought is not empty
@@ -371,7 +470,7 @@ class ReactAgent:
                 self.step_n += 1
                 return
         # self.json_log[-1]['thought_prompt'] = prompt
-        self.scratchpad += ' ' + thought
+        self.append_scratchpad(' ' + thought)
 
         print(f'\n============\nStep {self.step_n}:')
         print(green(f'\nThought: ' + thought))
@@ -379,7 +478,7 @@ class ReactAgent:
 
 
         # Act
-        self.scratchpad += f'\nAction:'
+        self.append_scratchpad(f'\nAction:')
         prompt, action = self.prompt_agent()
         # to handle openai error
         if len(prompt) == 0:
@@ -392,20 +491,20 @@ class ReactAgent:
 
         # process null action
         if action == None or action == '' or action == '\n':
-            self.scratchpad += " Your action is filtered due to empty content. Please make sure your action content does not start with ['Thought', 'Action', 'Observation'] and assume all the actions are permitted in this environment and take the action again."
+            self.append_scratchpad(" Your action is filtered due to empty content. Please make sure your action content does not start with ['Thought', 'Action', 'Observation'] and assume all the actions are permitted in this environment and take the action again.")
 
             # observe
             print(red(f'\nObservation: ' + "No feedback from the environment due to the null action."))
             self.json_log[-1]['observation'] = "No feedback from the environment due to the null action."
             self.json_log[-1]['state'] = 'Null Action'
             self.json_log[-1]['include_in_extraction'] = False
-            self.scratchpad += f'\nObservation: '
+            self.append_scratchpad(f'\nObservation: ')
             self.current_observation = "No feedback from the environment due to the null action."
-            self.scratchpad += self.current_observation + '\n'
+            self.append_scratchpad(self.current_observation + '\n')
             self.step_n += 1
             return
         else:
-            self.scratchpad += ' ' + action
+            self.append_scratchpad(' ' + action)
 
 
         self.performed_actions[action] = self.performed_actions.get(action, 0) + 1
@@ -419,7 +518,7 @@ class ReactAgent:
             self.current_observation = "The same action has been executed before. Try a different action with correct format. If you are collecting data with code, please make sure your action is a valid and executable code with correct syntax based on the API description; If you are making the final forecast, please start the action immediately with 'Final Answer:' without enclosing within triple backticks, for example, 'Action: Final Answer: {}'"
             self.json_log[-1]['observation'] = self.current_observation
             self.json_log[-1]['include_in_extraction'] = False
-            self.scratchpad += f'\nObservation: ' + self.current_observation + '\n'
+            self.append_scratchpad(f'\nObservation: ' + self.current_observation + '\n')
             self.step_n += 1
             return
         elif self.performed_actions[action] > self.max_retries:
@@ -428,7 +527,7 @@ class ReactAgent:
             self.current_observation = f"The same action has been executed over {self.max_retries} times. Early stop due to repeated actions."
             self.json_log[-1]['observation'] = self.current_observation
             self.json_log[-1]['include_in_extraction'] = False
-            self.scratchpad += f'\nObservation: ' + self.current_observation + '\n'
+            self.append_scratchpad(f'\nObservation: ' + self.current_observation + '\n')
             self.finished = True
             self.end_state = 'Repeated Actions'
             self.step_n += 1
@@ -446,7 +545,7 @@ class ReactAgent:
             self.json_log[-1]['state'] = 'Detect Final Answer'
             return
         else: # if answer does not contain 'Final Answer:', execute the action
-            self.scratchpad += f'\nObservation: '
+            self.append_scratchpad(f'\nObservation: ')
             code_str = action
 
             code_str = code_str.strip(' \n')
@@ -464,7 +563,7 @@ class ReactAgent:
                     else:
                         self.current_observation = str(code_output)
                     print(cyan(f'\nObservation: ' + self.current_observation))
-                    self.scratchpad += self.current_observation + '\n'
+                    self.append_scratchpad(self.current_observation + '\n')
                     self.json_log[-1]['observation'] = self.current_observation
                     self.json_log[-1]['state'] = 'Valid Action'
                     self.json_log[-1]['include_in_extraction'] = True
@@ -479,7 +578,7 @@ class ReactAgent:
                         self.current_observation = f"Illegal action: {e}. Early stop due to consecutive {self.max_retries} invalid actions."
                         self.json_log[-1]['observation'] = self.current_observation
                         self.json_log[-1]['include_in_extraction'] = False
-                        self.scratchpad += self.current_observation + '\n'
+                        self.append_scratchpad(self.current_observation + '\n')
                         self.finished = True
                         self.end_state = 'Invalid Action'
                         self.step_n += 1
@@ -490,7 +589,7 @@ class ReactAgent:
                         self.current_observation = f"Invalid action: {e}. {self.api_error_note}"
                         self.json_log[-1]['observation'] = self.current_observation
                         self.json_log[-1]['include_in_extraction'] = False
-                        self.scratchpad += self.current_observation + '\n'
+                        self.append_scratchpad(self.current_observation + '\n')
                         self.step_n += 1
                         return
 
@@ -499,26 +598,23 @@ class ReactAgent:
                 err = None
                 output_buffer = io.StringIO()
 
-                current_stdout = sys.stdout # Save the current standard output
-                current_stderr = sys.stderr # Save the current standard error
-
-                sys.stdout = output_buffer # Redirect standard output to the buffer
-                sys.stderr = output_buffer # Redirect standard error to the buffer
-
-                with warnings.catch_warnings():
+                # SIGALRM is only handled by the main thread, so the agents of a concurrent runner use a watchdog thread
+                use_alarm = threading.current_thread() is threading.main_thread()
+                with redirect_action_output(output_buffer), warnings.catch_warnings(): # Redirect standard output and error to the buffer
                     warnings.simplefilter("ignore")
-                    signal.alarm(300) # Set the alarm to 300 seconds
+                    if use_alarm:
+                        signal.alarm(300) # Set the alarm to 300 seconds
                     try:
-                        exec(code_str, globals(), self.local_vars)
-                        # Reset the alarm
-                        signal.alarm(0)
+                        if use_alarm:
+                            exec(code_str, globals(), self.local_vars)
+                            # Reset the alarm
+                            signal.alarm(0)
+                        else:
+                            exec_with_timeout(code_str, self.local_vars, 300)
                     except Exception as e:
                         err = e
                         # print(f"Illegal action: {e}. {self.api_error_note}")
 
-                sys.stdout = current_stdout # Restore the original standard output
-                sys.stderr = current_stderr # Restore the original standard error
-
                 code_output = output_buffer.getvalue() # Get the output from the buffer
                 output_buffer.close()
 
@@ -531,7 +627,7 @@ class ReactAgent:
                         self.current_observation = f"Illegal action: {err}. Early stop due to consecutive {self.max_retries} invalid actions."
                         self.json_log[-1]['observation'] = self.current_observation
                         self.json_log[-1]['include_in_extraction'] = False
-                        self.scratchpad += self.current_observation + '\n'
+                        self.append_scratchpad(self.current_observation + '\n')
                         self.finished = True
                         self.end_state = 'Invalid Action'
                         self.step_n += 1
@@ -542,7 +638,7 @@ class ReactAgent:
                         self.current_observation = f"Invalid action: {err}. {self.api_error_note}"
                         self.json_log[-1]['observation'] = self.current_observation
                         self.json_log[-1]['include_in_extraction'] = False
-                        self.scratchpad += self.current_observation + '\n'
+                        self.append_scratchpad(self.current_observation + '\n')
                         self.step_n += 1
                         return
                 elif len(code_output) == 0: # no error but no output
@@ -550,7 +646,7 @@ class ReactAgent:
                     if 'print(' in code_str:
                         self.current_observation = "No printed output from the action because you are printing an empty object."
                         print(red(f'\nObservation: ' + self.current_observation))
-                        self.scratchpad += self.current_observation + '\n'
+                        self.append_scratchpad(self.current_observation + '\n')
                         self.json_log[-1]['observation'] = self.current_observation
                         self.json_log[-1]['state'] = 'Valid Action'
                         self.json_log[-1]['include_in_extraction'] = True
@@ -565,7 +661,7 @@ class ReactAgent:
                             self.current_observation = f"Illegal action: No print() statement in the action. Early stop due to consecutive {self.max_retries} invalid actions."
                             self.json_log[-1]['observation'] = self.current_observation
                             self.json_log[-1]['include_in_extraction'] = False
-                            self.scratchpad += self.current_observation + '\n'
+                            self.append_scratchpad(self.current_observation + '\n')
                             self.finished = True
                             self.end_state = 'Invalid Action'
                             self.step_n += 1
@@ -576,14 +672,14 @@ class ReactAgent:
                             self.current_observation = f"Invalid action: No print() statement in the action. {self.api_error_note}"
                             self.json_log[-1]['observation'] = self.current_observation
                             self.json_log[-1]['include_in_extraction'] = False
-                            self.scratchpad += self.current_observation + '\n'
+                            self.append_scratchpad(self.current_observation + '\n')
                             self.step_n += 1
                             return
                 # if no error and have output, this is a valid action
                 else: # len(code_output) > 0 and e == None:
                     self.current_observation = str(code_output)
                     print(cyan(f'\nObservation: ' + self.current_observation))
-                    self.scratchpad += self.current_observation + '\n'
+                    self.append_scratchpad(self.current_observation + '\n')
                     self.json_log[-1]['observation'] = self.current_observation
                     self.json_log[-1]['state'] = 'Valid Action'
                     self.json_log[-1]['include_in_extraction'] = True
@@ -605,7 +701,7 @@ class ReactAgent:
                     return prompt, request.strip(' \n')
                 except Exception as e:
                     print(red(f"Error: {e}"))
-                    print(red('prompt len:' + str(len(self.enc.encode(sys_prompt + prompt)))))
+                    print(red('prompt len:' + str(self.n_tokens)))
                     time.sleep(5)
                     trial += 1
                     err = str(e)
@@ -613,7 +709,7 @@ class ReactAgent:
         elif 'llama' in self.react_name.lower():
             instruct_prompt = self.generate_llama3_instruct_prompt(sys_prompt, prompt, self.scratchpad)
             try:
-                response = self.llm.generate(instruct_prompt, self.sample_params)[0].outputs[0].text
+                response = self.scheduler.generate(instruct_prompt)
                 # print("-------instruct_prompt-------")
                 # print(instruct_prompt)
                 # print("-------instruct_prompt-------")
@@ -624,7 +720,7 @@ class ReactAgent:
         elif 'mistral' in self.react_name.lower():
             instruct_prompt = self.generate_mistral_instruct_prompt(sys_prompt, prompt, self.scratchpad)
             try:
-                response = self.llm.generate(instruct_prompt, self.sample_params)[0].outputs[0].text
+                response = self.scheduler.generate(instruct_prompt)
                 # print("-------instruct_prompt-------")
                 # print(instruct_prompt)
                 # print("-------instruct_prompt-------")
@@ -695,6 +791,15 @@ class ReactAgent:
                 actor2_code = self.query_info['Actor2CountryCode'],
                 scratchpad = self.scratchpad)
 
+    def append_scratchpad(self, text: str) -> None:
+        """Appends text to the scratchpad, counting its tokens in the prompt length and in the current step."""
+        self.scratchpad += text
+        n_tokens = len(self.enc.encode(text))
+        self.n_tokens += n_tokens
+        if self.json_log:
+            self.json_log[-1]['n_tokens'] += n_tokens
+            self.json_log[-1]['total_tokens'] = self.n_tokens
+
     def is_finished(self) -> bool:
         return self.finished
 
@@ -704,6 +809,7 @@ class ReactAgent:
         self.finished = False
         self.answer = ''
         self.scratchpad = ''
+        self.n_tokens = 0
         self.json_log = []
         self.current_observation = ''
         self.performed_actions = {}
@@ -730,6 +836,68 @@ class ReactAgent:
     #         return 'Failed to verbalize the relation code. Error: {}'.format(e)
 
 
+def run_query(agent, row, output_dir, timediff):
+    """Answers one query as of timediff days before its date and writes the result to output_dir/<QueryId>.json."""
+    query_id = row['QueryId']
+    query_date = row['DateStr']
+    curr_date = datetime.datetime.strptime(query_date, '%Y-%m-%d') - datetime.timedelta(days=timediff)
+    curr_date_str = curr_date.strftime('%Y-%m-%d')
+    set_default_end_date(curr_date_str)
+    use_end_date()
+
+    # check if the output file directory exists
+    output_file_dir = os.path.join(output_dir, query_id + '.json')
+    result = [{}]
+
+    end_state, n_steps, answer, scratchpad, json_log, sys_prompt, ext_prompt, ext_request  = agent.run(row)
+
+    result[-1]['query_id'] = query_id
+    result[-1]['n_steps'] = n_steps
+    result[-1]['end_state'] = end_state
+    result[-1]['answer'] = answer
+    result[-1]['gt_answer'] = row['AnswerDict']
+    result[-1]['json_log'] = json_log
+    result[-1]['sys_prompt'] = sys_prompt
+    result[-1]['scratchpad'] = scratchpad
+    result[-1]['ext_prompt'] = ext_prompt
+    result[-1]['ext_request'] = ext_request
+
+    # write to json file
+    with open(output_file_dir, 'w') as f:
+        json.dump(result, f, indent=4)
+
+def run_queries(agents, data_query, output_dir, timediff):
+    """
+    Answers all queries of data_query with a bounded pool of agents, each running one query at a time.
+
+    With a single agent the queries run one after another in this thread. With more, they run in as many threads,
+    which mostly wait on the LLM; each query runs in a fresh context, so that its default end date (the as-of date of
+    the API calls) and its captured action output belong to that query only.
+    """
+    with context_output():
+        if len(agents) == 1:
+            for _, row in tqdm(data_query.iterrows(), total=len(data_query)):
+                run_query(agents[0], row, output_dir, timediff)
+        else:
+            run_concurrently(agents, data_query, output_dir, timediff)
+
+def run_concurrently(agents, data_query, output_dir, timediff):
+    idle_agents = queue.Queue()
+    for agent in agents:
+        idle_agents.put(agent)
+
+    def run(row):
+        agent = idle_agents.get()
+        try:
+            run_query(agent, row, output_dir, timediff)
+        finally:
+            idle_agents.put(agent)
+
+    with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+        futures = [executor.submit(contextvars.Context().run, run, row) for _, row in data_query.iterrows()]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            future.result()
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
@@ -751,6 +919,7 @@ if __name__ == '__main__':
     parser.add_argument("--action", type=str, default="func", choices=["func", "block"], help="action type")
     parser.add_argument("--api", type=str, default="full", choices=["full", "kg", "news"], help="api type")
     parser.add_argument("--max_steps", type=int, default=20, help="maximum action steps")
+    parser.add_argument("--workers", type=int, default=1, help="number of queries answered concurrently, each by its own agent")
 
     parser.add_argument("--output_dir", type=str, default="./../output")
     parser.add_argument("--data_dir", type=str, default="./../data/MIRAI")
@@ -759,6 +928,8 @@ if __name__ == '__main__':
     parser.add_argument("--alias", type=str, default="", help="alias for the output file")
 
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
 
     # make output directory
     if not os.path.exists(args.output_dir):
@@ -775,11 +946,6 @@ if __name__ == '__main__':
         prompt_module_name += '_open'
     prompt_module = importlib.import_module(prompt_module_name)
 
-    # load database
-    data_kg = pd.read_csv(os.path.join(args.data_dir, "data_kg.csv"), sep='\t', dtype=str)
-    data_news = pd.read_csv(os.path.join(args.data_dir, "data_news.csv"), sep='\t', dtype=str)
-    # dict_code2relation = json.load(open('./../data/info/dict_code2relation.json'))
-
     # load api description
     api_dir = args.api_dir
     if args.api != 'full':
@@ -791,9 +957,17 @@ if __name__ == '__main__':
 
     query_ids = [i for i in range(1, len(data_query) + 1)]
 
-    agent = ReactAgent(action_type=args.action,
-                       max_steps=args.max_steps, prompt_module=prompt_module,
-                       api_description=api_description, react_llm_name=args.model_name, temperature=args.temperature)
+    # the agents of an open model share one copy of it, generating their steps in batches
+    scheduler = None
+    if ('llama' in args.model_name.lower()) or ('mistral' in args.model_name.lower()):
+        scheduler = load_open_model(args.model_name, args.temperature, n_agents=args.workers)
+
+    # one agent per worker, each running one query at a time
+    agents = [ReactAgent(action_type=args.action,
+                         max_steps=args.max_steps, prompt_module=prompt_module,
+                         api_description=api_description, react_llm_name=args.model_name, temperature=args.temperature,
+                         scheduler=scheduler)
+              for _ in range(args.workers)]
 
     for curr_round in range(args.rounds):
         print(f"Round {curr_round + 1}")
@@ -802,41 +976,8 @@ if __name__ == '__main__':
         if not os.path.exists(curr_round_output_dir):
             os.makedirs(curr_round_output_dir)
 
-        # run the agent
-        for rowid, row in tqdm(data_query.iterrows(), total=len(data_query)):
-            query_id = row['QueryId']
-            query_date = row['DateStr']
-            curr_date = datetime.datetime.strptime(query_date, '%Y-%m-%d') - datetime.timedelta(days=args.timediff)
-            curr_date_str = curr_date.strftime('%Y-%m-%d')
-            set_default_end_date(curr_date_str)
-            use_end_date()
-
-            # check if the output file directory exists
-            output_file_dir = os.path.join(curr_round_output_dir, query_id + '.json')
-            result = [{}]
-
-            end_state, n_steps, answer, scratchpad, json_log, sys_prompt, ext_prompt, ext_request  = agent.run(row)
-
-            # print('\n============\nFinal Status:\n')
-            # print(f'End State: {end_state}')
-            # print(f'Number of Steps Taken: {n_steps}\n')
-            # print(f'Final Answer: {answer}')
-            # print(f'Ground Truth Answer: {row["AnswerDict"]}\n')
-            # print(f'Final Answer (Verbalized): {agent.verbalize_relation_code(dict_code2relation, eval(answer))}')
-            # print(f'Ground Truth Answer (Verbalized): {agent.verbalize_relation_code(dict_code2relation, eval(row["AnswerDict"]))}')
-
-            result[-1]['query_id'] = query_id
-            result[-1]['n_steps'] = n_steps
-            result[-1]['end_state'] = end_state
-            result[-1]['answer'] = answer
-            result[-1]['gt_answer'] = row['AnswerDict']
-            result[-1]['json_log'] = json_log
-            result[-1]['sys_prompt'] = sys_prompt
-            result[-1]['scratchpad'] = scratchpad
-            result[-1]['ext_prompt'] = ext_prompt
-            result[-1]['ext_request'] = ext_request
-
-            # write to json file
-            with open(output_file_dir, 'w') as f:
-                json.dump(result, f, indent=4)
+        # run the agents
+        run_queries(agents, data_query, curr_round_output_dir, args.timediff)
 
+    if scheduler is not None:
+        scheduler.shutdown()
@@ -0,0 +1,127 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import datetime
+import argparse
+import statistics
+import pandas as pd
+from tqdm import tqdm
+
+import APIs.api_implementation as api
+from APIs.api_implementation import (Date, DateRange, ISOCode, CAMEOCode, dict_code2relation,
+                                     count_events, get_events, get_entity_distribution, get_relation_distribution,
+                                     count_news_articles, set_default_end_date)
+
+
+# reference implementations of the original full-scan pandas path over the CSV data, used as the "before" measurement
+def legacy_filter(date_range=None, head_entities=None, tail_entities=None, relations=None, dedup=True):
+    curr_data = data_kg.copy()
+    if dedup:
+        curr_data.drop_duplicates(subset=['QuadEventCode'], inplace=True)
+    curr_data = curr_data[curr_data['DateStr'] <= api.DEFAULT_END_DATE]
+    if date_range:
+        curr_data = curr_data[(curr_data['DateStr'] >= date_range.start_date.date) & (curr_data['DateStr'] <= date_range.end_date.date)]
+    if head_entities:
+        curr_data = curr_data[curr_data['Actor1CountryCode'].isin([iso.code for iso in head_entities])]
+    if tail_entities:
+        curr_data = curr_data[curr_data['Actor2CountryCode'].isin([iso.code for iso in tail_entities])]
+    if relations:
+        codes = [code.code for code in relations]
+        codes += [c for c in dict_code2relation if c[:2] in codes and len(c) == 3]
+        curr_data = curr_data[curr_data['EventBaseCode'].isin(codes)]
+    return curr_data
+
+def legacy_count_events(date_range=None, head_entities=None, tail_entities=None, relations=None):
+    return len(legacy_filter(date_range, head_entities, tail_entities, relations))
+
+def legacy_get_events(date_range=None, head_entities=None, tail_entities=None, relations=None):
+    curr_data = legacy_filter(date_range, head_entities, tail_entities, relations, dedup=False)
+    curr_data = curr_data.drop_duplicates(subset=['QuadEventCode']).sort_values(by='DateStr', ascending=False)
+    return [(row['DateStr'], row['Actor1CountryCode'], row['EventBaseCode'], row['Actor2CountryCode']) for _, row in curr_data.head(30).iterrows()]
+
+def legacy_get_entity_distribution(date_range=None, interacted_entities=None):
+    curr_data = legacy_filter(date_range)
+    codes = [iso.code for iso in interacted_entities]
+    curr_data = curr_data[(curr_data['Actor1CountryCode'].isin(codes)) | (curr_data['Actor2CountryCode'].isin(codes))]
+    return pd.concat([curr_data['Actor1CountryCode'], curr_data['Actor2CountryCode']]).value_counts().to_dict()
+
+def legacy_get_relation_distribution(date_range=None, head_entities=None, tail_entities=None):
+    return legacy_filter(date_range, head_entities, tail_entities)['EventBaseCode'].value_counts().to_dict()
+
+def legacy_count_news_articles(date_range=None, head_entities=None, tail_entities=None):
+    curr_data = legacy_filter(date_range, head_entities, tail_entities)
+    docids_list = [eval(docids) for docids in curr_data['Docids'].unique().tolist()]
+    docids = list(set([item for sublist in docids_list for item in sublist]))
+    docids = [str(docid) for docid in docids]
+    return len(data_news[data_news['Docid'].isin(docids)])
+
+
+def build_cases(query):
+    # the calls an agent typically issues for a (head, tail) query: pair counts, pair distributions and entity neighbourhoods
+    head, tail = [ISOCode(query['Actor1CountryCode'])], [ISOCode(query['Actor2CountryCode'])]
+    recent = DateRange(start_date=Date((datetime.datetime.strptime(api.DEFAULT_END_DATE, '%Y-%m-%d') - datetime.timedelta(days=90)).strftime('%Y-%m-%d')))
+    return {
+        'count_events': (legacy_count_events, count_events, dict(head_entities=head, tail_entities=tail)),
+        'count_events(range)': (legacy_count_events, count_events, dict(date_range=recent, head_entities=head)),
+        'get_events': (legacy_get_events, get_events, dict(head_entities=head, tail_entities=tail)),
+        'get_entity_distribution': (legacy_get_entity_distribution, get_entity_distribution, dict(date_range=recent, interacted_entities=head)),
+        'get_relation_distribution': (legacy_get_relation_distribution, get_relation_distribution, dict(head_entities=head, tail_entities=tail)),
+        'count_news_articles': (legacy_count_news_articles, count_news_articles, dict(head_entities=head, tail_entities=tail)),
+    }
+
+def normalize(output):
+    # make legacy and current outputs comparable
+    if isinstance(output, dict):
+        return sorted((str(getattr(key, 'code', key)), value) for key, value in output.items())
+    if isinstance(output, list):
+        return sorted(str(item) for item in output)
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", type=str, default="test_subset", choices=["test", "test_subset"])
+    parser.add_argument("--data_dir", type=str, default="./../data/MIRAI")
+    parser.add_argument("--timediff", type=int, default=1, help="date difference from the query date to the current date")
+    parser.add_argument("--n_queries", type=int, default=20, help="number of queries to benchmark")
+    parser.add_argument("--skip_legacy", action="store_true", help="only time the current implementation")
+    args = parser.parse_args()
+
+    data_kg = pd.read_csv(os.path.join(args.data_dir, 'data_kg.csv'), sep='\t', dtype=str)
+    data_news = pd.read_csv(os.path.join(args.data_dir, 'data_news.csv'), sep='\t', dtype=str)
+    data_query = pd.read_csv(os.path.join(args.data_dir, args.dataset, 'relation_query.csv'), sep='\t', dtype=str)
+    data_query = data_query.head(args.n_queries)
+
+    # no result caching, so that every call is computed
+    api.result_cache.max_bytes = 0
+
+    timings = {}
+    mismatches = 0
+    for _, query in tqdm(data_query.iterrows(), total=len(data_query)):
+        curr_date = datetime.datetime.strptime(query['DateStr'], '%Y-%m-%d') - datetime.timedelta(days=args.timediff)
+        set_default_end_date(curr_date.strftime('%Y-%m-%d'))
+        for name, (legacy_func, func, kwargs) in build_cases(query).items():
+            start = time.perf_counter()
+            output = func(**kwargs)
+            timings.setdefault(name, {'before': [], 'after': []})['after'].append(time.perf_counter() - start)
+            if args.skip_legacy:
+                continue
+            start = time.perf_counter()
+            legacy_output = legacy_func(**kwargs)
+            timings[name]['before'].append(time.perf_counter() - start)
+            if name != 'get_events' and normalize(output) != normalize(legacy_output):
+                mismatches += 1
+                print(f'Mismatch in {name} for query {query["QueryId"]}')
+
+    print(f"\n{'function':<28}{'before (ms/call)':>18}{'after (ms/call)':>18}{'speedup':>10}")
+    for name, timing in timings.items():
+        after = statistics.mean(timing['after']) * 1000
+        if timing['before']:
+            before = statistics.mean(timing['before']) * 1000
+            print(f"{name:<28}{before:>18.2f}{after:>18.2f}{before / after:>9.1f}x")
+        else:
+            print(f"{name:<28}{'-':>18}{after:>18.2f}{'-':>10}")
+    if not args.skip_legacy:
+        print(f'\nresult mismatches: {mismatches}')
@@ -0,0 +1,68 @@
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import argparse
+import statistics
+import numpy as np
+
+import APIs.api_implementation as api
+from APIs.api_implementation import event_index, kg_backend
+from event_index import ordinal_to_date
+
+
+# per-call latency of counts and distributions by date-range width: scanning the filtered events of the event index
+# against prefix-sum differences over the count cube, and the path ArrayBackend chooses for that width
+def scan_counts(start_date, end_date, head_table, relation_table):
+    positions = event_index.select(start_date=start_date, end_date=end_date)
+    positions = positions[head_table[event_index.heads[positions]]]
+    return len(positions), event_index.relation_counts(positions), event_index.entity_counts(positions[relation_table[event_index.relations[positions]]])
+
+def cube_counts(start_date, end_date, head_table, relation_table):
+    cells = count_cube.select_cells(head_table=head_table)
+    relation_cells = cells[relation_table[count_cube.cell_relations[cells]]]
+    return count_cube.count(cells, start_date, end_date), count_cube.relation_counts(cells, start_date, end_date), count_cube.entity_counts(relation_cells, start_date, end_date)
+
+def time_calls(func, cases, repeat):
+    timings = []
+    for case in cases:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(*case)
+        timings.append((time.perf_counter() - start) / repeat)
+    return statistics.mean(timings) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 7, 30, 90, 180, 365], help="date-range widths in days")
+    parser.add_argument("--n_entities", type=int, default=20, help="number of most frequent head entities to query")
+    parser.add_argument("--repeat", type=int, default=20, help="number of calls per case")
+    args = parser.parse_args()
+
+    # no result caching, so that every call is computed
+    api.result_cache.max_bytes = 0
+    # the cube is built here whatever the size of the KG, while the backend only loads it when it pays off
+    count_cube = api._load_count_cube(event_index, api.source_signature(api.data_kg_path))
+
+    last_day = int(event_index.dates[-1])
+    head_ids = np.argsort(-event_index.entity_counts(np.arange(len(event_index)), tails=False), kind='stable')[:args.n_entities]
+    relation_table = event_index.relation_table([code for code in event_index.relation_vocab.tolist() if code[:2] in ('04', '05')])
+
+    print(f"{len(event_index)} events, {len(count_cube)} cube cells, {len(count_cube.keys)} non-empty (cell, day) entries")
+    print(f"\n{'width (days)':<14}{'scan (ms/call)':>16}{'cube (ms/call)':>16}{'speedup':>10}{'chosen':>8}")
+    mismatches = 0
+    for width in args.widths:
+        cases = []
+        for head_id in head_ids:
+            head_table = np.zeros(len(event_index.entity_vocab), dtype=bool)
+            head_table[head_id] = True
+            cases.append((ordinal_to_date(last_day - width + 1), ordinal_to_date(last_day), head_table, relation_table))
+        for case in cases:
+            scanned, cubed = scan_counts(*case), cube_counts(*case)
+            mismatches += scanned[0] != cubed[0] or not all(np.array_equal(a, b) for a, b in zip(scanned[1:], cubed[1:]))
+        scan_ms, cube_ms = time_calls(scan_counts, cases, args.repeat), time_calls(cube_counts, cases, args.repeat)
+        chosen = 'cube' if kg_backend._use_cube(*cases[0][:2]) else 'scan'
+        print(f"{width:<14}{scan_ms:>16.3f}{cube_ms:>16.3f}{scan_ms / cube_ms:>9.1f}x{chosen:>8}")
+    print(f'\nresult mismatches: {mismatches}')
@@ -0,0 +1,28 @@
+import os
+import sys
+import threading
+from multiprocessing.connection import Listener
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from APIs.api_server import _serve_connection
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Address of an api_server loop running in a thread of the test process, with authkey b'test'."""
+    address = str(tmp_path / 'api.sock')
+    listener = Listener(address, authkey=b'test')
+
+    def accept():
+        while True:
+            try:
+                connection = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=_serve_connection, args=(connection,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield address
+    listener.close()
@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import APIs.api_implementation as api
+from APIs.api_client import APIClient
+
+
+@pytest.fixture
+def client(server):
+    client = APIClient(server, authkey=b'test', pool_size=2)
+    yield client
+    client.close()
+
+
+def test_results_match_the_local_api(client):
+    try:
+        api.set_default_end_date('2023-11-15')
+        for name, args in [('count_events', ()), ('get_entity_distribution', ()), ('get_relation_distribution', ()),
+                           ('count_events_many', ([{'head_entities': [api.ISOCode('USA')]}, {}],)),
+                           ('map_country_names_to_iso', (['China', 'United States', 'china'],))]:
+            assert client.call(name, *args) == getattr(api, name)(*args)
+        assert client.call('get_events', head_entities=[api.ISOCode('USA')], limit=5) == api.get_events(head_entities=[api.ISOCode('USA')], limit=5)
+    finally:
+        api.set_default_end_date(None)
+
+
+def test_each_thread_sends_its_end_date(client):
+    counts = {}
+
+    def count(end_date):
+        api.set_default_end_date(end_date)
+        counts[end_date] = [client.call('count_events') for _ in range(5)]
+
+    threads = [threading.Thread(target=count, args=(end_date,)) for end_date in ['2023-03-01', '2023-06-01', '2023-11-30']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for end_date, results in counts.items():
+        api.set_default_end_date(end_date)
+        assert results == [api.count_events()] * 5
+    api.set_default_end_date(None)
+
+
+def test_errors_are_raised_and_the_connection_reused(client):
+    with pytest.raises(ValueError):
+        client.call('map_iso_to_country_name', 'USA')
+    with pytest.raises(AttributeError):
+        client.call('_load_data')
+    assert len(client.idle_connections) == 1
+    assert client.call('map_iso_to_country_name', api.ISOCode('USA')) == api.map_iso_to_country_name(api.ISOCode('USA'))
+    assert len(client.idle_connections) == 1
+
+
+def test_missing_authkey_is_reported(server):
+    with pytest.raises(ValueError):
+        APIClient(server).call('count_events')
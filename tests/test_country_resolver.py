@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'APIs'))
+from country_resolver import CountryResolver, edit_distance
+
+DICT_ISO2ALTERNAMES = {
+    'USA': ['United States', 'USA', 'America', 'United States of America'],
+    'CHN': ['China', "People's Republic of China"],
+    'DEU': ['Germany', 'Deutschland'],
+    'FRA': ['France', 'French Republic'],
+    'IRN': ['Iran'],
+    'IRQ': ['Iraq'],
+}
+
+
+def test_edit_distance():
+    assert edit_distance('chna', 'china') == 1
+    assert edit_distance('frnace', 'france') == 1 # transposition
+    assert edit_distance('us', 'usa') == 1
+    assert edit_distance('iran', 'iraq') == 1
+    assert edit_distance('', 'abc') == 3
+
+
+def test_short_misspellings_resolve_locally():
+    resolver = CountryResolver(DICT_ISO2ALTERNAMES)
+    assert resolver.resolve('chna') == ('ngram', ['CHN'])
+    assert resolver.resolve('U.S.') == ('ngram', ['USA'])
+    assert resolver.resolve('Grmany') == ('ngram', ['DEU'])
+    assert resolver.resolve('Frnace') == ('ngram', ['FRA'])
+    assert set(resolver.resolve('Irak')[1]) == {'IRN', 'IRQ'}
+
+
+def test_unrelated_names_fall_back_to_embeddings():
+    resolver = CountryResolver(DICT_ISO2ALTERNAMES)
+    assert resolver.resolve('Atlantis') == ('embedding', [])
+    assert resolver.resolve('xq') == ('embedding', [])
+
+
+def test_earlier_tiers():
+    resolver = CountryResolver(DICT_ISO2ALTERNAMES)
+    assert resolver.resolve('China') == ('exact', ['CHN'])
+    assert resolver.resolve('  united   STATES ') == ('normalized', ['USA'])
+    assert resolver.resolve('Deutsch') == ('prefix', ['DEU'])
+
+
+def test_tier_counts_under_concurrent_lookups():
+    resolver = CountryResolver(DICT_ISO2ALTERNAMES)
+
+    def lookups():
+        for _ in range(1000):
+            resolver.resolve('chna')
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resolver.stats()['ngram']['count'] == 8000
@@ -0,0 +1,131 @@
+import os
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'agents'))
+from generation_scheduler import BatchScheduler, StubBackend
+
+
+class RecordingBackend(StubBackend):
+    """Stub backend that answers with the prompt itself and records the size of each batch."""
+
+    def __init__(self, **kwargs):
+        super().__init__(respond=lambda prompt: f'completion of {prompt}', **kwargs)
+        self.batches = []
+
+    def generate(self, prompts):
+        self.batches.append(len(prompts))
+        return super().generate(prompts)
+
+
+class FailingBackend(StubBackend):
+    def generate(self, prompts):
+        time.sleep(self.batch_latency)
+        raise ValueError('engine failed')
+
+
+def run_agents(scheduler, n_agents, n_steps, action_time=0.01):
+    """Agents alternating between generating a step and running its action, as in react_agents."""
+    results = {}
+    errors = []
+
+    def agent(i):
+        rng = random.Random(i)
+        try:
+            for step in range(n_steps):
+                prompt = f'agent {i} step {step}'
+                results[prompt] = scheduler.generate(prompt)
+                time.sleep(rng.uniform(0, action_time))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=agent, args=(i,)) for i in range(n_agents)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+    return results, errors
+
+
+def test_each_request_gets_its_own_completion():
+    backend = RecordingBackend(batch_latency=0.01, prompt_latency=0.0)
+    scheduler = BatchScheduler(backend, n_agents=16, max_batch_size=64, max_wait=0.05)
+    results, errors = run_agents(scheduler, n_agents=16, n_steps=5)
+    scheduler.shutdown()
+    assert errors == []
+    assert len(results) == 16 * 5
+    assert all(completion == f'completion of {prompt}' for prompt, completion in results.items())
+    stats = scheduler.stats()
+    assert stats['prompts'] == 16 * 5
+    # concurrent agents share batches
+    assert stats['batches'] < stats['prompts']
+
+
+@pytest.mark.parametrize('max_batch_size', [1, 3, 8])
+def test_batch_size_is_bounded(max_batch_size):
+    backend = RecordingBackend(batch_latency=0.01, prompt_latency=0.0)
+    scheduler = BatchScheduler(backend, n_agents=12, max_batch_size=max_batch_size, max_wait=0.05)
+    results, errors = run_agents(scheduler, n_agents=12, n_steps=3)
+    scheduler.shutdown()
+    assert errors == [] and len(results) == 12 * 3
+    assert sum(backend.batches) == 12 * 3
+    assert max(backend.batches) <= max_batch_size
+
+
+def test_backend_error_reaches_every_waiting_agent():
+    scheduler = BatchScheduler(FailingBackend(batch_latency=0.01), n_agents=8, max_wait=0.05)
+    results, errors = run_agents(scheduler, n_agents=8, n_steps=2)
+    assert results == {}
+    assert len(errors) == 8 and all(isinstance(e, ValueError) for e in errors)
+    # the scheduler keeps serving after a failed batch
+    with pytest.raises(ValueError):
+        scheduler.generate('again')
+    scheduler.shutdown(timeout=5)
+    assert not scheduler.thread.is_alive()
+
+
+def test_completion_count_mismatch_is_an_error():
+    backend = StubBackend(batch_latency=0.0, prompt_latency=0.0)
+    backend.generate = lambda prompts: []
+    scheduler = BatchScheduler(backend)
+    with pytest.raises(RuntimeError):
+        scheduler.generate('prompt')
+    scheduler.shutdown(timeout=5)
+
+
+def test_shutdown_drains_pending_prompts():
+    backend = RecordingBackend(batch_latency=0.05, prompt_latency=0.0)
+    # the scheduler would wait for 100 agents or 60 seconds before the first batch
+    scheduler = BatchScheduler(backend, n_agents=100, max_wait=60)
+    results = {}
+
+    def agent(i):
+        results[i] = scheduler.generate(f'prompt {i}')
+
+    threads = [threading.Thread(target=agent, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    while len(scheduler.pending) < 5:
+        time.sleep(0.01)
+    started = time.time()
+    scheduler.shutdown(timeout=10)
+    for thread in threads:
+        thread.join(timeout=10)
+    assert time.time() - started < 10
+    assert not scheduler.thread.is_alive()
+    assert results == {i: f'completion of prompt {i}' for i in range(5)}
+    assert backend.batches == [5]
+    with pytest.raises(RuntimeError):
+        scheduler.generate('late prompt')
+
+
+def test_shutdown_of_idle_scheduler():
+    scheduler = BatchScheduler(StubBackend())
+    scheduler.shutdown(timeout=5)
+    assert not scheduler.thread.is_alive()
+    assert scheduler.stats()['batches'] == 0
@@ -0,0 +1,97 @@
+import os
+import pickle
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import APIs.api_implementation as api
+from APIs.api_client import APIClient
+from APIs.result_cache import ResultCache
+
+
+def values():
+    usa = api.ISOCode('USA')
+    code = api.CAMEOCode('042')
+    relation = api.dict_code2relation['042']
+    return [api.Date('2023-11-01'), usa, api.Country(usa, 'United States'), code,
+            api.Relation(code, relation['Name'], relation['Description']),
+            api.Event(api.Date('2023-11-01'), usa, code, api.ISOCode('CHN'))]
+
+
+def test_equal_values_are_one_instance():
+    assert api.ISOCode('USA') is api.ISOCode('USA')
+    assert api.ISOCode(code='USA') is api.ISOCode('USA')
+    assert api.CAMEOCode('042') is api.CAMEOCode('042')
+    assert api.Date('2023-11-01') is api.Date('2023-11-01')
+    assert api.ISOCode('USA') is not api.ISOCode('CHN')
+    for value in values():
+        assert type(value)(*(getattr(value, field) for field in value._fields)) is value
+
+
+def test_invalid_values_are_still_rejected():
+    with pytest.raises(ValueError):
+        api.ISOCode('XYZ')
+    with pytest.raises(ValueError):
+        api.ISOCode(1)
+    with pytest.raises(ValueError):
+        api.CAMEOCode('999')
+    with pytest.raises(ValueError):
+        api.Country(api.ISOCode('USA'), 'France')
+    # a rejected value is not shared
+    assert ('XYZ',) not in api.ISOCode._instances
+
+
+def test_equality_and_hashing():
+    usa = api.ISOCode('USA')
+    # as before interning, values equal values of their own type only
+    assert usa == api.ISOCode('USA')
+    assert usa != 'USA' and 'USA' != usa
+    assert api.CAMEOCode('042') != '042'
+    assert api.Date('2023-11-01') != '2023-11-01'
+    assert hash(usa) == hash('USA')
+    assert {usa: 1}[api.ISOCode('USA')] == 1
+    assert str(usa) == "ISOCode('USA')"
+    assert repr(usa) == "ISOCode(code='USA')"
+
+
+def test_values_are_immutable():
+    for value in values():
+        field = value._fields[0]
+        with pytest.raises(AttributeError):
+            setattr(value, field, getattr(value, field))
+        with pytest.raises(AttributeError):
+            delattr(value, field)
+        with pytest.raises(AttributeError):
+            value.other = 1
+    assert api.ISOCode('USA').code == 'USA'
+
+
+def test_pickling_restores_the_shared_instance():
+    for value in values():
+        assert pickle.loads(pickle.dumps(value)) is value
+    events = [values()[-1]] * 3
+    assert all(event is events[0] for event in pickle.loads(pickle.dumps(events)))
+
+
+def test_pickling_through_the_result_cache(tmp_path):
+    for cache in [ResultCache(), ResultCache(str(tmp_path / 'results.sqlite'))]:
+        cache.put('values', values())
+        hit, cached = cache.get('values')
+        assert hit
+        assert all(a is b for a, b in zip(cached, values()))
+
+
+def test_pickling_through_the_api_server(server):
+    client = APIClient(server, authkey=b'test')
+    try:
+        assert client.call('map_iso_to_country_name', api.ISOCode('USA')) == 'United States'
+        relation = client.call('map_cameo_to_relation', api.CAMEOCode('042'))
+        assert relation is api.Relation(api.CAMEOCode('042'), relation.name, relation.description)
+        assert relation.cameo_code is api.CAMEOCode('042')
+        countries = client.call('map_country_name_to_iso', 'United States')
+        assert countries[0].iso_code is api.ISOCode('USA')
+        with pytest.raises(ValueError):
+            client.call('map_iso_to_country_name', 'USA')
+    finally:
+        client.close()
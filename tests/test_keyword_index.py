@@ -0,0 +1,111 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'APIs'))
+from keyword_index import AhoCorasick, KeywordIndex
+
+TITLES = [
+    "Antinuclear protests spread",
+    "Trade talks resume in Geneva",
+    "U.S.-China trade war deepens",
+    "Weather report",
+    "NUCLEAR deal signed",
+    "Peace talks (round 2) end",
+    "Markets rally",
+    "Nothing to see",
+]
+TEXTS = [
+    "Thousands joined the antinuclear march on Sunday.",
+    "Negotiators met to discuss trade talks and tariffs.",
+    "The trade war between the U.S. and China escalated.",
+    "Sunny with a chance of rain!",
+    "The nuclear deal was signed after long talks.",
+    "Officials said the talks ended without agreement...",
+    "Stocks rose 3% on Friday; bonds fell.",
+    None,
+]
+
+
+def baseline(keywords, candidates):
+    # the keyword filter before the index: a literal, case-insensitive substring of the title or the text
+    titles, texts = pd.Series(TITLES), pd.Series(TEXTS)
+    mask = pd.Series(False, index=titles.index)
+    for keyword in keywords:
+        mask |= titles.str.contains(keyword, case=False, regex=False, na=False)
+        mask |= texts.str.contains(keyword, case=False, regex=False, na=False)
+    return mask.to_numpy()[candidates]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return KeywordIndex.build(zip(TITLES, TEXTS))
+
+
+def match(index, keywords, candidates):
+    fetched = []
+
+    def fetch_fields(docnos):
+        fetched.extend(docnos.tolist())
+        return [(TITLES[docno], TEXTS[docno]) for docno in docnos]
+
+    return index.match(keywords, candidates, fetch_fields), fetched
+
+
+@pytest.mark.parametrize('keywords', [
+    ['nuclear'], # inside a token ("antinuclear") and as a whole token
+    ['trade talks'], # phrase
+    ['u.s.'], # word runs and punctuation
+    ['...'], # punctuation only
+    ['3%'],
+    ['!'],
+    [''], # empty, contained in every string
+    ['Nuclear', 'NUCLEAR', 'nuclear'], # mixed-case duplicates
+    ['talks', 'TALKS'],
+    ['war between', 'rally'],
+    ['absent'],
+    ['round 2)'],
+])
+def test_match_equals_substring_baseline(index, keywords):
+    candidates = np.arange(len(TITLES))
+    mask, _ = match(index, keywords, candidates)
+    assert mask.tolist() == baseline(keywords, candidates).tolist()
+
+
+def test_match_over_candidate_subset(index):
+    candidates = np.array([4, 0, 2, 7])
+    for keywords in [['nuclear'], ['trade war'], ['']]:
+        mask, _ = match(index, keywords, candidates)
+        assert mask.tolist() == baseline(keywords, candidates).tolist()
+
+
+def test_word_keywords_need_no_fetch(index):
+    # keywords made of word characters are answered from the vocabulary alone
+    _, fetched = match(index, ['nuclear', 'Trade'], np.arange(len(TITLES)))
+    assert fetched == []
+
+
+def test_phrases_are_only_verified_on_prefiltered_documents(index):
+    # only the documents whose tokens contain both "trade" and "talks" are fetched
+    _, fetched = match(index, ['trade talks'], np.arange(len(TITLES)))
+    assert fetched == [1]
+
+
+def test_aho_corasick():
+    automaton = AhoCorasick(['he', 'she', 'hers'])
+    assert automaton.contains_any('ushers')
+    assert automaton.contains_any('ahe')
+    assert not automaton.contains_any('hxs')
+    assert AhoCorasick(['']).contains_any('')
+    assert not AhoCorasick([]).contains_any('anything')
+
+
+def test_save_load_checks_source(index, tmp_path):
+    index.save(str(tmp_path), source='a')
+    assert KeywordIndex.load(str(tmp_path), source='b') is None
+    loaded = KeywordIndex.load(str(tmp_path), source='a')
+    mask, _ = match(loaded, ['nuclear', 'trade talks'], np.arange(len(TITLES)))
+    assert mask.tolist() == baseline(['nuclear', 'trade talks'], np.arange(len(TITLES))).tolist()
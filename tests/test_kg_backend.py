@@ -0,0 +1,131 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'APIs'))
+from cameo_taxonomy import CameoTaxonomy
+from count_cube import CountCube
+from event_index import EventIndex
+from kg_backend import ArrayBackend, EventQuery, SQLiteBackend
+
+INFO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'info')
+
+
+@pytest.fixture(scope='module')
+def taxonomy():
+    return CameoTaxonomy(json.load(open(os.path.join(INFO_DIR, 'dict_code2relation.json'))).keys())
+
+
+def make_data_kg(n_rows=400, seed=0):
+    # data_kg rows with repeated events, some of them repeated across the chunks read by the build
+    rng = np.random.default_rng(seed)
+    entities = ['USA', 'CHN', 'RUS', 'FRA', 'JPN']
+    relations = ['010', '036', '042', '057', '190']
+    rows = []
+    for row in range(n_rows):
+        date = f'2023-{rng.integers(1, 4):02d}-{rng.integers(1, 29):02d}'
+        head, tail = rng.choice(entities, 2)
+        relation = rng.choice(relations)
+        docids = sorted(set(rng.integers(0, 500, rng.integers(1, 4)).tolist()))
+        quad = f'{date}, {head}, {relation}, {tail}'
+        rows.append([date, head, tail, relation, f'Country {head}', f'Country {tail}', f'Rel {relation}', quad, quad,
+                     str(docids[-1]), '[' + ', '.join(map(str, docids)) + ']'])
+    return pd.DataFrame(rows, columns=['DateStr', 'Actor1CountryCode', 'Actor2CountryCode', 'EventBaseCode',
+                                       'Actor1CountryName', 'Actor2CountryName', 'RelName', 'QuadEventCode',
+                                       'QuadEventName', 'Docid', 'Docids'])
+
+
+def queries(taxonomy):
+    return [EventQuery(),
+            EventQuery(start_date='2023-02-01', end_date='2023-02-28'),
+            EventQuery(head_codes=['USA', 'CHN']),
+            EventQuery(tail_codes=['RUS'], end_date='2023-03-10'),
+            EventQuery(relation_mask=taxonomy.mask(['04', '190'])),
+            EventQuery(interacted_codes=['FRA'], entity_role='head'),
+            EventQuery(interacted_codes=['FRA'], entity_role='tail'),
+            EventQuery(interacted_codes=['FRA', 'JPN']),
+            EventQuery(head_codes=['XXX'])]
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+@pytest.mark.parametrize('chunk_size', [7, 1 << 16])
+def test_streamed_sqlite_build_matches_the_array_backend(tmp_path, taxonomy, file_format, chunk_size):
+    data_kg = make_data_kg()
+    data_kg_path = str(tmp_path / f'data_kg.{file_format}')
+    if file_format == 'csv':
+        data_kg.to_csv(data_kg_path, sep='\t', index=False)
+    else:
+        data_kg.to_parquet(data_kg_path, index=False)
+    event_index = EventIndex(data_kg)
+    arrays = ArrayBackend(event_index, taxonomy)
+    sqlite = SQLiteBackend.build(str(tmp_path / 'data_kg.sqlite'), data_kg_path, taxonomy, source='s', chunk_size=chunk_size)
+    assert len(event_index) < len(data_kg)
+    for query in queries(taxonomy):
+        assert sqlite.count(query) == arrays.count(query)
+        assert sqlite.latest_events(query) == arrays.latest_events(query)
+        assert sqlite.latest_events(query, 5, 3) == arrays.latest_events(query, 5, 3)
+        assert sqlite.docids_of(query).tolist() == arrays.docids_of(query).tolist()
+        assert sqlite.entity_distribution(query) == arrays.entity_distribution(query)
+        assert sqlite.relation_distribution(query, 2, 1) == arrays.relation_distribution(query, 2, 1)
+        # the event ids differ between backends, but group the same docids in the same order
+        for backend in [sqlite, arrays]:
+            docids, event_ids = backend.event_docid_pairs(query)
+            grouped = [(backend.latest_events_of([event_id]), docids[event_ids == event_id].tolist())
+                       for event_id in np.unique(event_ids)]
+            if backend is sqlite:
+                expected = sorted(grouped)
+            else:
+                assert sorted(grouped) == expected
+    sqlite.close()
+
+
+def test_sqlite_load_checks_the_source(tmp_path, taxonomy):
+    data_kg_path = str(tmp_path / 'data_kg.csv')
+    make_data_kg(50).to_csv(data_kg_path, sep='\t', index=False)
+    path = str(tmp_path / 'data_kg.sqlite')
+    SQLiteBackend.build(path, data_kg_path, taxonomy, source='a').close()
+    assert SQLiteBackend.load(path, taxonomy, source='b') is None
+    assert SQLiteBackend.load(path, taxonomy, source='a').count(EventQuery()) == len(EventIndex(make_data_kg(50)))
+    assert not os.path.exists(path + '.build')
+
+
+def test_count_cube_is_loaded_only_when_it_pays_off(taxonomy):
+    event_index = EventIndex(make_data_kg(2000))
+    loads = []
+
+    def load_count_cube():
+        loads.append(True)
+        return CountCube(event_index)
+
+    backend = ArrayBackend(event_index, taxonomy, load_count_cube=load_count_cube)
+    n_cells = CountCube.n_cells_of(event_index)
+    assert n_cells == len(CountCube(event_index))
+    scanned = [backend.count(query) for query in queries(taxonomy)]
+    distributions = [backend.entity_distribution(query) for query in queries(taxonomy)]
+    # the whole KG holds more than cube_min_events_per_cell events per cell, a week of it does not
+    assert len(event_index) >= backend.cube_min_events_per_cell * n_cells
+    assert loads == [True]
+    week = EventQuery(start_date='2023-02-01', end_date='2023-02-07')
+    assert backend.count(week) == len(backend._positions(week))
+    assert loads == [True]
+    # forcing the cube or the scan gives the same results
+    for min_events_per_cell in [0.0, float('inf')]:
+        backend.cube_min_events_per_cell = min_events_per_cell
+        assert [backend.count(query) for query in queries(taxonomy)] == scanned
+        assert [backend.entity_distribution(query) for query in queries(taxonomy)] == distributions
+        assert backend.count_many(queries(taxonomy)) == scanned
+    assert loads == [True]
+
+
+def test_count_cube_is_never_loaded_for_sparse_kgs(taxonomy):
+    event_index = EventIndex(make_data_kg(100))
+    backend = ArrayBackend(event_index, taxonomy, load_count_cube=lambda: pytest.fail('count cube loaded'))
+    assert len(event_index) < backend.cube_min_events_per_cell * CountCube.n_cells_of(event_index)
+    for query in queries(taxonomy):
+        backend.count(query)
+        backend.relation_distribution(query)
+    assert backend.count_cube is None
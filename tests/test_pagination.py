@@ -0,0 +1,136 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'APIs'))
+import api_implementation as api
+from event_index import top_ranked
+
+
+def reference_ranking(scores, limit, offset, later_ties_first):
+    # full stable sort by descending score, ties by index
+    indices = sorted(range(len(scores)), key=lambda i: (-scores[i], -i if later_ties_first else i))
+    end = len(scores) if limit is None else offset + limit
+    return indices[offset:end]
+
+
+@pytest.mark.parametrize('later_ties_first', [False, True])
+def test_top_ranked_matches_a_full_sort(later_ties_first):
+    rng = np.random.default_rng(0)
+    for scores in [rng.integers(0, 4, size=50).astype(float), # many ties
+                   rng.random(50),
+                   np.zeros(20), # all tied
+                   np.array([1.0]),
+                   np.zeros(0)]:
+        for limit in [None, 0, 1, 3, 10, 50, 100]:
+            for offset in [0, 1, 7, 19, 49, 50, 200]:
+                expected = reference_ranking(scores.tolist(), limit, offset, later_ties_first)
+                assert top_ranked(scores, limit, offset, later_ties_first).tolist() == expected
+
+
+def test_top_ranked_pages_partition_the_ranking():
+    scores = np.repeat([3.0, 1.0, 2.0], 7)
+    full = top_ranked(scores, later_ties_first=True).tolist()
+    pages = [top_ranked(scores, 4, offset, later_ties_first=True).tolist() for offset in range(0, 28, 4)]
+    assert sum(pages, []) == full
+    assert pages[-1] == []
+    assert top_ranked(scores, 4, 100).dtype == np.int64
+
+
+def pages(function, page_size, **arguments):
+    results = []
+    while True:
+        page = function(limit=page_size, offset=len(results), **arguments)
+        assert len(page) <= page_size
+        results.extend(page)
+        if len(page) < page_size:
+            return results
+
+
+def words_of_a_title(n_words):
+    # the articles are matched by words of the data rather than by fixed ones
+    _, title = api.get_news_articles(head_entities=[api.ISOCode('USA')], limit=1)[0]
+    return ' '.join(title.split()[:n_words])
+
+
+@pytest.fixture(autouse=True)
+def end_date():
+    api.set_default_end_date('2023-11-30')
+    yield
+    api.set_default_end_date(None)
+
+
+EVENT_FILTERS = [
+    {'head_entities': [api.ISOCode('USA')]},
+    {'relations': [api.CAMEOCode('04')], 'date_range': api.DateRange(api.Date('2023-11-01'), api.Date('2023-11-10'))},
+    {'head_entities': [api.ISOCode('CHN')], 'text_description': 2},
+    # a description matching no article ties every candidate
+    {'head_entities': [api.ISOCode('CHN')], 'text_description': 'qqqqzzzz'},
+]
+
+
+# an int in place of a description or keywords stands for that many words of a title of the data
+def resolve(filters):
+    filters = dict(filters)
+    if isinstance(filters.get('text_description'), int):
+        filters['text_description'] = words_of_a_title(filters['text_description'])
+    if isinstance(filters.get('keywords'), int):
+        filters['keywords'] = words_of_a_title(filters['keywords']).split()[-1:]
+    return filters
+
+
+@pytest.mark.parametrize('filters', EVENT_FILTERS)
+def test_get_events_pages_concatenate_to_the_full_list(filters):
+    filters = resolve(filters)
+    full = api.get_events(limit=100000, **filters)
+    assert len(full) == len(set(full)) > 0
+    assert pages(api.get_events, 97, **filters) == full
+    assert api.get_events(limit=5, offset=len(full), **filters) == []
+    assert api.get_events(limit=5, offset=len(full) + 100, **filters) == []
+    assert api.get_events(limit=0, **filters) == []
+    if 'text_description' not in filters:
+        dates = [event.date.date for event in full]
+        assert dates == sorted(dates, reverse=True)
+
+
+NEWS_FILTERS = [
+    {'head_entities': [api.ISOCode('USA')]},
+    {'head_entities': [api.ISOCode('USA')], 'keywords': 1},
+    {'head_entities': [api.ISOCode('CHN')], 'text_description': 2},
+    {'head_entities': [api.ISOCode('CHN')], 'text_description': 'qqqqzzzz'},
+]
+
+
+@pytest.mark.parametrize('filters', NEWS_FILTERS)
+def test_get_news_articles_pages_concatenate_to_the_full_list(filters):
+    filters = resolve(filters)
+    full = api.get_news_articles(limit=100000, **filters)
+    assert len(full) == len(set(full)) > 0
+    assert pages(api.get_news_articles, 37, **filters) == full
+    assert api.get_news_articles(limit=5, offset=len(full), **filters) == []
+    assert api.get_news_articles(limit=5, offset=len(full) + 100, **filters) == []
+    if 'text_description' not in filters:
+        dates = [date.date for date, _ in full]
+        assert dates == sorted(dates, reverse=True)
+
+
+def test_distribution_pages_concatenate_to_the_full_distribution():
+    full = api.get_entity_distribution(interacted_entities=[api.ISOCode('USA')])
+    paged = {}
+    for offset in range(0, len(full) + 3, 3):
+        paged.update(api.get_entity_distribution(interacted_entities=[api.ISOCode('USA')], limit=3, offset=offset))
+    assert list(paged.items()) == list(full.items())
+    assert api.get_entity_distribution(limit=3, offset=10000) == {}
+    full = api.get_relation_distribution(head_entities=[api.ISOCode('USA')])
+    assert list(full.values()) == sorted(full.values(), reverse=True)
+    assert api.get_relation_distribution(head_entities=[api.ISOCode('USA')], limit=2, offset=1) == dict(list(full.items())[1:3])
+
+
+@pytest.mark.parametrize('function', [api.get_events, api.get_news_articles])
+def test_negative_pagination_is_rejected(function):
+    with pytest.raises(ValueError):
+        function(limit=-1)
+    with pytest.raises(ValueError):
+        function(offset=-1)
@@ -0,0 +1,178 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'APIs'))
+import api_implementation as api
+from data_store import source_signature
+from result_cache import ResultCache, Uncacheable, canonicalize
+
+
+def key(cache, as_of_date='2023-11-01', **arguments):
+    return cache.make_key('get_events', arguments, as_of_date)
+
+
+def test_list_order_and_duplicates_share_a_key():
+    cache = ResultCache()
+    usa, chn = api.ISOCode('USA'), api.ISOCode('CHN')
+    assert key(cache, head_entities=[usa, chn]) == key(cache, head_entities=[chn, usa, usa])
+    assert key(cache, head_entities=[]) == key(cache, head_entities=None)
+    assert key(cache, head_entities=[usa]) != key(cache, head_entities=[chn])
+    # the same codes in another filter are another call
+    assert key(cache, head_entities=[usa]) != key(cache, tail_entities=[usa])
+
+
+def test_limit_offset_and_types_never_share_a_key():
+    cache = ResultCache()
+    assert key(cache, limit=30, offset=0) != key(cache, limit=30, offset=30)
+    assert key(cache, limit=30, offset=0) != key(cache, limit=15, offset=0)
+    # an invalid argument, which the API rejects, does not share the key of the valid one
+    assert key(cache, limit=30) != key(cache, limit='30')
+    assert key(cache, head_entities=[api.ISOCode('USA')]) != key(cache, head_entities=['USA'])
+
+
+def test_as_of_date_and_namespace_never_share_a_key():
+    cache = ResultCache(namespace='v1:a')
+    assert key(cache, as_of_date='2023-11-01') != key(cache, as_of_date='2023-11-02')
+    assert key(cache, as_of_date='2023-11-01') != key(cache, as_of_date=None)
+    assert key(cache) != key(ResultCache(namespace='v1:b'))
+    assert key(cache) == key(ResultCache(namespace='v1:a'))
+
+
+def test_changed_source_changes_the_namespace(tmp_path):
+    path = tmp_path / 'data_kg.csv'
+    path.write_text('a\tb\n')
+    before = source_signature(str(path))
+    path.write_text('a\tb\nc\td\n')
+    assert source_signature(str(path)) != before
+
+
+def test_persisted_results_of_other_sources_never_match(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    old = ResultCache(path, namespace='v2:100:1:200:1')
+    old.put(key(old, limit=1), ['old result'])
+    old.flush()
+    same = ResultCache(path, namespace='v2:100:1:200:1')
+    assert same.get(key(same, limit=1)) == (True, ['old result'])
+    changed = ResultCache(path, namespace='v2:100:2:200:1')
+    assert changed.get(key(changed, limit=1)) == (False, None)
+
+
+def test_memoize_keys_on_the_as_of_date():
+    cache = ResultCache()
+    as_of_date = ['2023-11-01']
+    calls = []
+
+    @cache.memoize(lambda: as_of_date[0])
+    def count(entities=None, limit=10):
+        calls.append((entities, limit))
+        return len(calls)
+
+    assert count(['USA', 'CHN']) == 1
+    assert count(['CHN', 'USA', 'USA']) == 1
+    assert count(['USA', 'CHN'], limit=10) == 1 # defaults are part of the key
+    assert count(['USA', 'CHN'], limit=5) == 2
+    as_of_date[0] = '2023-11-02'
+    assert count(['USA', 'CHN']) == 3
+    assert cache.hits == 2 and cache.misses == 3
+
+
+def test_memoized_api_keys_on_default_end_date():
+    try:
+        api.set_default_end_date('2023-11-01')
+        n_before = api.count_events()
+        hits = api.result_cache.hits
+        api.set_default_end_date('2023-11-10')
+        n_after = api.count_events()
+        assert api.result_cache.hits == hits
+        assert n_after >= n_before
+        api.set_default_end_date('2023-11-01')
+        assert api.count_events() == n_before
+        assert api.result_cache.hits == hits + 1
+    finally:
+        api.set_default_end_date(None)
+
+
+def test_results_are_copies():
+    cache = ResultCache()
+    cache.put('k', {'USA': [1, 2]})
+    _, result = cache.get('k')
+    result['USA'].append(3)
+    assert cache.get('k') == (True, {'USA': [1, 2]})
+
+
+def test_memory_eviction_respects_max_bytes():
+    cache = ResultCache(max_bytes=1000)
+    for i in range(20):
+        cache.put(f'k{i}', 'x' * 200)
+    assert cache.size <= 1000
+    assert 0 < len(cache) < 20
+    # the least recently used results are evicted first
+    assert cache.get('k19')[0] and not cache.get('k0')[0]
+    # a result larger than the cache is not stored
+    cache.put('large', 'x' * 2000)
+    assert cache.get('large') == (False, None)
+
+
+def test_persisted_eviction_respects_max_bytes(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache = ResultCache(path, max_bytes=1000, flush_every=1)
+    for i in range(5):
+        cache.put(f'k{i}', 'x' * 150)
+    # k0 is the most recently used once it is read again
+    assert cache.get('k0')[0]
+    for i in range(5, 10):
+        cache.put(f'k{i}', 'x' * 150)
+    assert cache.stored_size <= 1000
+    stored = {key for (key,) in cache.db.execute('SELECT key FROM results')}
+    assert 'k0' in stored and 'k1' not in stored and 'k9' in stored
+    # the size is kept across processes sharing the file
+    assert ResultCache(path, max_bytes=1000).stored_size == cache.stored_size
+
+
+def test_uncacheable_arguments_bypass_the_cache():
+    cache = ResultCache()
+    calls = []
+
+    @cache.memoize(lambda: None)
+    def identity(value=None):
+        calls.append(value)
+        return value
+
+    with pytest.raises(Uncacheable):
+        canonicalize({'a': 1})
+    assert identity({'a': 1}) == {'a': 1}
+    assert identity({'a': 1}) == {'a': 1}
+    assert len(calls) == 2
+    assert cache.hits == 0 and cache.misses == 0 and len(cache) == 0
+
+
+def test_unbindable_arguments_reach_the_function():
+    cache = ResultCache()
+
+    @cache.memoize(lambda: None)
+    def function(value):
+        return value
+
+    # arguments that do not bind raise the TypeError of the function itself, without touching the cache
+    with pytest.raises(TypeError):
+        function(1, 2)
+    with pytest.raises(TypeError):
+        function(unknown=1)
+    assert cache.misses == 0 and len(cache) == 0
+
+
+def test_failed_calls_are_not_cached():
+    cache = ResultCache()
+    calls = []
+
+    @cache.memoize(lambda: None)
+    def failing(value):
+        calls.append(value)
+        raise ValueError(value)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            failing(1)
+    assert len(calls) == 2 and len(cache) == 0
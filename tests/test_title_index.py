@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'APIs'))
+import title_index
+from title_index import TitleIndex, normalize_title
+
+DATES = ['2023-11-01', '2023-11-01', '2023-11-02', '2023-11-02', '2023-11-01', '2023-11-03', '2023-11-03']
+TITLES = ['Talks resume in Geneva', 'Markets  Rally', 'Talks resume in Geneva', 'Ｆｕｌｌｗｉｄｔｈ Title',
+          'Talks resume in Geneva', None, 'talks RESUME in geneva']
+
+
+def build():
+    return TitleIndex.build(DATES, TITLES)
+
+
+@pytest.fixture(params=['blake2b', 'colliding'])
+def index(request, monkeypatch):
+    if request.param == 'colliding':
+        # every key has the same hash, so every lookup must tell the articles apart by their date and title
+        monkeypatch.setattr(title_index, 'key_hash', lambda date, title: 42)
+    return build()
+
+
+def test_exact_lookup(index):
+    # the first article with the date and title, as the original scan of data_news
+    assert index.lookup('2023-11-01', 'Talks resume in Geneva') == 0
+    assert index.lookup('2023-11-02', 'Talks resume in Geneva') == 2
+    assert index.lookup('2023-11-01', 'Markets  Rally') == 1
+    assert index.lookup('2023-11-03', 'talks RESUME in geneva') == 6
+    assert index.stats() == {'exact_hits': 4, 'normalized_hits': 0, 'misses': 0}
+
+
+def test_normalized_fallback(index):
+    assert index.lookup('2023-11-01', '  talks RESUME in   geneva ') == 0
+    assert index.lookup('2023-11-01', 'MARKETS RALLY') == 1
+    assert index.lookup('2023-11-02', 'Fullwidth title') == 3
+    # the normalized title of another date is not a match
+    assert index.lookup('2023-11-03', 'Markets Rally') is None
+    assert index.lookup('2023-11-04', 'Talks resume in Geneva') is None
+    assert index.lookup('2023-11-01', 'Talks resumed in Geneva') is None
+    assert index.stats() == {'exact_hits': 0, 'normalized_hits': 3, 'misses': 3}
+
+
+def test_collisions_never_return_another_article(monkeypatch):
+    monkeypatch.setattr(title_index, 'key_hash', lambda date, title: 42)
+    index = build()
+    for row, (date, title) in enumerate(zip(DATES, TITLES)):
+        if title is None:
+            continue
+        found = index.lookup(date, title)
+        assert DATES[found] == date and TITLES[found] == title
+        found = index.lookup(date, title.upper())
+        assert DATES[found] == date and normalize_title(TITLES[found]) == normalize_title(title)
+    assert index.lookup('2023-11-03', '') is None
+    assert index.lookup('2023-11-03', 'None') is None
+
+
+def test_titles_are_stored(index):
+    assert index.titles(range(len(TITLES))) == [title or '' for title in TITLES]
+    assert len(index) == len(TITLES) - 1
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    index = build()
+    n_threads, n_lookups = 8, 500
+
+    def lookups():
+        for _ in range(n_lookups):
+            index.lookup('2023-11-01', 'Talks resume in Geneva')
+            index.lookup('2023-11-01', 'TALKS RESUME IN GENEVA')
+            index.lookup('2023-11-01', 'Unknown')
+
+    threads = [threading.Thread(target=lookups) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    n = n_threads * n_lookups
+    assert index.stats() == {'exact_hits': n, 'normalized_hits': n, 'misses': n}